@@ -0,0 +1,82 @@
+"""Per-rerun setup cost of the web app, before and after process-wide client caching.
+
+"before" builds a genai.Client and a GenerateContentConfig with the tool callables on
+every rerun (and the SDK re-inspects those callables on every request). "after" reuses
+one ClientProvider client and a config built once from prebuilt tool declarations.
+
+No network access is needed: a dummy API key is used and nothing is sent.
+Run from the project root:  python benchmarks/bench_client.py
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from google import genai
+from google.genai import types
+
+from nexus_client import ClientProvider, build_tool_declarations
+
+RUNS = 200
+
+
+def web_search(query: str):
+    """Returns a clickable link for a Google search query."""
+
+def play_on_youtube(topic: str):
+    """Returns a clickable link for a YouTube search."""
+
+def check_current_time():
+    """Returns the current local time."""
+
+def add_personal_note(note_text: str):
+    """Saves a piece of personal information or a key preference for later retrieval."""
+
+def retrieve_personal_notes(query: str):
+    """Searches the stored personal notes and returns only the ones most relevant to the query."""
+
+def open_application(app_name: str):
+    """Simulates the command to open an application."""
+
+def set_reminder(time_string: str, reminder_text: str):
+    """Sets a reminder that shows a notification in the app after the specified time has passed."""
+
+TOOLS = {f.__name__: f for f in (web_search, play_on_youtube, check_current_time, add_personal_note,
+                                 retrieve_personal_notes, open_application, set_reminder)}
+
+
+def before():
+    client = genai.Client(api_key="benchmark")
+    config = types.GenerateContentConfig(tools=list(TOOLS.values()), system_instruction="Nexus")
+    # What the SDK does with callable tools on every request
+    [types.FunctionDeclaration.from_callable_with_api_option(callable=f) for f in TOOLS.values()]
+    client.chats.create(model='gemini-2.5-flash', config=config)
+
+
+PROVIDER = ClientProvider(lambda: genai.Client(api_key="benchmark"))
+CONFIG = None
+
+
+def after():
+    global CONFIG
+    client = PROVIDER.get()
+    if CONFIG is None:
+        CONFIG = types.GenerateContentConfig(tools=[build_tool_declarations(TOOLS)], system_instruction="Nexus")
+    client.chats.create(model='gemini-2.5-flash', config=CONFIG)
+
+
+def measure(func):
+    samples = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), sorted(samples)[int(RUNS * 0.95)]
+
+
+if __name__ == "__main__":
+    for name, func in (("before (new client per rerun)", before), ("after (cached client + config)", after)):
+        p50, p95 = measure(func)
+        print(f"{name:<32} p50 {p50:8.3f} ms   p95 {p95:8.3f} ms")
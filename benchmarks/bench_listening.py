@@ -0,0 +1,100 @@
+"""Offline check of the continuous voice pipeline in nexus_speech (segmentation, calibration, wake word).
+
+A synthetic recording is written to a temporary WAV file: UTTERANCES tone bursts of
+varying length over background noise that gets louder half-way through (a fan
+switching on). It is played through FileAudioSource into ListeningService with a
+scripted transcriber, so no microphone, speech_recognition or network is needed.
+
+Reported per scenario: utterances found versus spoken, spurious ones, commands passed
+on, and how much faster than real time the capture thread runs. The "fixed calibration"
+scenario shows what a one-off noise calibration (adapt=0) does once the noise rises.
+
+Run from the project root:  python benchmarks/bench_listening.py
+"""
+import math
+import random
+import struct
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nexus_speech import FileAudioSource, ListeningService
+
+SAMPLE_RATE = 16000
+UTTERANCES = 12
+QUIET_NOISE = 150
+LOUD_NOISE = 700
+SPEECH_LEVEL = 4000
+
+
+def synth_recording(path, seed=7):
+    """Writes the test recording; returns the number of utterances in it."""
+    rng = random.Random(seed)
+    samples = []
+
+    def noise(seconds, level):
+        samples.extend(int(rng.gauss(0, level)) for _ in range(int(seconds * SAMPLE_RATE)))
+
+    def speech(seconds, level):
+        pitch = rng.uniform(120, 260)
+        for i in range(int(seconds * SAMPLE_RATE)):
+            t = i / SAMPLE_RATE
+            # A voiced tone in syllables, with short gaps between them like words
+            envelope = max(0.0, math.sin(2 * math.pi * 3 * t))
+            samples.append(int(SPEECH_LEVEL * envelope * math.sin(2 * math.pi * pitch * t) + rng.gauss(0, level)))
+
+    noise(1.0, QUIET_NOISE)
+    for index in range(UTTERANCES):
+        level = QUIET_NOISE if index < UTTERANCES // 2 else LOUD_NOISE
+        speech(rng.uniform(0.6, 2.0), level)
+        noise(rng.uniform(1.2, 2.5), level)
+
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(b"".join(struct.pack('<h', max(-32768, min(32767, s))) for s in samples))
+    return UTTERANCES, len(samples) / SAMPLE_RATE
+
+
+def scripted(texts):
+    """A transcriber that answers utterances with `texts` in order (then 'noise')."""
+    remaining = list(texts)
+
+    def transcribe(pcm, sample_rate, sample_width):
+        return remaining.pop(0) if remaining else "noise"
+    return transcribe
+
+
+def run(name, path, spoken, audio_seconds, texts, wake_word=None, **segmenter_options):
+    commands = []
+    service = ListeningService(commands.append, source_factory=lambda: FileAudioSource(path),
+                               transcribe=scripted(texts), wake_word=wake_word, **segmenter_options)
+    started = time.perf_counter()
+    service.start()
+    service.join(timeout=120)
+    elapsed = time.perf_counter() - started
+    found = service.stats['utterances']
+    print(f"{name:<24} found {found:3d}/{spoken}  spurious {max(0, found - spoken):3d}  "
+          f"commands {len(commands):3d}  ignored {service.stats['ignored']:3d}  "
+          f"{audio_seconds / elapsed:6.0f}x real time  noise floor {service.segmenter.noise:5.0f}")
+    return commands
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as workdir:
+        path = Path(workdir) / "utterances.wav"
+        spoken, audio_seconds = synth_recording(path)
+        print(f"{audio_seconds:.0f} s of audio, {spoken} utterances, noise {QUIET_NOISE} -> {LOUD_NOISE} RMS half-way\n")
+        plain = [f"command {i}" for i in range(spoken)]
+        run("continuous calibration", path, spoken, audio_seconds, plain)
+        run("fixed calibration", path, spoken, audio_seconds, plain, adapt=0)
+        # Every other utterance addresses Nexus; one is the wake word alone, followed by the command
+        addressed = [f"nexus command {i}" if i % 2 else f"chatter {i}" for i in range(spoken)]
+        addressed[2], addressed[3] = "hey nexus", "what time is it"
+        commands = run("wake word 'nexus'", path, spoken, audio_seconds, addressed, wake_word="nexus")
+        print(f"\nCommands passed on with the wake word: {commands}")
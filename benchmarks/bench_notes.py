@@ -0,0 +1,80 @@
+"""Benchmark for personal note retrieval.
+
+Compares the indexed retrieve_personal_notes response against the old behaviour of
+returning every stored note, at 100, 10k and 100k synthetic notes.
+
+Run from the project root:  python benchmarks/bench_notes.py
+"""
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nexus_notes import NoteIndex, format_note
+
+SIZES = (100, 10_000, 100_000)
+QUERIES = 200
+
+WORDS = (
+    "birthday anniversary meeting doctor dentist password wifi car insurance passport "
+    "flight hotel gym diet coffee tea favourite colour movie song book author sister "
+    "brother mother father friend manager office project deadline exam college laptop "
+    "phone bank account loan rent salary leave holiday trip goa delhi mumbai pune "
+    "cricket football chess guitar python java rust recipe pizza biryani allergy "
+    "medicine appointment monday tuesday friday weekend morning evening"
+).split()
+
+
+def make_notes(n, rng):
+    notes = []
+    for i in range(n):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30)))
+        notes.append({'time': f"2025-10-{1 + i % 28:02d} 12:00:00", 'note': text})
+    return notes
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(size, rng):
+    notes = make_notes(size, rng)
+
+    started = time.perf_counter()
+    index = NoteIndex(notes)
+    build_s = time.perf_counter() - started
+
+    queries = [" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(QUERIES)]
+    latencies, sizes = [], []
+    for query in queries:
+        started = time.perf_counter()
+        response = index.retrieve(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        sizes.append(len(response))
+
+    full_dump = len("The user's stored notes are:\n" + "\n".join(format_note(n) for n in notes))
+    return {
+        'notes': size,
+        'build_s': build_s,
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': percentile(latencies, 95),
+        'response_chars': statistics.mean(sizes),
+        'full_dump_chars': full_dump,
+    }
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'notes':>8} {'build s':>9} {'p50 ms':>9} {'p95 ms':>9} {'resp chars':>11} {'dump chars':>12}")
+    for size in SIZES:
+        r = run(size, rng)
+        print(f"{r['notes']:>8} {r['build_s']:>9.3f} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} "
+              f"{r['response_chars']:>11.0f} {r['full_dump_chars']:>12}")
+
+
+if __name__ == "__main__":
+    main()
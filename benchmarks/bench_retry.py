@@ -0,0 +1,87 @@
+"""Turns completed under a server-side quota, with and without the nexus_retry CallGuard.
+
+Concurrent sessions stream turns through nexus_core.AgentCore, the path both front-ends
+use, against benchmarks/fake_genai.FakeClient (client.aio chats), which allows
+QUOTA_REQUESTS per second and answers everything beyond that with a 429 carrying a
+RetryInfo delay (like the real API). The last scenario is an outage: every request fails
+with a 503 and the circuit breaker should start failing calls fast.
+
+No network access or API key is needed.
+Run from the project root:  python benchmarks/bench_retry.py
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_genai import FakeClient
+from nexus_core import AgentCore
+from nexus_retry import CallGuard, CircuitBreaker, CircuitOpenError, RateLimiter
+
+SESSIONS = 8
+TURNS = 10
+QUOTA_REQUESTS = 20
+LATENCY = 0.02
+
+
+def run_sessions(client, guard):
+    latencies, failures = [], []
+    core = AgentCore(guard=guard)
+
+    async def session():
+        chat = client.aio.chats.create()
+        for turn_number in range(TURNS):
+            started = time.perf_counter()
+            try:
+                await core.run(chat, f"question {turn_number}")
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                failures.append(e)
+
+    async def sessions():
+        await asyncio.gather(*(session() for _ in range(SESSIONS)))
+
+    started = time.perf_counter()
+    core.submit(sessions()).result()
+    return latencies, failures, time.perf_counter() - started
+
+
+def report(name, client, guard):
+    latencies, failures, elapsed = run_sessions(client, guard)
+    p95 = sorted(latencies)[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    retries = guard.stats()['retries'] if guard else 0
+    print(f"{name:<28} ok {len(latencies):3d}/{SESSIONS * TURNS}  failed {len(failures):3d}  "
+          f"429s {client.rejected:3d}  retries {retries:3d}  "
+          f"{len(latencies) / elapsed:5.1f} turns/s  p50 {statistics.median(latencies or [0]) * 1000:6.0f} ms  "
+          f"p95 {p95:6.0f} ms")
+
+
+def outage():
+    client = FakeClient(fail_first=10**9, fail_code=503)
+    guard = CallGuard(RateLimiter(10**6), CircuitBreaker(failures=5, reset_seconds=60), attempts=2, base_delay=0.01)
+    core = AgentCore(guard=guard)
+    chat = client.aio.chats.create()
+    started = time.perf_counter()
+    fast_failed = 0
+    for _ in range(20):
+        try:
+            core.submit(core.run(chat, "hello")).result()
+        except CircuitOpenError:
+            fast_failed += 1
+        except Exception:
+            pass
+    print(f"{'outage (breaker)':<28} 20 turns in {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"{client.requests} requests sent, {fast_failed} failed fast")
+
+
+if __name__ == "__main__":
+    print(f"{SESSIONS} sessions x {TURNS} turns, server quota {QUOTA_REQUESTS} requests/s\n")
+    report("no guard", FakeClient(latency=LATENCY, quota=(QUOTA_REQUESTS, 1.0)), None)
+    report("retries only", FakeClient(latency=LATENCY, quota=(QUOTA_REQUESTS, 1.0)),
+           CallGuard(RateLimiter(10**6), base_delay=0.05))
+    report("retries + rate limiter", FakeClient(latency=LATENCY, quota=(QUOTA_REQUESTS, 1.0)),
+           CallGuard(RateLimiter(QUOTA_REQUESTS, period=1.0), base_delay=0.05))
+    outage()
@@ -0,0 +1,73 @@
+"""Memory and resume latency of durable web sessions (nexus_sessions.SessionStore).
+
+SESSIONS conversations of TURNS turns each are written through the store, the way
+web_app.py saves them after every turn, with the live chats of benchmarks/fake_genai.
+Then they are reopened in random order, as returning users (or a restarted server)
+would. The store holds at most CACHE_SIZE sessions in memory; the same run with an
+unbounded cache shows what keeping every session in memory costs.
+
+Run from the project root:  python benchmarks/bench_sessions.py
+"""
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_genai import FakeClient, ScriptedResponder
+from nexus_sessions import SessionStore
+
+SESSIONS = 2000
+TURNS = 10
+CACHE_SIZE = 200
+RESUMES = 500
+
+
+def run(name, cache_size):
+    client = FakeClient(ScriptedResponder(words=60))
+    with tempfile.TemporaryDirectory() as workdir:
+        tracemalloc.start()
+        store = SessionStore(Path(workdir) / "web_sessions.db", cache_size=cache_size)
+        ids = []
+        started = time.perf_counter()
+        for index in range(SESSIONS):
+            session = store.create("bench-user")
+            chat = session.ensure_chat(lambda history: client.chats.create(history=history))
+            for turn in range(TURNS):
+                prompt = f"Question {turn} of conversation {index}"
+                session.add_message("user", prompt)
+                reply = "".join(part.text for part in chat.send_message(prompt).candidates[0].content.parts)
+                session.add_message("assistant", reply)
+                store.save(session)
+            ids.append(session.id)
+        write_seconds = time.perf_counter() - started
+        held_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        tracemalloc.stop()
+
+        resume_ms = []
+        rng = random.Random(3)
+        for session_id in rng.sample(ids, RESUMES):
+            started = time.perf_counter()
+            session = store.get(session_id, "bench-user")
+            # Rendering needs the transcript; the first new turn then rebuilds the chat
+            assert len(session.messages) == 2 * TURNS
+            session.ensure_chat(lambda history: client.chats.create(history=history))
+            resume_ms.append((time.perf_counter() - started) * 1000)
+        stats = store.stats()
+        store.close()
+
+    p95 = sorted(resume_ms)[int(len(resume_ms) * 0.95)]
+    print(f"{name:<16} {SESSIONS * TURNS / write_seconds:7.0f} turns saved/s  memory held {held_mb:6.1f} MB  "
+          f"resume p50 {statistics.median(resume_ms):5.2f} ms  p95 {p95:5.2f} ms  "
+          f"({stats['loads']} loaded from disk, {stats['evictions']} evicted)")
+
+
+if __name__ == "__main__":
+    print(f"{SESSIONS} sessions x {TURNS} turns, {RESUMES} random resumes\n")
+    run(f"LRU of {CACHE_SIZE}", CACHE_SIZE)
+    run("unbounded", SESSIONS)
@@ -0,0 +1,89 @@
+"""Rerun time of web_app.py against transcript length, with and without the paged transcript.
+
+A conversation of each length in LENGTHS is written to web_sessions.db through
+nexus_sessions, then opened with Streamlit's headless AppTest (via ?session= in the
+URL, like a returning user) and rerun RERUNS times without input, which is what every
+widget interaction costs. "paged" is the default TRANSCRIPT_PAGE_SIZE window; "all"
+raises the window past the transcript length, the way every message used to be
+rendered. A FakeClient from benchmarks/fake_genai stands in for Gemini.
+
+Run from the project root:  python benchmarks/bench_transcript.py
+"""
+import importlib.util
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_genai import FILLER, FakeClient, install
+
+LENGTHS = (10, 100, 500, 2000)
+RERUNS = 10
+USER = "bench-user"
+
+
+def seed_session(length):
+    """Writes a conversation of `length` messages and returns its session id."""
+    from nexus_sessions import SessionStore
+
+    store = SessionStore(Path("web_sessions.db"))
+    session = store.create(USER)
+    for index in range(length):
+        if index % 2:
+            session.add_message("assistant", f"**Answer {index}.** " + " ".join(FILLER[:40]) + "\n\n- one\n- two")
+        else:
+            session.add_message("user", f"Question number {index} about something")
+    store.save(session)
+    store.close()
+    return session.id
+
+
+def rerun_ms(session_id, render_all):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(ROOT / "web_app.py"), default_timeout=120)
+    app.query_params["user"] = USER
+    app.query_params["session"] = session_id
+    if render_all:
+        app.session_state["transcript_visible"] = 10**9
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"web_app.py raised: {app.exception[0].value}")
+    samples = []
+    for _ in range(RERUNS):
+        started = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    if importlib.util.find_spec("streamlit") is None:
+        print("skipped: streamlit is not installed")
+        return
+    import streamlit as st
+
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    os.chdir(tempfile.mkdtemp(prefix="nexus-transcript-"))
+    uninstall = install(FakeClient())
+    st.cache_resource.clear()
+    try:
+        print(f"{'messages':>9} {'paged ms':>10} {'all ms':>10}")
+        for length in LENGTHS:
+            session_id = seed_session(length)
+            paged = rerun_ms(session_id, render_all=False)
+            everything = rerun_ms(session_id, render_all=True)
+            print(f"{length:>9} {paged:>10.1f} {everything:>10.1f}")
+    finally:
+        uninstall()
+        st.cache_resource.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Concurrency stress test for web personal notes: lost writes, isolation and write latency.
+
+PROCESSES server processes each run THREADS sessions at once; every session is its own
+user and saves NOTES_PER_SESSION notes as fast as it can, like add_personal_note calls
+arriving together. Compared:
+
+  shared file  the old setup, one NoteStore (assistant_memory.json + journal) per process.
+               Every session sees every user's notes, and compactions from different
+               processes overwrite each other's snapshot.
+  per-user     nexus_notes.UserNoteStore (SQLite, one namespace per user).
+
+Writes that raise are counted as errors. Afterwards all notes are read back: a note is
+lost if it is missing, and leaked if it shows up in another user's view.
+
+Run from the project root:  python benchmarks/bench_user_notes.py
+"""
+import multiprocessing
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nexus_notes import NoteStore, UserNoteStore
+
+PROCESSES = 4
+THREADS = 8
+NOTES_PER_SESSION = 50
+# Small, so the shared-file journal is folded into the snapshot often during the run
+COMPACT_EVERY = 25
+
+
+def note_for(user, index):
+    return {'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'note': f"{user} note {index}"}
+
+
+def run_sessions(save, process_index):
+    """Runs THREADS sessions in this process; returns the write latencies in ms and the number of failed writes."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def session(user):
+        mine = []
+        failed = 0
+        for index in range(NOTES_PER_SESSION):
+            started = time.perf_counter()
+            try:
+                save(user, note_for(user, index))
+            except Exception:
+                failed += 1
+            mine.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=session, args=(f"user{process_index}-{t}",)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def shared_file_worker(args):
+    workdir, process_index = args
+    store = NoteStore(Path(workdir) / "assistant_memory.json", compact_every=COMPACT_EVERY)
+    try:
+        store.load()
+    except OSError:
+        # Another process renamed the shared journal away mid-write; this process carries on
+        pass
+    return run_sessions(lambda user, note: store.append(note), process_index)
+
+
+def per_user_worker(args):
+    workdir, process_index = args
+    store = UserNoteStore(Path(workdir) / "web_notes.db")
+    return run_sessions(lambda user, note: store.view(user).add(note), process_index)
+
+
+def run(name, worker, read_back):
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        with multiprocessing.Pool(PROCESSES) as pool:
+            parts = pool.map(worker, [(workdir, p) for p in range(PROCESSES)])
+        latencies = [ms for part, _ in parts for ms in part]
+        errors = sum(failed for _, failed in parts)
+        elapsed = time.perf_counter() - started
+        lost, leaked = read_back(Path(workdir))
+
+    total = PROCESSES * THREADS * NOTES_PER_SESSION
+    p95 = sorted(latencies)[int(len(latencies) * 0.95)]
+    print(f"{name:<12} {total} writes in {elapsed:5.2f}s ({total / elapsed:6.0f}/s)  "
+          f"p50 {statistics.median(latencies):6.2f} ms  p95 {p95:6.2f} ms  errors {errors:4d}  lost {lost:5d}  "
+          f"leaked {leaked:6d}")
+
+
+def users():
+    return [f"user{p}-{t}" for p in range(PROCESSES) for t in range(THREADS)]
+
+
+def read_back_shared(workdir):
+    notes = NoteStore(workdir / "assistant_memory.json").load()
+    saved = {n['note'] for n in notes}
+    lost = sum(1 for user in users() for i in range(NOTES_PER_SESSION) if f"{user} note {i}" not in saved)
+    # One shared list: every user sees every other user's notes
+    leaked = sum(len(saved) - sum(1 for note in saved if note.startswith(user + " ")) for user in users())
+    return lost, leaked
+
+
+def read_back_per_user(workdir):
+    store = UserNoteStore(workdir / "web_notes.db")
+    lost = leaked = 0
+    for user in users():
+        seen = {n['note'] for n in store.view(user).notes}
+        lost += sum(1 for i in range(NOTES_PER_SESSION) if f"{user} note {i}" not in seen)
+        leaked += sum(1 for note in seen if not note.startswith(user + " "))
+    store.close()
+    return lost, leaked
+
+
+if __name__ == "__main__":
+    print(f"{PROCESSES} processes x {THREADS} sessions x {NOTES_PER_SESSION} notes, each session its own user\n")
+    run("shared file", shared_file_worker, read_back_shared)
+    run("per-user", per_user_worker, read_back_per_user)
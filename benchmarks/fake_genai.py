@@ -0,0 +1,270 @@
+"""Local stand-in for genai.Client, for exercising Nexus code paths without an API key or network.
+
+FakeClient supports the subset of the SDK the app uses: client.chats.create() (send_message,
+send_message_stream, get_history, record_history), client.models.generate_content() and
+their async versions under client.aio.
+Responses are real google.genai types, so nexus_core.AgentCore's tool loop treats them like
+live ones. Errors are real google.genai.errors.ClientError or ServerError instances, including the
+RetryInfo detail the API sends with a 429.
+
+    client = FakeClient(latency=0.2, quota=(10, 1.0))   # 10 requests per second, then 429s
+    client = FakeClient(fail_first=3)                   # the first three requests fail with 429
+    client = FakeClient(fail_first=10**9, fail_code=503) # an outage
+
+install(client) makes genai.Client() return the fake, so unmodified front-end code picks it up.
+"""
+import asyncio
+import re
+import threading
+import time
+from collections import deque
+
+from google.genai import errors, types
+
+
+def quota_error(retry_delay=1.0):
+    """The 429 RESOURCE_EXHAUSTED error Gemini returns when a quota is used up."""
+    return errors.ClientError(429, {'error': {
+        'code': 429,
+        'status': 'RESOURCE_EXHAUSTED',
+        'message': 'You exceeded your current quota.',
+        'details': [{'@type': 'type.googleapis.com/google.rpc.RetryInfo', 'retryDelay': f'{retry_delay:.1f}s'}],
+    }})
+
+
+def server_error(code=503):
+    """A 5xx like the API returns while overloaded or down."""
+    return errors.ServerError(code, {'error': {'code': code, 'status': 'UNAVAILABLE',
+                                               'message': 'The model is overloaded. Please try again later.'}})
+
+
+def echo_responder(history, contents):
+    """Default reply: a short sentence quoting the last user text."""
+    text = " ".join(p.text for p in contents.parts if p.text) or "that"
+    return f"You said: {text}. This is a scripted reply from the fake backend."
+
+
+FILLER = ("Nexus is a scripted stand-in answer used for offline benchmarks and it keeps talking "
+          "for a realistic number of words so streaming, speech buffering and rendering all have work to do").split()
+
+
+class ScriptedResponder:
+    """Replies by rule instead of echoing.
+
+    `tool_rules` is a list of (regex, tool name, args): a prompt matching a rule gets a
+    function call to that tool, and the tool's response then gets a text answer. Every
+    other prompt gets a plain answer of `words` words.
+    """
+
+    def __init__(self, tool_rules=(), words=40):
+        self.tool_rules = [(re.compile(pattern, re.I), name, args) for pattern, name, args in tool_rules]
+        self.words = words
+
+    def _text(self, opening):
+        filler = (FILLER * (self.words // len(FILLER) + 1))[:self.words]
+        return f"{opening} " + " ".join(filler) + "."
+
+    def __call__(self, history, contents):
+        tool_results = [p.function_response for p in contents.parts if p.function_response]
+        if tool_results:
+            return self._text(f"The {tool_results[0].name} tool returned {str(tool_results[0].response)[:60]}.")
+        prompt = " ".join(p.text for p in contents.parts if p.text)
+        for pattern, name, args in self.tool_rules:
+            if pattern.search(prompt):
+                return [types.Part(function_call=types.FunctionCall(name=name, args=dict(args)))]
+        return self._text("Here is what I know.")
+
+
+def install(client):
+    """Makes genai.Client(...) return `client` until the returned function is called to undo it."""
+    from google import genai
+
+    original = genai.Client
+    genai.Client = lambda *args, **kwargs: client
+
+    def uninstall():
+        genai.Client = original
+    return uninstall
+
+
+def _to_content(contents):
+    items = contents if isinstance(contents, list) else [contents]
+    parts = [types.Part(text=item) if isinstance(item, str) else item for item in items]
+    return types.Content(role='user', parts=parts)
+
+
+def _estimate(text):
+    return max(1, len(text) // 4)
+
+
+class FakeChat:
+    def __init__(self, client, history=None):
+        self.client = client
+        self.history = list(history or [])
+
+    def get_history(self, curated=False):
+        return list(self.history)
+
+    def record_history(self, user_input, model_output, is_valid):
+        self.history.append(user_input)
+        self.history.extend(model_output)
+
+    def send_message(self, message, config=None):
+        user = _to_content(message)
+        parts = self.client._respond(self.history, user)
+        time.sleep(self.client.latency)
+        self.history.extend([user, types.Content(role='model', parts=parts)])
+        return self.client._response(parts, self.history)
+
+    def send_message_stream(self, message, config=None):
+        user = _to_content(message)
+        parts = self.client._respond(self.history, user)
+        time.sleep(self.client.latency)
+        streamed = []
+        for index, chunk_parts in enumerate(self.client._chunks(parts)):
+            if index:
+                time.sleep(self.client.chunk_delay)
+            streamed.append(types.Content(role='model', parts=chunk_parts))
+            yield self.client._response(chunk_parts, None)
+        # Like the SDK, the history gets one model Content per streamed chunk
+        self.history.extend([user] + streamed)
+        # Usage is reported on the final chunk, like the real API
+        yield self.client._response([], self.history)
+
+
+class FakeAsyncChat(FakeChat):
+    """client.aio.chats.create(): the same conversation, with awaitable requests and asyncio.sleep latency."""
+
+    async def send_message(self, message, config=None):
+        user = _to_content(message)
+        parts = self.client._respond(self.history, user)
+        await asyncio.sleep(self.client.latency)
+        self.history.extend([user, types.Content(role='model', parts=parts)])
+        return self.client._response(parts, self.history)
+
+    async def send_message_stream(self, message, config=None):
+        user = _to_content(message)
+        # Like the SDK, the request is only sent once the returned iterator is consumed
+
+        async def chunks():
+            parts = self.client._respond(self.history, user)
+            await asyncio.sleep(self.client.latency)
+            streamed = []
+            for index, chunk_parts in enumerate(self.client._chunks(parts)):
+                if index:
+                    await asyncio.sleep(self.client.chunk_delay)
+                streamed.append(types.Content(role='model', parts=chunk_parts))
+                yield self.client._response(chunk_parts, None)
+            self.history.extend([user] + streamed)
+            yield self.client._response([], self.history)
+        return chunks()
+
+
+class _FakeChats:
+    def __init__(self, client, chat_class=FakeChat):
+        self.client = client
+        self.chat_class = chat_class
+
+    def create(self, model=None, config=None, history=None):
+        return self.chat_class(self.client, history)
+
+
+class _FakeModels:
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, model=None, contents=None, config=None):
+        user = _to_content(contents)
+        parts = self.client._respond([], user)
+        time.sleep(self.client.latency)
+        return self.client._response(parts, [user, types.Content(role='model', parts=parts)])
+
+
+class _FakeAsyncModels(_FakeModels):
+    async def generate_content(self, model=None, contents=None, config=None):
+        user = _to_content(contents)
+        parts = self.client._respond([], user)
+        await asyncio.sleep(self.client.latency)
+        return self.client._response(parts, [user, types.Content(role='model', parts=parts)])
+
+
+class _FakeAio:
+    def __init__(self, client):
+        self.chats = _FakeChats(client, FakeAsyncChat)
+        self.models = _FakeAsyncModels(client)
+
+
+class FakeClient:
+    """Scripted replies with configurable latency and injected 429s.
+
+    `responder(history, user_content)` returns the reply as a string or a list of
+    types.Part. `latency` is the time to the first chunk, `chunk_delay` the gap between
+    streamed chunks. `quota=(requests, window_seconds)` rejects requests beyond that rate,
+    `fail_first` rejects the first n requests outright with a `fail_code` error.
+    """
+
+    def __init__(self, responder=echo_responder, latency=0.0, chunk_delay=0.0, chunk_words=4,
+                 quota=None, fail_first=0, fail_code=429, retry_delay=1.0):
+        self.responder = responder
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_words = chunk_words
+        self.quota = quota
+        self.fail_first = fail_first
+        self.fail_code = fail_code
+        self.retry_delay = retry_delay
+        self.lock = threading.Lock()
+        self.recent_requests = deque()
+        self.requests = 0
+        self.rejected = 0
+        self.chats = _FakeChats(self)
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+
+    def _admit(self):
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            if self.requests <= self.fail_first:
+                self.rejected += 1
+                raise quota_error(self.retry_delay) if self.fail_code == 429 else server_error(self.fail_code)
+            if self.quota is not None:
+                limit, window = self.quota
+                while self.recent_requests and now - self.recent_requests[0] >= window:
+                    self.recent_requests.popleft()
+                if len(self.recent_requests) >= limit:
+                    self.rejected += 1
+                    raise quota_error(window - (now - self.recent_requests[0]))
+                self.recent_requests.append(now)
+
+    def _respond(self, history, user):
+        """Admits the request and returns the reply parts; the caller simulates the latency."""
+        self._admit()
+        reply = self.responder(history, user)
+        return [types.Part(text=reply)] if isinstance(reply, str) else list(reply)
+
+    def _chunks(self, parts):
+        """Splits text parts into a few words per chunk; other parts go out whole."""
+        for part in parts:
+            if part.text is None:
+                yield [part]
+                continue
+            words = part.text.split(" ")
+            for start in range(0, len(words), self.chunk_words):
+                text = " ".join(words[start:start + self.chunk_words])
+                yield [types.Part(text=text if start + self.chunk_words >= len(words) else text + " ")]
+
+    def _response(self, parts, history):
+        usage = None
+        if history is not None:
+            counts = [sum(_estimate(str(p.text or p.function_call or p.function_response)) for p in c.parts or [])
+                      for c in history]
+            # The model contents after the last user content are the reply (one per chunk when streamed)
+            reply = len(history)
+            while reply > 1 and history[reply - 1].role == 'model':
+                reply -= 1
+            usage = types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=sum(counts[:reply]), candidates_token_count=sum(counts[reply:]),
+                total_token_count=sum(counts))
+        candidate = types.Candidate(content=types.Content(role='model', parts=parts or None))
+        return types.GenerateContentResponse(candidates=[candidate], usage_metadata=usage)
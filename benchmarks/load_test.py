@@ -0,0 +1,385 @@
+"""Offline latency, throughput and memory benchmark for Nexus, against benchmarks/fake_genai.
+
+Every scenario runs with a FakeClient (scripted replies, scripted tool calls, fixed
+latency per request) installed in place of genai.Client, so no API key or network is
+needed and results are repeatable.
+
+Scenarios:
+  core     Sessions driving the shared agent core (AgentCore + CallGuard) through its sync adapter,
+           plus CONVERSATIONS conversations run concurrently on its event loop.
+  web      web_app.py run headless through streamlit.testing (AppTest): each turn is a chat_input
+           submission, so the full rerun including handle_full_request is measured.
+  desktop  AssistantApp.handle_command on a headless AssistantApp (no window, no speech engine).
+
+Each reports p50/p95/p99 turn latency for plain and tool-calling turns, the tool-loop
+overhead (a tool turn minus a plain turn minus the extra model round trip), memory growth
+over a long session, and throughput with SESSIONS concurrent sessions (core and web).
+Scenarios whose front-end dependencies are not installed are skipped. The front-ends'
+own CallGuards (10 requests per minute) are swapped for unlimited ones, since the fake
+backend has no quota to protect.
+
+Run from the project root:
+  python benchmarks/load_test.py                                  # all scenarios
+  python benchmarks/load_test.py --only core --save results.json  # record a baseline
+  python benchmarks/load_test.py --baseline results.json          # exit 1 on a regression
+"""
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import nexus_retry
+from fake_genai import FakeClient, ScriptedResponder, install
+from nexus_agent import LatencyStats
+from nexus_core import AgentCore
+from nexus_retry import CallGuard, RateLimiter
+
+# Seconds the fake backend takes per request (time to first chunk) and between streamed chunks
+LATENCY = 0.05
+CHUNK_DELAY = 0.002
+REPLY_WORDS = 60
+
+TURNS = 20
+LONG_TURNS = 200
+SESSIONS = 8
+# Conversations awaited at once on the agent core's single event loop
+CONVERSATIONS = 500
+
+# A metric this much worse than the baseline fails the regression gate
+TOLERANCE = 0.20
+
+TOOL_RULES = [
+    (r"\bclock\b", "check_current_time", {}),
+    (r"\bsister\b", "retrieve_personal_notes", {"query": "sister"}),
+]
+
+
+# Plain prompts are numbered across the whole run so the response cache never answers them
+_ROUNDS = itertools.count()
+
+
+def plain_prompt(i):
+    return f"Explain how solid state drives store data, round {next(_ROUNDS)}"
+
+
+def tool_prompt(i):
+    return ("Glance at the clock for me before round {i} starts" if i % 2 else
+            "What did I tell you about my sister, round {i}?").format(i=i)
+
+
+def fake_client():
+    return FakeClient(ScriptedResponder(TOOL_RULES, words=REPLY_WORDS), latency=LATENCY, chunk_delay=CHUNK_DELAY)
+
+
+class UnlimitedCallGuard(CallGuard):
+    """A CallGuard whose default limiter never throttles."""
+
+    def __init__(self, limiter=None, **kwargs):
+        super().__init__(limiter or RateLimiter(10**9, 10**12), **kwargs)
+
+
+def unlimited_guard():
+    # The fake has no quota; the guard is still in the path so its overhead is part of the numbers
+    return UnlimitedCallGuard()
+
+
+class Results:
+    """Latency samples per turn kind plus scalar metrics, flattened to one dict for the report and the gate."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stats = LatencyStats(window=100_000)
+        self.metrics = {}
+
+    def timed(self, kind, func):
+        started = time.perf_counter()
+        func()
+        self.stats.record(kind, time.perf_counter() - started)
+
+    def summary(self):
+        out = {}
+        for kind in ("plain", "tool"):
+            for point, ms in self.stats.percentiles(kind, (50, 95, 99)).items():
+                out[f"{self.name}.{kind}.p{point}_ms"] = round(ms, 2)
+        plain = self.stats.percentiles("plain", (50,))
+        tool = self.stats.percentiles("tool", (50,))
+        if plain and tool:
+            out[f"{self.name}.tool_loop_overhead_ms"] = round(tool[50] - plain[50] - LATENCY * 1000, 2)
+        out.update({f"{self.name}.{key}": value for key, value in self.metrics.items()})
+        return out
+
+
+def measure_memory(run_turns):
+    """KB of Python heap growth per turn over LONG_TURNS turns (after a short warm-up)."""
+    run_turns(5)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    run_turns(LONG_TURNS)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return round((after - before) / 1024 / LONG_TURNS, 2)
+
+
+def measure_throughput(run_session):
+    """Turns per second with SESSIONS sessions running TURNS turns each at the same time."""
+    threads = [threading.Thread(target=run_session) for _ in range(SESSIONS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return round(SESSIONS * TURNS / (time.perf_counter() - started), 1)
+
+
+# --- core: the turn loop both front-ends are built on ---
+
+def core_tools():
+    def check_current_time():
+        """Returns the current local time."""
+        return time.strftime("The current time is %I:%M %p")
+
+    def retrieve_personal_notes(query: str):
+        """Searches the stored personal notes."""
+        return f"No notes about {query}."
+
+    return {f.__name__: f for f in (check_current_time, retrieve_personal_notes)}
+
+
+def core_turn(core, chat, prompt):
+    for event in core.stream(chat, prompt):
+        pass
+
+
+def run_core():
+    client = fake_client()
+    core = AgentCore(core_tools(), guard=unlimited_guard())
+    results = Results("core")
+
+    chat = client.aio.chats.create()
+    for i in range(TURNS):
+        results.timed("plain", lambda: core_turn(core, chat, plain_prompt(i)))
+        results.timed("tool", lambda: core_turn(core, chat, tool_prompt(i)))
+
+    long_chat = client.aio.chats.create()
+
+    def long_session(turns):
+        for i in range(turns):
+            core_turn(core, long_chat, plain_prompt(i))
+    results.metrics["memory_kb_per_turn"] = measure_memory(long_session)
+
+    def session():
+        session_chat = client.aio.chats.create()
+        for i in range(TURNS):
+            core_turn(core, session_chat, plain_prompt(i) if i % 2 else tool_prompt(i))
+    results.metrics["throughput_turns_per_s"] = measure_throughput(session)
+
+    # One turn each for many conversations at once, with no thread per conversation
+    async def many():
+        prompts = [plain_prompt(i) if i % 2 else tool_prompt(i) for i in range(CONVERSATIONS)]
+        await asyncio.gather(*(core.run(client.aio.chats.create(), prompt) for prompt in prompts))
+    started = time.perf_counter()
+    core.submit(many()).result()
+    results.metrics["concurrent_turns_per_s"] = round(CONVERSATIONS / (time.perf_counter() - started), 1)
+    results.metrics["threads"] = threading.active_count()
+    return results
+
+
+# --- web: web_app.py through Streamlit's headless AppTest ---
+
+def run_web():
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    client = fake_client()
+    uninstall = install(client)
+    # web_app.py imports CallGuard on every rerun, so its cached call_guard() builds an unlimited one
+    nexus_retry.CallGuard = UnlimitedCallGuard
+    # Process-wide resources (client provider, guard, caches) must be built around the fake
+    st.cache_resource.clear()
+    results = Results("web")
+
+    def new_session():
+        app = AppTest.from_file(str(ROOT / "web_app.py"), default_timeout=120)
+        app.run()
+        return app
+
+    def submit(app, prompt):
+        app.chat_input[0].set_value(prompt).run()
+        if app.exception:
+            raise RuntimeError(f"web_app.py raised: {app.exception[0].value}")
+
+    try:
+        app = new_session()
+        for i in range(TURNS):
+            results.timed("plain", lambda: submit(app, plain_prompt(i)))
+            results.timed("tool", lambda: submit(app, tool_prompt(i)))
+
+        long_app = new_session()
+
+        def long_session(turns):
+            for i in range(turns):
+                submit(long_app, plain_prompt(i))
+        results.metrics["memory_kb_per_turn"] = measure_memory(long_session)
+
+        def session():
+            session_app = new_session()
+            for i in range(TURNS):
+                submit(session_app, plain_prompt(i) if i % 2 else tool_prompt(i))
+        results.metrics["throughput_turns_per_s"] = measure_throughput(session)
+    finally:
+        uninstall()
+        nexus_retry.CallGuard = CallGuard
+        st.cache_resource.clear()
+    return results
+
+
+# --- desktop: AssistantApp.handle_command without a window ---
+
+class _ImmediateMaster:
+    """Runs master.after() callbacks right away on the calling thread."""
+
+    def after(self, ms, func=None, *args):
+        if func is not None:
+            func(*args)
+
+    def quit(self):
+        pass
+
+
+class _Silent:
+    """Accepts and ignores any widget or speech call."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def headless_app():
+    import nexus_v2_0
+
+    nexus_v2_0.global_app_speak = lambda text: None
+    nexus_v2_0.CALL_GUARD = unlimited_guard()
+    nexus_v2_0.AGENT = AgentCore(nexus_v2_0.AVAILABLE_TOOLS, guard=nexus_v2_0.CALL_GUARD)
+
+    class HeadlessAssistant(nexus_v2_0.AssistantApp):
+        def __init__(self):
+            self.master = _ImmediateMaster()
+            self.status_label = _Silent()
+            self.trace_label = _Silent()
+            self.speech = _Silent()
+            self.chat_ready = False
+            self.chat = None
+            self.gemini_ready = threading.Event()
+            self.gemini_init_seconds = None
+            self.init_gemini()
+
+        def log_message(self, message, tag=None):
+            pass
+
+        def append_to_log(self, text, tag=None):
+            pass
+
+        def stop_loading_animation(self):
+            pass
+
+    return HeadlessAssistant()
+
+
+def run_desktop():
+    client = fake_client()
+    uninstall = install(client)
+    results = Results("desktop")
+    try:
+        app = headless_app()
+        if not app.chat_ready:
+            raise RuntimeError("AssistantApp did not initialise the (fake) Gemini client")
+        for i in range(TURNS):
+            results.timed("plain", lambda: app.handle_command(plain_prompt(i)))
+            results.timed("tool", lambda: app.handle_command(tool_prompt(i)))
+
+        def long_session(turns):
+            for i in range(turns):
+                app.handle_command(plain_prompt(i))
+        results.metrics["memory_kb_per_turn"] = measure_memory(long_session)
+    finally:
+        uninstall()
+    return results
+
+
+SCENARIOS = {
+    "core": (run_core, ()),
+    "web": (run_web, ("streamlit",)),
+    "desktop": (run_desktop, ("customtkinter",)),
+}
+
+
+def compare(current, baseline, tolerance):
+    """Returns the metrics that got worse than the baseline by more than `tolerance`."""
+    regressions = []
+    for key, value in current.items():
+        old = baseline.get(key)
+        if old is None or old <= 0:
+            continue
+        # The tool-loop overhead is a difference of two medians, too noisy to gate on
+        if key.endswith("overhead_ms"):
+            continue
+        # Throughput should go up; latency and memory should go down
+        worse = value < old * (1 - tolerance) if key.endswith("per_s") else value > old * (1 + tolerance)
+        if worse:
+            regressions.append(f"{key}: {old} -> {value}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="comma-separated scenarios to run")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file and exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    # The front-ends keep their notes, history and caches in the working directory
+    workdir = tempfile.mkdtemp(prefix="nexus-load-test-")
+    os.chdir(workdir)
+
+    summary = {}
+    for name in args.only.split(","):
+        run, requirements = SCENARIOS[name]
+        missing = [module for module in requirements if importlib.util.find_spec(module) is None]
+        if missing:
+            print(f"[{name}] skipped: {', '.join(missing)} not installed")
+            continue
+        started = time.perf_counter()
+        results = run().summary()
+        print(f"[{name}] finished in {time.perf_counter() - started:.1f}s")
+        for key, value in results.items():
+            print(f"  {key:<40} {value}")
+        summary.update(results)
+
+    if args.save:
+        with open(Path(args.save) if Path(args.save).is_absolute() else ROOT / args.save, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    if args.baseline:
+        path = Path(args.baseline) if Path(args.baseline).is_absolute() else ROOT / args.baseline
+        with open(path, "r", encoding="utf-8") as f:
+            regressions = compare(summary, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions beyond the tolerance:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import datetime
+import threading
+from collections import deque
+
+# --- Shared Gemini turn helpers used by both Nexus front-ends ---
+
+# Seconds a tool may run before the model is told it timed out (override per tool with tool_options).
+TOOL_TIMEOUT_SECONDS = 20
+
+
+# Token cost assumed for an inline image or file part when estimating a request for the rate limiter
+MEDIA_PART_TOKENS = 258
+
+
+def estimate_request_tokens(chat, contents):
+    """Rough prompt size of sending contents to chat: the whole history goes with every message."""
+    from nexus_history import content_tokens, estimate_tokens
+
+    total = sum(content_tokens(c) for c in chat.get_history())
+    for item in contents if isinstance(contents, list) else [contents]:
+        if isinstance(item, str):
+            total += estimate_tokens(item)
+        elif getattr(item, 'text', None):
+            total += estimate_tokens(item.text)
+        elif getattr(item, 'function_response', None):
+            total += estimate_tokens(str(item.function_response))
+        else:
+            total += MEDIA_PART_TOKENS
+    return total
+
+
+def chunk_parts(chunk):
+    """Returns the content parts of a single (streamed) response chunk, or an empty list."""
+    if not chunk.candidates:
+        return []
+    content = chunk.candidates[0].content
+    if content is None or not content.parts:
+        return []
+    return content.parts
+
+
+class LatencyStats:
+    """Thread-safe rolling latency samples per key, reported as percentiles."""
+
+    def __init__(self, window=500):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, key, seconds):
+        with self.lock:
+            self.samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentiles(self, key, points=(50, 95, 99)):
+        """Returns {point: milliseconds} for the samples recorded under key (empty if none)."""
+        with self.lock:
+            values = sorted(self.samples.get(key, ()))
+        if not values:
+            return {}
+        return {p: values[min(len(values) - 1, int(len(values) * p / 100))] * 1000 for p in points}
+
+    def report(self):
+        """One line per key: count, p50 and p95 in milliseconds."""
+        with self.lock:
+            keys = sorted(self.samples)
+            counts = {k: len(self.samples[k]) for k in keys}
+        lines = []
+        for key in keys:
+            pct = self.percentiles(key, (50, 95))
+            lines.append(f"{key}: n={counts[key]} p50={pct[50]:.1f}ms p95={pct[95]:.1f}ms")
+        return "\n".join(lines)
+
+
+# --- The Nexus desktop assistant, shared with batch mode (nexus_batch) ---
+
+MODEL_NAME = 'gemini-2.5-flash'
+SYSTEM_INSTRUCTION = "You are a dedicated, efficient, and slightly witty personal AI assistant named 'Nexus'. You use clear, concise language and always mention which tool you are using before providing the final answer, especially when performing a task for the user."
+
+
+def read_only_tools(notes, announce=None, open_links=True):
+    """The assistant's tools without lasting side effects, over a nexus_notes.NoteIndex.
+
+    `announce(text)` receives the spoken feedback. With open_links=False the web tools
+    answer with a link instead of opening the browser, so a replayed log opens nothing.
+    """
+    def say(text):
+        if announce is not None:
+            announce(text)
+
+    def web_search(query: str):
+        """Searches the web using Google and opens the default browser to the search results."""
+        say(f"Searching the web for: {query}")
+        if not open_links:
+            return f"Search results for '{query}': https://www.google.com/search?q={query}"
+        try:
+            import pywhatkit
+            pywhatkit.search(query)
+            return f"I have opened your default browser to the search results for '{query}'."
+        except Exception as e:
+            return f"Error opening the web browser: {e}"
+
+    def play_on_youtube(topic: str):
+        """Opens YouTube and plays a video related to the given topic."""
+        say(f"Attempting to play '{topic}' on YouTube.")
+        if not open_links:
+            return f"YouTube results for '{topic}': https://www.youtube.com/results?search_query={topic}"
+        try:
+            import pywhatkit
+            pywhatkit.playonyt(topic)
+            return f"Video for '{topic}' is now playing on YouTube."
+        except Exception as e:
+            return f"I was unable to play the video on YouTube: {e}"
+
+    def check_current_time():
+        """Returns the current local time."""
+        now = datetime.datetime.now().strftime("%I:%M %p")
+        return f"The current time is {now}"
+
+    def retrieve_personal_notes(query: str):
+        """Searches the stored personal notes and returns only the ones most relevant to the query."""
+        if not len(notes):
+            return "I have no personal notes saved yet."
+        return notes.retrieve(query)
+
+    return {f.__name__: f for f in (web_search, play_on_youtube, check_current_time, retrieve_personal_notes)}
+
+
+# --- Tool Execution ---
+
+def tool_options(thread_safe=True, timeout=None):
+    """Decorator for tool functions: marks them as not thread-safe and/or sets a custom timeout."""
+    def decorate(func):
+        func.thread_safe = thread_safe
+        func.timeout = timeout
+        return func
+    return decorate
+
+
+class ToolResult:
+    def __init__(self, name, result, error=None, elapsed=0.0):
+        self.name = name
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+
+    def to_part(self):
+        from google.genai import types
+
+        return types.Part.from_function_response(name=self.name, response={'result': self.result})
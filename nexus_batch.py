@@ -0,0 +1,226 @@
+"""Headless batch mode: runs a file of prompts through the Nexus tool loop and writes the results as JSONL.
+
+Input is a JSONL file with one {"id": ..., "prompt": ...} object per line (a bare JSON
+string is a prompt too, and "id" defaults to the line number), or a chat_history.json
+style list, whose user turns are replayed. Every prompt gets its own chat and goes
+through the same AgentCore tool loop and CallGuard the desktop app's handle_command
+uses, with at most --concurrency prompts in flight and --timeout seconds per prompt.
+
+Each result is appended (and flushed) to the output file as soon as it finishes, so an
+interrupted run continues where it stopped: prompts whose id already has an "ok"
+result are skipped; failed and timed-out ones run again.
+
+The model, system instruction and tools are the desktop assistant's (nexus_agent), but
+only the ones without side effects (time, note lookup, search links), so replaying a log
+never opens browsers or saves notes.
+
+  python nexus_batch.py chat_history.json -o replay.jsonl
+  python nexus_batch.py prompts.jsonl -o results.jsonl --concurrency 16 --timeout 30
+  python nexus_batch.py prompts.jsonl -o results.jsonl --fake      # offline, no API key
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from nexus_agent import MODEL_NAME, SYSTEM_INSTRUCTION, LatencyStats, read_only_tools
+from nexus_client import build_tool_declarations
+from nexus_core import AgentCore
+from nexus_notes import NoteIndex, NoteStore
+from nexus_retry import REQUESTS_PER_MINUTE, CallGuard, RateLimiter
+from nexus_trace import Tracer
+
+# --- Configuration ---
+
+MEMORY_FILE = Path("assistant_memory.json")
+
+BATCH_CONCURRENCY = 4
+BATCH_TIMEOUT_SECONDS = 120
+
+# Tool calls the offline backend (--fake) makes for matching prompts
+FAKE_TOOL_RULES = [
+    (r"\b(time|clock)\b", "check_current_time", {}),
+    (r"\b(remember|my notes|about me)\b", "retrieve_personal_notes", {"query": "personal"}),
+]
+
+
+# --- Side-effect-free tools ---
+
+def batch_tools(memory_file=MEMORY_FILE):
+    """The desktop's read-only tools over the desktop's notes file, with links instead of browser windows."""
+    notes = NoteIndex(NoteStore(memory_file).load() if memory_file.exists() else [])
+    return read_only_tools(notes, open_links=False)
+
+
+# --- Input / Output ---
+
+def read_prompts(path):
+    """Returns [(id, prompt)] from a JSONL prompt file or a chat_history.json list."""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if path.suffix == '.json':
+        history = json.loads(text)
+        return [(str(index), " ".join(p['text'] for p in entry['parts'] if p.get('text')))
+                for index, entry in enumerate(history)
+                if entry.get('role') == 'user' and any(p.get('text') for p in entry.get('parts', []))]
+    items = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            record = {'prompt': record}
+        items.append((str(record.get('id', line_number)), record['prompt']))
+    return items
+
+
+def completed_ids(path):
+    """Ids with an "ok" result in an existing output file (a torn last line is ignored)."""
+    done = set()
+    if not path.exists():
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('status') == 'ok':
+                done.add(record['id'])
+    return done
+
+
+# --- Batch Runner ---
+
+class BatchRunner:
+    """Runs prompts concurrently on an AgentCore's event loop and appends one JSON result per prompt."""
+
+    def __init__(self, client, core, config, output, concurrency=BATCH_CONCURRENCY, timeout=BATCH_TIMEOUT_SECONDS):
+        self.client = client
+        self.core = core
+        self.config = config
+        self.output = output
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.tracer = Tracer()
+        self.latency = LatencyStats(window=1_000_000)
+        self.statuses = {}
+
+    def run(self, items):
+        """Blocks until every item has a result; returns the summary dict."""
+        started = time.perf_counter()
+        with open(self.output, 'a', encoding='utf-8') as out:
+            if out.tell() and not self.output.read_bytes().endswith(b"\n"):
+                # An interrupted run may have left half a line; start after it
+                out.write("\n")
+            self.core.submit(self._run_all(items, out)).result()
+        return self.summary(len(items), time.perf_counter() - started)
+
+    async def _run_all(self, items, out):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._run_item(item_id, prompt, semaphore, out) for item_id, prompt in items))
+
+    async def _run_item(self, item_id, prompt, semaphore, out):
+        async with semaphore:
+            chat = self.client.aio.chats.create(model=MODEL_NAME, config=self.config)
+            trace = self.tracer.start_turn("batch", item=item_id)
+            record = {'id': item_id, 'prompt': prompt, 'status': 'ok', 'response': None, 'tools': []}
+            try:
+                async with asyncio.timeout(self.timeout):
+                    async for event in self.core.events(chat, prompt, trace=trace):
+                        if event.kind == 'tool_call':
+                            record['tools'].append(event.name)
+                        elif event.kind == 'done':
+                            record['response'] = event.text
+            except TimeoutError:
+                record.update(status='timeout', error=f"No answer within {self.timeout} seconds.")
+            except Exception as e:
+                record.update(status='error', error=f"{e.__class__.__name__}: {e}")
+            finally:
+                trace.finish()
+            record['latency_ms'] = round(trace.duration * 1000, 2)
+            record['tokens'] = dict(trace.tokens)
+            self.latency.record(record['status'], trace.duration)
+            self.statuses[record['status']] = self.statuses.get(record['status'], 0) + 1
+            # Written on the loop thread only, one whole line at a time
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+    def summary(self, count, seconds):
+        ok = self.latency.percentiles('ok', (50, 95, 99))
+        return {
+            'items': count,
+            'statuses': dict(self.statuses),
+            'seconds': round(seconds, 2),
+            'throughput_per_s': round(count / seconds, 2) if seconds else 0.0,
+            'latency_ms': {f"p{point}": round(ms, 1) for point, ms in ok.items()},
+            'tokens': dict(self.tracer.tokens),
+            'spans': self.tracer.rows(),
+        }
+
+
+def make_client(fake, latency):
+    if not fake:
+        from google import genai
+        return genai.Client()
+    sys.path.insert(0, str(Path(__file__).resolve().parent / "benchmarks"))
+    from fake_genai import FakeClient, ScriptedResponder
+    return FakeClient(ScriptedResponder(FAKE_TOOL_RULES), latency=latency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("input", type=Path, help="prompts (.jsonl) or a chat history (.json)")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="results JSONL; an existing file is resumed")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=BATCH_TIMEOUT_SECONDS, help="seconds per prompt")
+    parser.add_argument("--rpm", type=int, help=f"requests per minute (default {REQUESTS_PER_MINUTE}, unlimited with --fake)")
+    parser.add_argument("--summary", type=Path, help="also write the summary to this JSON file")
+    parser.add_argument("--fake", action="store_true", help="use the scripted offline backend from benchmarks/fake_genai")
+    parser.add_argument("--fake-latency", type=float, default=0.2, help="seconds per request of the offline backend")
+    args = parser.parse_args()
+
+    load_dotenv()
+    items = read_prompts(args.input)
+    done = completed_ids(args.output)
+    pending = [(item_id, prompt) for item_id, prompt in items if item_id not in done]
+    print(f"{len(items)} prompts, {len(items) - len(pending)} already done, running {len(pending)}")
+    if not pending:
+        return
+
+    from google.genai import types
+
+    tools = batch_tools()
+    config = types.GenerateContentConfig(tools=[build_tool_declarations(tools)], system_instruction=SYSTEM_INSTRUCTION)
+    if args.fake:
+        limiter = RateLimiter(args.rpm or 10**9, 10**12, max_wait=args.timeout)
+    else:
+        limiter = RateLimiter(args.rpm or REQUESTS_PER_MINUTE, max_wait=args.timeout)
+    core = AgentCore(tools, guard=CallGuard(limiter), turn_timeout=args.timeout)
+    runner = BatchRunner(make_client(args.fake, args.fake_latency), core, config, args.output,
+                         concurrency=args.concurrency, timeout=args.timeout)
+    try:
+        summary = runner.run(pending)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; finished results are in {args.output}. Run the same command again to resume.")
+        sys.exit(130)
+
+    latency = summary['latency_ms']
+    print(f"{summary['items']} prompts in {summary['seconds']:.1f}s ({summary['throughput_per_s']:.2f}/s), "
+          f"statuses {summary['statuses']}")
+    if latency:
+        print(f"latency p50 {latency['p50']:.0f} ms, p95 {latency['p95']:.0f} ms, p99 {latency['p99']:.0f} ms; "
+              f"{summary['tokens']['total']} tokens")
+    for row in summary['spans']:
+        print(f"  {row['span']:<28} n={row['n']:<5} p50 {row['p50 ms']:>8.1f} ms  p95 {row['p95 ms']:>8.1f} ms")
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from nexus_notes import atomic_write
+
+# --- Response cache for repeated prompts, shared by both Nexus front-ends ---
+
+RESPONSE_CACHE_TTL_SECONDS = 24 * 3600
+RESPONSE_CACHE_MAX_ENTRIES = 500
+
+# A turn that called any of these tools is never stored: the answer depends on state or the clock,
+# or the tool has a side effect the user expects to happen again.
+UNCACHEABLE_TOOLS = frozenset({
+    'add_personal_note', 'retrieve_personal_notes', 'set_reminder', 'list_reminders', 'cancel_reminder',
+    'check_current_time', 'take_quick_note', 'open_application', 'play_on_youtube', 'web_search',
+    'recall_earlier_conversation',
+})
+
+# Prompts that mention these are looked up and stored never: they are time-sensitive, stateful,
+# or refer back to the conversation ("what about it?") so the same words can mean something else.
+_BYPASS_WORDS = re.compile(
+    r"\b(?:now|today|tonight|tomorrow|yesterday|current|currently|latest|recent|news|weather|time|date|"
+    r"remember|remind|reminder|note|notes|my|me|i|it|this|that|these|those|they|them|he|she|again|"
+    r"more|previous|above|earlier|last)\b"
+)
+
+
+def normalize_prompt(prompt):
+    """Lowercases, drops punctuation and collapses whitespace so trivial variations share an entry."""
+    return " ".join(re.sub(r"[^\w\s]", " ", prompt.lower()).split())
+
+
+def context_fingerprint(*parts):
+    """Short hash of whatever besides the prompt shapes the answer (model, system instruction, ...)."""
+    return hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+
+def is_cacheable_prompt(prompt):
+    return bool(prompt.strip()) and not _BYPASS_WORDS.search(normalize_prompt(prompt))
+
+
+class ResponseCache:
+    """Exact-match cache of final model answers keyed on the normalized prompt and a context fingerprint.
+
+    Entries expire after `ttl` seconds and the least recently used ones are evicted beyond
+    `max_entries`. The cache is written to `path` (atomically) whenever it changes so it
+    survives restarts.
+    """
+
+    def __init__(self, path, ttl=RESPONSE_CACHE_TTL_SECONDS, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._load()
+
+    def get(self, prompt, fingerprint):
+        """Returns the cached answer, or None (a miss, or a prompt that must not be cached)."""
+        if not is_cacheable_prompt(prompt):
+            with self.lock:
+                self.bypassed += 1
+            return None
+        key = self._key(prompt, fingerprint)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry['stored'] > self.ttl:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry['response']
+
+    def put(self, prompt, fingerprint, response, tools_used=()):
+        """Stores a final answer unless the prompt or the tools it used make it unsafe to reuse."""
+        if not response or not is_cacheable_prompt(prompt) or UNCACHEABLE_TOOLS.intersection(tools_used):
+            return False
+        with self.lock:
+            key = self._key(prompt, fingerprint)
+            self.entries[key] = {'response': response, 'stored': time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._save()
+        return True
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self.entries),
+            }
+
+    @staticmethod
+    def _key(prompt, fingerprint):
+        return f"{fingerprint}:{normalize_prompt(prompt)}"
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: Could not read {self.path.name}, starting with an empty response cache: {e}")
+            return
+        now = time.time()
+        for key, entry in stored:
+            if now - entry['stored'] <= self.ttl:
+                self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _save(self):
+        atomic_write(self.path, json.dumps(list(self.entries.items()), ensure_ascii=False))
+
+
+def record_cached_turn(chat, prompt, response):
+    """Adds a cache-served exchange to the chat history so later turns still see it as context."""
+    from google.genai import types
+
+    chat.record_history(
+        user_input=types.Content(role='user', parts=[types.Part(text=prompt)]),
+        model_output=[types.Content(role='model', parts=[types.Part(text=response)])],
+        is_valid=True,
+    )
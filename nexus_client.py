@@ -0,0 +1,65 @@
+import threading
+
+# --- Process-wide Gemini client shared by every session ---
+
+
+def _create_client():
+    from google import genai
+
+    return genai.Client()
+
+
+def is_connection_error(error):
+    """True for failures a fresh client can fix: rejected credentials or a broken HTTP transport."""
+    import httpx
+    from google.genai import errors
+
+    if isinstance(error, errors.ClientError) and error.code in (401, 403):
+        return True
+    return isinstance(error, (httpx.TransportError, ConnectionError))
+
+
+class ClientProvider:
+    """Creates one genai.Client per process and hands the same instance to every caller.
+
+    The client (and its pooled HTTP connections) is safe to share between threads. When a
+    call fails with an auth or transport error the caller passes the failing client to
+    reset(); the next get() builds a new one. Only the first reset for a given client takes
+    effect, so many sessions failing at once still cause a single re-creation.
+    """
+
+    def __init__(self, factory=_create_client):
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.client = None
+        self.created = 0
+
+    def get(self):
+        with self.lock:
+            if self.client is None:
+                self.client = self.factory()
+                self.created += 1
+            return self.client
+
+    def reset(self, client):
+        """Drops `client` if it is still the current one. Returns True if this call dropped it."""
+        with self.lock:
+            if self.client is client:
+                self.client = None
+                return True
+        return False
+
+
+def build_tool_declarations(tools):
+    """Builds a types.Tool from the tool functions once, instead of inspecting every callable per session.
+
+    A config that holds declarations rather than callables also leaves executing the calls
+    to our own tool loop (the SDK's automatic function calling only runs for callables).
+    """
+    from google.genai import types
+
+    declarations = [
+        types.FunctionDeclaration.from_callable_with_api_option(callable=func)
+        for func in tools.values()
+    ]
+    return types.Tool(function_declarations=declarations)
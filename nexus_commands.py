@@ -0,0 +1,118 @@
+import heapq
+import itertools
+import threading
+import time
+
+# --- Command queue for the desktop assistant ---
+
+# Lower value runs first. Voice is preferred over typed-ahead text because the user is waiting on it.
+PRIORITY_VOICE = 0
+PRIORITY_TEXT = 1
+
+# Identical submissions within this many seconds are merged into one.
+COALESCE_SECONDS = 2.0
+
+
+class Command:
+    def __init__(self, text, source, priority, seq):
+        self.text = text
+        self.source = source
+        self.priority = priority
+        self.seq = seq
+        self.key = " ".join(text.lower().split())
+        self.submitted = time.monotonic()
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class CommandQueue:
+    """Runs commands one at a time on a single consumer thread, so the chat never sees two turns at once.
+
+    Commands are ordered by priority, then submission order. Submitting the same text again
+    while it is still pending (or was just started) is coalesced into the existing command.
+    A command submitted with `supersede=True` cancels the still-pending commands of the same
+    source. `on_depth(n)` is called from the worker or the submitting thread whenever the
+    number of waiting commands changes.
+    """
+
+    def __init__(self, handler, on_depth=None):
+        self.handler = handler
+        self.on_depth = on_depth
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.current = None
+        self.processed = 0
+        self.coalesced = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="nexus-commands", daemon=True)
+        self.thread.start()
+
+    def depth(self):
+        with self.condition:
+            return sum(1 for c in self.heap if not c.cancelled)
+
+    def submit(self, text, source="text", supersede=False):
+        """Queues a command. Returns the Command, or None if it was merged into an identical one."""
+        priority = PRIORITY_VOICE if source == "voice" else PRIORITY_TEXT
+        with self.condition:
+            command = Command(text, source, priority, next(self.counter))
+            if self._find_duplicate(command) is not None:
+                self.coalesced += 1
+                return None
+            if supersede:
+                for pending in self.heap:
+                    if pending.source == source:
+                        pending.cancelled = True
+            heapq.heappush(self.heap, command)
+            self.condition.notify()
+        self._report_depth()
+        return command
+
+    def cancel_pending(self):
+        """Cancels every command that has not started yet."""
+        with self.condition:
+            for pending in self.heap:
+                pending.cancelled = True
+        self._report_depth()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def _find_duplicate(self, command):
+        candidates = [c for c in self.heap if not c.cancelled]
+        if self.current is not None:
+            candidates.append(self.current)
+        for other in candidates:
+            if other.key == command.key and command.submitted - other.submitted < COALESCE_SECONDS:
+                return other
+        return None
+
+    def _report_depth(self):
+        if self.on_depth is not None:
+            self.on_depth(self.depth())
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.heap and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                command = heapq.heappop(self.heap)
+                if command.cancelled:
+                    continue
+                self.current = command
+            self._report_depth()
+            try:
+                self.handler(command.text)
+            except Exception as e:
+                print(f"Warning: Command '{command.text}' failed: {e}")
+            finally:
+                with self.condition:
+                    self.current = None
+                    self.processed += 1
@@ -0,0 +1,216 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nexus_agent import TOOL_TIMEOUT_SECONDS, ToolResult, chunk_parts, estimate_request_tokens
+
+# --- Async agent core shared by both Nexus front-ends ---
+
+# Synchronous tools run on a pool of this size; model requests never need a thread of their own.
+TOOL_WORKERS = 4
+# A whole turn (every model request and tool call in it) is cancelled after this many seconds.
+TURN_TIMEOUT_SECONDS = 180
+
+
+class TurnTimeout(Exception):
+    """A turn took longer than its timeout and was cancelled."""
+
+
+class AgentEvent:
+    """One step of a turn, as yielded by AgentCore.events() and AgentCore.stream().
+
+    kind is 'text' (a chunk of the reply in `text`), 'tool_call' (the model asked for the
+    tool `name`), 'tool_result' (`result` is its ToolResult) or 'done' (`text` is the
+    whole answer, including what the model said before its tool calls, `elapsed` the
+    turn's duration in seconds).
+    """
+
+    __slots__ = ('kind', 'text', 'name', 'result', 'elapsed')
+
+    def __init__(self, kind, text=None, name=None, result=None, elapsed=None):
+        self.kind = kind
+        self.text = text
+        self.name = name
+        self.result = result
+        self.elapsed = elapsed
+
+
+_serial_tool_lock = threading.Lock()
+
+
+def async_tool(func, pool):
+    """Adapts a tool to `await tool(**args)`.
+
+    Coroutine functions are used as they are. Plain functions run on `pool`; the ones
+    marked tool_options(thread_safe=False) never run at the same time as each other.
+    """
+    if asyncio.iscoroutinefunction(func):
+        return func
+
+    def call(args):
+        if getattr(func, 'thread_safe', True):
+            return func(**args)
+        with _serial_tool_lock:
+            return func(**args)
+
+    async def run(**args):
+        return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(call, args))
+    return run
+
+
+class AgentCore:
+    """Runs the send -> function calls -> tool responses loop for every conversation on one event loop.
+
+    The loop lives on a single background thread and talks to Gemini through the SDK's
+    async chats (client.aio.chats.create), so a process can serve many conversations at
+    once without a thread per request. Calls of one model turn run concurrently and each
+    has its own timeout; the turn as a whole has `turn_timeout`.
+
+    Front-ends use the sync adapter stream(), which yields AgentEvents on the calling
+    thread; closing that generator (or the timeout) cancels the turn. Async callers use
+    events() or run() directly on `loop`.
+    """
+
+    def __init__(self, tools=None, guard=None, tool_timeout=TOOL_TIMEOUT_SECONDS, turn_timeout=TURN_TIMEOUT_SECONDS):
+        self.tools = tools or {}
+        self.guard = guard
+        self.tool_timeout = tool_timeout
+        self.turn_timeout = turn_timeout
+        self.tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="nexus-tool")
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="nexus-agent-loop", daemon=True)
+        self.thread.start()
+
+    # --- Async API (runs on self.loop) ---
+
+    async def send(self, chat, contents, trace=None):
+        """Streams one model request. Yields text chunks, then a final list of function calls."""
+        started = time.perf_counter()
+        first_token = None
+        usage = None
+        function_calls = []
+        if self.guard is not None:
+            chunks = self.guard.astream(chat.send_message_stream, contents,
+                                        estimated_tokens=estimate_request_tokens(chat, contents))
+        else:
+            chunks = await chat.send_message_stream(contents)
+        try:
+            async for chunk in chunks:
+                if chunk.usage_metadata is not None:
+                    usage = chunk.usage_metadata
+                for part in chunk_parts(chunk):
+                    if part.function_call:
+                        function_calls.append(part.function_call)
+                    elif part.text and not part.thought:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        yield part.text
+        finally:
+            if trace is not None:
+                trace.record('model.send_message', time.perf_counter() - started, start=started,
+                             first_token_ms=None if first_token is None else round(first_token * 1000, 2),
+                             function_calls=len(function_calls))
+                trace.add_usage(usage)
+        yield function_calls
+
+    async def run_tools(self, function_calls, tools=None, trace=None):
+        """Runs the calls concurrently and returns a ToolResult for each, in call order.
+
+        Unknown tools, exceptions and timeouts become error results, so every function call
+        gets a matching function response.
+        """
+        tools = self.tools if tools is None else tools
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._run_tool(call, tools.get(call.name)) for call in function_calls))
+        if trace is not None:
+            for result in results:
+                trace.record(f"tool.{result.name}", result.elapsed, start=started, error=result.error is not None)
+        return list(results)
+
+    async def _run_tool(self, call, func):
+        name = call.name
+        if func is None:
+            message = f"The tool {name} does not exist."
+            return ToolResult(name, message, error=message)
+        timeout = getattr(func, 'timeout', None) or self.tool_timeout
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(async_tool(func, self.tool_pool)(**dict(call.args or {})), timeout)
+            return ToolResult(name, result, elapsed=time.perf_counter() - started)
+        except asyncio.TimeoutError:
+            # A thread-pool tool keeps running in the background; its result is discarded
+            message = f"The tool {name} did not finish within {timeout} seconds."
+            return ToolResult(name, message, error=message, elapsed=timeout)
+        except Exception as e:
+            message = f"An error occurred while running the tool {name}: {e}"
+            return ToolResult(name, message, error=message, elapsed=time.perf_counter() - started)
+
+    async def events(self, chat, contents, tools=None, trace=None):
+        """Async generator of the AgentEvents of one turn (the whole tool loop)."""
+        started = time.perf_counter()
+        # One entry per model round that said anything
+        segments = []
+        while True:
+            text_parts = []
+            async for item in self.send(chat, contents, trace):
+                if isinstance(item, str):
+                    text_parts.append(item)
+                    yield AgentEvent('text', text=item)
+                else:
+                    function_calls = item
+            if text_parts:
+                segments.append("".join(text_parts))
+            if not function_calls:
+                break
+            for call in function_calls:
+                yield AgentEvent('tool_call', name=call.name)
+            results = await self.run_tools(function_calls, tools, trace)
+            for result in results:
+                yield AgentEvent('tool_result', name=result.name, result=result)
+            contents = [result.to_part() for result in results]
+        yield AgentEvent('done', text="\n\n".join(segments), elapsed=time.perf_counter() - started)
+
+    async def run(self, chat, contents, tools=None, trace=None):
+        """Runs a turn to completion and returns its final answer text."""
+        async with asyncio.timeout(self.turn_timeout):
+            async for event in self.events(chat, contents, tools, trace):
+                if event.kind == 'done':
+                    return event.text
+
+    # --- Sync adapter for the Tk and Streamlit front-ends ---
+
+    def stream(self, chat, contents, tools=None, trace=None, timeout=None):
+        """Runs a turn on the core loop and yields its AgentEvents on the calling thread.
+
+        Raises TurnTimeout if the turn is not finished within `timeout` (default
+        turn_timeout) seconds. Closing the generator early cancels the turn.
+        """
+        agen = self.events(chat, contents, tools, trace)
+        deadline = time.monotonic() + (timeout or self.turn_timeout)
+        try:
+            while True:
+                future = asyncio.run_coroutine_threadsafe(self._next(agen, deadline - time.monotonic()), self.loop)
+                try:
+                    event = future.result()
+                except asyncio.TimeoutError:
+                    raise TurnTimeout(f"The request did not finish within {timeout or self.turn_timeout} seconds.")
+                if event is None:
+                    return
+                yield event
+        finally:
+            asyncio.run_coroutine_threadsafe(agen.aclose(), self.loop).result()
+
+    def submit(self, coro):
+        """Schedules a coroutine on the core loop from any thread; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    @staticmethod
+    async def _next(agen, remaining):
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+        try:
+            return await asyncio.wait_for(anext(agen), remaining)
+        except StopAsyncIteration:
+            return None
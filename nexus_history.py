@@ -0,0 +1,336 @@
+import json
+import sqlite3
+import threading
+import time
+
+# --- SQLite-backed chat history ---
+
+# Startup only loads the newest turns into the chat session, bounded by both limits.
+HISTORY_LOAD_TURNS = 40
+HISTORY_LOAD_TOKENS = 8000
+
+# Page size used when older history is requested
+HISTORY_PAGE_SIZE = 200
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return max(1, len(text) // 4)
+
+
+def content_to_parts(content):
+    """Keeps only the text parts of a types.Content, in the same shape chat_history.json used."""
+    return [{'text': part.text} for part in (content.parts or []) if part.text]
+
+
+def merge_text_parts(parts):
+    """Joins a list of {'text': ...} dicts into a single one."""
+    return [{'text': "".join(p['text'] for p in parts)}] if len(parts) > 1 else parts
+
+
+def _plain_text(part):
+    return part.text is not None and part.model_dump(exclude_none=True).keys() == {'text'}
+
+
+def coalesce_contents(contents):
+    """Merges consecutive same-role types.Content objects into one, joining adjacent plain text parts.
+
+    A streamed reply is recorded in the chat history as one model Content per chunk;
+    merged, every entry is one whole turn.
+    """
+    from google.genai import types
+
+    merged = []
+    for content in contents:
+        if merged and merged[-1].role == content.role:
+            parts = list(merged[-1].parts or [])
+        else:
+            merged.append(None)
+            parts = []
+        for part in content.parts or []:
+            if parts and _plain_text(parts[-1]) and _plain_text(part):
+                parts[-1] = types.Part(text=parts[-1].text + part.text)
+            else:
+                parts.append(part)
+        merged[-1] = types.Content(role=content.role, parts=parts)
+    return merged
+
+
+class ChatHistoryStore:
+    """Append-only chat history in SQLite (WAL mode).
+
+    Each turn is written as soon as it happens, so a crash loses at most the turn in
+    flight. Startup reads only the most recent window through an index, which keeps
+    load time flat no matter how long the history grows; older turns are paged on demand.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " role TEXT NOT NULL,"
+            " parts TEXT NOT NULL,"
+            " tokens INTEGER NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        self.conn.commit()
+        # Id of the oldest turn handed out by recent(); older turns are reached through page()
+        self.window_start_id = None
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+
+    def append(self, role, parts):
+        """Stores one turn. `parts` is a list of {'text': ...} dicts; empty turns are skipped."""
+        if not parts:
+            return None
+        tokens = sum(estimate_tokens(p['text']) for p in parts)
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO turns (role, parts, tokens, created) VALUES (?, ?, ?, ?)",
+                (role, json.dumps(parts, ensure_ascii=False), tokens, time.time()),
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def append_contents(self, contents):
+        """Stores a sequence of types.Content objects in order, one row per turn (non-text turns are skipped)."""
+        rows = []
+        for content in coalesce_contents(contents):
+            parts = merge_text_parts(content_to_parts(content))
+            if parts:
+                tokens = sum(estimate_tokens(p['text']) for p in parts)
+                rows.append((content.role, json.dumps(parts, ensure_ascii=False), tokens, time.time()))
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany("INSERT INTO turns (role, parts, tokens, created) VALUES (?, ?, ?, ?)", rows)
+            self.conn.commit()
+
+    def recent(self, max_turns=HISTORY_LOAD_TURNS, max_tokens=HISTORY_LOAD_TOKENS):
+        """Returns the newest turns (oldest first) that fit in max_turns and max_tokens.
+
+        Consecutive rows of one role count as one turn (older databases hold a row per
+        streamed chunk), and the window always starts on a user turn so the rebuilt chat
+        is well formed and every exchange in it is whole.
+        """
+        groups = []
+        with self.lock:
+            for row in self.conn.execute("SELECT id, role, parts, tokens FROM turns ORDER BY id DESC"):
+                if not groups or groups[-1][0][1] != row[1]:
+                    if len(groups) == max_turns:
+                        break
+                    groups.append([])
+                groups[-1].append(row)
+
+        window = []
+        budget = max_tokens
+        for group in groups:
+            tokens = sum(row[3] for row in group)
+            if tokens > budget and window:
+                break
+            budget -= tokens
+            window.append(group)
+        window.reverse()
+        while window and window[0][0][1] != 'user':
+            window.pop(0)
+
+        self.window_start_id = window[0][-1][0] if window else None
+        return self._merge_rows([row for group in window for row in reversed(group)])
+
+    def page(self, before_id=None, limit=HISTORY_PAGE_SIZE):
+        """Returns up to `limit` turns older than before_id (default: older than the loaded window), oldest first."""
+        if before_id is None:
+            before_id = self.window_start_id
+        with self.lock:
+            if before_id is None:
+                rows = self.conn.execute(
+                    "SELECT id, role, parts, tokens FROM turns ORDER BY id DESC LIMIT ?", (limit,)
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT id, role, parts, tokens FROM turns WHERE id < ? ORDER BY id DESC LIMIT ?",
+                    (before_id, limit),
+                ).fetchall()
+        rows.reverse()
+        return self._merge_rows(rows)
+
+    def import_json(self, raw_history):
+        """One-time migration of the old chat_history.json list into the database."""
+        rows = [
+            (entry['role'], json.dumps([p for p in entry['parts'] if p.get('text')], ensure_ascii=False),
+             sum(estimate_tokens(p['text']) for p in entry['parts'] if p.get('text')), time.time())
+            for entry in raw_history
+            if any(p.get('text') for p in entry.get('parts', []))
+        ]
+        with self.lock:
+            self.conn.executemany("INSERT INTO turns (role, parts, tokens, created) VALUES (?, ?, ?, ?)", rows)
+            self.conn.commit()
+        return len(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    @staticmethod
+    def _entry(row):
+        return {'id': row[0], 'role': row[1], 'parts': json.loads(row[2]), 'tokens': row[3]}
+
+    @classmethod
+    def _merge_rows(cls, rows):
+        """Entries for rows (oldest first), consecutive rows of one role folded into one turn with the oldest id."""
+        entries = []
+        for row in rows:
+            entry = cls._entry(row)
+            if entries and entries[-1]['role'] == entry['role']:
+                entries[-1]['parts'] = merge_text_parts(entries[-1]['parts'] + entry['parts'])
+                entries[-1]['tokens'] += entry['tokens']
+            else:
+                entries.append(entry)
+        return entries
+
+
+# --- Context Compaction ---
+
+# Compact once the live chat context is estimated above this many tokens ...
+COMPACT_TRIGGER_TOKENS = 12000
+# ... keeping at least this many of the newest turns verbatim.
+COMPACT_KEEP_TURNS = 10
+# Upper bound for the summary that replaces the older turns
+COMPACT_SUMMARY_MAX_CHARS = 3000
+# Set to False to always use the local extractive summary instead of a model call
+COMPACT_USE_MODEL = True
+COMPACT_MODEL = 'gemini-2.5-flash'
+
+SUMMARY_PREFIX = "Summary of our earlier conversation:"
+
+
+def content_tokens(content):
+    """Approximate token count of one types.Content, including tool calls and responses."""
+    total = 0
+    for part in content.parts or []:
+        if part.text:
+            total += estimate_tokens(part.text)
+        elif part.function_call or part.function_response:
+            total += estimate_tokens(str(part.function_call or part.function_response))
+    return total
+
+
+def extractive_summary(contents, max_chars=COMPACT_SUMMARY_MAX_CHARS):
+    """Local fallback summary: the first sentence of every text turn, newest turns kept if it runs long."""
+    lines = []
+    for content in contents:
+        text = " ".join(p.text for p in content.parts or [] if p.text).strip()
+        if not text:
+            continue
+        first = text.split("\n")[0]
+        first = first.split(". ")[0][:200]
+        speaker = "User" if content.role == 'user' else "Nexus"
+        lines.append(f"- {speaker}: {first}")
+    summary = "\n".join(lines)
+    if len(summary) > max_chars:
+        summary = "...\n" + summary[-max_chars:].split("\n", 1)[-1]
+    return summary
+
+
+def archive_turns(path, contents, session_id=""):
+    """Appends compacted turns to a JSONL archive so the originals stay on disk."""
+    with open(path, 'a', encoding='utf-8') as f:
+        for content in contents:
+            parts = content_to_parts(content)
+            if parts:
+                f.write(json.dumps({'session': session_id, 'time': time.time(),
+                                    'role': content.role, 'parts': parts}, ensure_ascii=False) + "\n")
+
+
+class ContextCompactor:
+    """Replaces the older part of a long chat with a summary and rebuilds the session.
+
+    Front-ends call maybe_compact() after every turn. When the estimated context size
+    passes `trigger_tokens`, everything except the newest `keep_turns` turns is summarised
+    (by the model, or extractively if that fails) and a new chat is created from the
+    summary plus the kept turns. The caller is responsible for the originals being on disk
+    (the `archive` callback receives the turns that are about to be dropped). Summary
+    requests go through `guard` (a nexus_retry.CallGuard) when one is given.
+    """
+
+    def __init__(self, client=None, trigger_tokens=COMPACT_TRIGGER_TOKENS, keep_turns=COMPACT_KEEP_TURNS,
+                 use_model=COMPACT_USE_MODEL, guard=None):
+        self.client = client
+        self.guard = guard
+        self.trigger_tokens = trigger_tokens
+        self.keep_turns = keep_turns
+        self.use_model = use_model
+        self.compactions = 0
+        self.tokens_saved = 0
+
+    def maybe_compact(self, chat, rebuild, archive=None):
+        """Returns a rebuilt chat if compaction ran, otherwise None.
+
+        `rebuild(history)` must create a new chat session from a list of types.Content.
+        """
+        from google.genai import types
+
+        # One entry per turn, however many chunks the reply was streamed in
+        history = coalesce_contents(chat.get_history())
+        before_tokens = sum(content_tokens(c) for c in history)
+        if before_tokens < self.trigger_tokens or len(history) <= self.keep_turns:
+            return None
+
+        # Keep at least the newest turns, starting on a user text turn so tool calls stay paired with their responses
+        split = len(history) - self.keep_turns
+        while split > 0 and not (
+            history[split].role == 'user' and any(p.text for p in history[split].parts or [])
+        ):
+            split -= 1
+        older, recent = history[:split], history[split:]
+        if not older:
+            return None
+
+        if archive is not None:
+            archive(older)
+
+        summary = self.summarize(older)
+        new_history = [
+            types.Content(role='user', parts=[types.Part(text=f"{SUMMARY_PREFIX}\n{summary}")]),
+            types.Content(role='model', parts=[types.Part(text="Understood, I'll keep that context in mind.")]),
+        ] + list(recent)
+        new_chat = rebuild(new_history)
+
+        after_tokens = sum(content_tokens(c) for c in new_history)
+        before_bytes = sum(len(str(c.parts)) for c in history)
+        after_bytes = sum(len(str(c.parts)) for c in new_history)
+        self.compactions += 1
+        self.tokens_saved += before_tokens - after_tokens
+        print(f"[COMPACT] {len(older)} turns summarised: ~{before_tokens} -> ~{after_tokens} tokens "
+              f"({before_tokens - after_tokens} saved), {before_bytes} -> {after_bytes} bytes.")
+        return new_chat
+
+    def summarize(self, contents):
+        if self.use_model and self.client is not None:
+            transcript = "\n".join(
+                f"{'User' if c.role == 'user' else 'Nexus'}: {' '.join(p.text for p in c.parts or [] if p.text)}"
+                for c in contents if any(p.text for p in c.parts or [])
+            )
+            prompt = (
+                "Summarise this conversation between a user and their assistant Nexus in at most "
+                f"{COMPACT_SUMMARY_MAX_CHARS // 6} words. Keep names, preferences, decisions, open "
+                "tasks and facts the assistant may need later.\n\n" + transcript
+            )
+            try:
+                if self.guard is not None:
+                    response = self.guard.call(self.client.models.generate_content, model=COMPACT_MODEL,
+                                               contents=prompt, estimated_tokens=estimate_tokens(prompt))
+                else:
+                    response = self.client.models.generate_content(model=COMPACT_MODEL, contents=prompt)
+                if response.text:
+                    return response.text.strip()[:COMPACT_SUMMARY_MAX_CHARS]
+            except Exception as e:
+                print(f"Warning: Model summary failed, using extractive summary instead: {e}")
+        return extractive_summary(contents)
@@ -0,0 +1,179 @@
+import hashlib
+import io
+import struct
+import threading
+from collections import OrderedDict
+
+# --- Image preprocessing for multimodal requests ---
+
+# Longest side sent to the model. Gemini works on ~768px tiles, so larger images only cost upload time and tokens.
+IMAGE_MAX_SIDE = 1536
+IMAGE_JPEG_QUALITY = 85
+
+# Formats sent with only their metadata removed, when re-encoding would not make them smaller
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png"}
+
+# Metadata segments dropped from passed-through files: JPEG APP1 (EXIF, GPS, XMP), APP13 (IPTC)
+# and comments; PNG EXIF, text (including XMP) and timestamp chunks
+_JPEG_METADATA_MARKERS = {0xE1, 0xED, 0xFE}
+_PNG_METADATA_CHUNKS = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+
+# LRU bounds for processed images, by entry count and total processed bytes
+IMAGE_CACHE_ENTRIES = 32
+IMAGE_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class ProcessedImage:
+    def __init__(self, digest, data, mime_type, original_bytes, size):
+        self.digest = digest
+        self.data = data
+        self.mime_type = mime_type
+        self.original_bytes = original_bytes
+        self.size = size
+
+    @property
+    def bytes_saved(self):
+        return self.original_bytes - len(self.data)
+
+    def to_part(self):
+        from google.genai import types
+
+        return types.Part.from_bytes(data=self.data, mime_type=self.mime_type)
+
+    def summary(self):
+        return (f"{self.original_bytes / 1024:.0f} KB -> {len(self.data) / 1024:.0f} KB "
+                f"({self.size[0]}x{self.size[1]}, {self.mime_type})")
+
+
+def _strip_jpeg(raw):
+    out = [raw[:2]]
+    i = 2
+    while i + 4 <= len(raw):
+        if raw[i] != 0xFF:
+            return None
+        marker = raw[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+            continue
+        if marker == 0xDA:
+            # Start of scan: the rest is image data
+            out.append(raw[i:])
+            return b"".join(out)
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            out.append(raw[i:i + 2])
+            i += 2
+            continue
+        length = int.from_bytes(raw[i + 2:i + 4], "big")
+        if marker not in _JPEG_METADATA_MARKERS:
+            out.append(raw[i:i + 2 + length])
+        i += 2 + length
+    return None
+
+
+def _strip_png(raw):
+    out = [raw[:8]]
+    i = 8
+    while i + 12 <= len(raw):
+        length, = struct.unpack(">I", raw[i:i + 4])
+        kind = raw[i + 4:i + 8]
+        end = i + 12 + length
+        if kind not in _PNG_METADATA_CHUNKS:
+            out.append(raw[i:end])
+        if kind == b"IEND":
+            return b"".join(out)
+        i = end
+    return None
+
+
+def strip_metadata(raw, image_format):
+    """The file with its metadata segments removed and the pixels untouched, or None if it can't be parsed."""
+    if image_format == "JPEG" and raw[:2] == b"\xff\xd8":
+        return _strip_jpeg(raw)
+    if image_format == "PNG" and raw[:8] == b"\x89PNG\r\n\x1a\n":
+        return _strip_png(raw)
+    return None
+
+
+def preprocess_image(raw, max_side=IMAGE_MAX_SIDE, quality=IMAGE_JPEG_QUALITY):
+    """Downsizes, re-encodes and strips metadata. Returns (bytes, mime type, (width, height)).
+
+    Photos become JPEG; images with transparency stay PNG so the alpha channel survives.
+    An upright JPEG or PNG that already fits in max_side keeps its encoded pixels, with
+    the metadata removed, when re-encoding it would not make it smaller.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(raw)) as img:
+        image_format = img.format
+        original_mime = PASSTHROUGH_FORMATS.get(image_format)
+        upright = img.getexif().get(0x0112, 1) == 1
+        # Apply the EXIF rotation before the metadata is dropped
+        img = ImageOps.exif_transpose(img)
+        fits = max(img.size) <= max_side
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        out = io.BytesIO()
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if has_alpha:
+            img.save(out, format="PNG", optimize=True)
+            mime_type = "image/png"
+        else:
+            img.convert("RGB").save(out, format="JPEG", quality=quality, optimize=True)
+            mime_type = "image/jpeg"
+        if original_mime and upright and fits:
+            stripped = strip_metadata(raw, image_format)
+            if stripped is not None and len(stripped) <= out.tell():
+                return stripped, original_mime, img.size
+        return out.getvalue(), mime_type, img.size
+
+
+class ImageCache:
+    """Processed images keyed by the SHA-256 of the original file, with LRU eviction.
+
+    Asking about the same image again skips decoding and re-encoding entirely; only the
+    original bytes are hashed.
+    """
+
+    def __init__(self, max_entries=IMAGE_CACHE_ENTRIES, max_bytes=IMAGE_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def get(self, raw):
+        """Returns (ProcessedImage, was_cached) for the raw image bytes."""
+        digest = hashlib.sha256(raw).hexdigest()
+        with self.lock:
+            cached = self.entries.get(digest)
+            if cached is not None:
+                self.entries.move_to_end(digest)
+                self.hits += 1
+                self.bytes_saved += cached.bytes_saved
+                return cached, True
+
+        data, mime_type, size = preprocess_image(raw)
+        processed = ProcessedImage(digest, data, mime_type, len(raw), size)
+
+        with self.lock:
+            self.misses += 1
+            self.bytes_saved += processed.bytes_saved
+            if digest not in self.entries:
+                self.entries[digest] = processed
+                self.total_bytes += len(data)
+            while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted.data)
+        return processed, False
+
+    def load_path(self, path):
+        with open(path, 'rb') as f:
+            return self.get(f.read())
+
+
+# Shared by every caller in the process
+IMAGE_CACHE = ImageCache()
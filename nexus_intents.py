@@ -0,0 +1,176 @@
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from nexus_agent import LatencyStats
+
+# --- Local intent fast path shared by both Nexus front-ends ---
+
+# Only matches at or above this confidence skip the model round trip.
+ROUTER_MIN_CONFIDENCE = 0.85
+
+# Application names open_application understands without a full path.
+KNOWN_APPLICATIONS = {
+    'notepad', 'calculator', 'browser', 'terminal', 'settings', 'controlpanel', 'explorer', 'steam',
+}
+
+INTENT_CORPUS_FILE = Path(__file__).with_name("intent_corpus.jsonl")
+
+_DURATION = r"\d+ (?:seconds?|secs?|minutes?|mins?|hours?|hrs?)(?:(?: and|,)? \d+ (?:seconds?|secs?|minutes?|mins?|hours?|hrs?))*"
+
+# (intent, tool name or None for a local reply, pattern, confidence)
+# Patterns are matched against the whole normalized utterance, never a substring of it.
+INTENT_PATTERNS = [
+    ('greeting', None,
+     r"(?:hi|hello|hey|hiya|howdy|good (?:morning|afternoon|evening))(?: there)?(?: nexus)?", 0.99),
+    ('exit', None,
+     r"(?:stop|exit|quit|goodbye|good bye|bye|bye bye|shut ?down)(?: nexus)?", 0.99),
+    ('check_current_time', 'check_current_time',
+     r"(?:what(?:'s| is) the (?:current )?time|what time is it|(?:tell|give) me the (?:current )?time"
+     r"|(?:the )?current time|time)(?: now| right now| please)?", 0.97),
+    ('set_reminder', 'set_reminder',
+     rf"remind me (?:to |about )?(?P<reminder_text>.+?) in (?P<time_string>{_DURATION})", 0.95),
+    ('set_reminder', 'set_reminder',
+     rf"in (?P<time_string>{_DURATION}),? remind me (?:to |about )?(?P<reminder_text>.+)", 0.95),
+    ('play_on_youtube', 'play_on_youtube',
+     r"play (?P<topic>.+?) (?:on|from) youtube", 0.95),
+    ('play_on_youtube', 'play_on_youtube',
+     r"play (?P<topic>.+)", 0.75),
+    ('web_search', 'web_search',
+     r"(?:search|google|look up)(?: the web)?(?: for)? (?P<query>.+?)(?: on (?:google|the web|the internet))?", 0.9),
+    ('add_personal_note', 'add_personal_note',
+     r"(?:remember|note down|make a note) that (?P<note_text>.+)", 0.9),
+    ('open_application', 'open_application',
+     r"(?:open|launch|start|run) (?:the |my )?(?P<app_name>[a-z0-9 .]+?)(?: app| application)?", 0.95),
+]
+
+_COMPILED = [(intent, tool, re.compile(pattern), confidence) for intent, tool, pattern, confidence in INTENT_PATTERNS]
+
+_POLITE_PREFIX = re.compile(r"^(?:(?:hey |ok |okay )?nexus,? |please |can you |could you |would you )+")
+_POLITE_SUFFIX = re.compile(r"(?:,? please|,? nexus)+$")
+
+
+def normalize(command):
+    """Lowercases, collapses whitespace and strips polite wrappers and trailing punctuation."""
+    text = " ".join(command.lower().split())
+    text = text.strip(" ?!.")
+    text = _POLITE_PREFIX.sub("", text)
+    text = _POLITE_SUFFIX.sub("", text)
+    return text.strip(" ?!.,")
+
+
+class IntentMatch:
+    def __init__(self, intent, tool, args, confidence):
+        self.intent = intent
+        self.tool = tool
+        self.args = args
+        self.confidence = confidence
+
+    def __repr__(self):
+        return f"IntentMatch({self.intent!r}, args={self.args!r}, confidence={self.confidence:.2f})"
+
+
+class IntentRouter:
+    """Deterministic intent matcher that lets trivial commands skip the model.
+
+    `tools` is the front-end's AVAILABLE_TOOLS map; intents whose tool is missing there are
+    never returned. `local_intents` lists the tool-less intents the front-end can answer
+    itself (greeting, exit). Latency per intent (including the "model" fallback) is recorded
+    in `stats` so the fast path can be compared against the full round trip; pass a shared
+    LatencyStats to keep the numbers across router instances.
+    """
+
+    def __init__(self, tools, local_intents=('greeting', 'exit'), min_confidence=ROUTER_MIN_CONFIDENCE, stats=None):
+        self.tools = tools
+        self.local_intents = set(local_intents)
+        self.min_confidence = min_confidence
+        self.stats = stats if stats is not None else LatencyStats()
+
+    def match(self, command):
+        """Returns the best IntentMatch for the command (any confidence), or None."""
+        text = normalize(command)
+        if not text:
+            return None
+        for intent, tool, pattern, confidence in _COMPILED:
+            if tool is None and intent not in self.local_intents:
+                continue
+            if tool is not None and tool not in self.tools:
+                continue
+            found = pattern.fullmatch(text)
+            if not found:
+                continue
+            args = {k: v.strip() for k, v in found.groupdict().items()}
+            if intent == 'open_application' and args['app_name'].replace(" ", "") not in KNOWN_APPLICATIONS:
+                # Probably a website or something the model should interpret ("open youtube")
+                confidence = 0.5
+            return IntentMatch(intent, tool, args, confidence)
+        return None
+
+    def route(self, command):
+        """Returns a match only when it is confident enough to bypass the model."""
+        found = self.match(command)
+        if found is not None and found.confidence >= self.min_confidence:
+            return found
+        return None
+
+    def dispatch(self, found):
+        """Runs the matched tool and returns its result, recording the latency."""
+        started = time.perf_counter()
+        try:
+            return self.tools[found.tool](**found.args)
+        finally:
+            self.record(found.intent, time.perf_counter() - started)
+
+    def record(self, intent, seconds):
+        self.stats.record(intent, seconds)
+
+    def latency_report(self):
+        """One line per intent: count, p50 and p95 latency in milliseconds."""
+        return self.stats.report()
+
+
+def evaluate(corpus_path=INTENT_CORPUS_FILE, tools=None):
+    """Scores the router against the labeled corpus. Returns (per-intent precision/recall, mistakes)."""
+    all_tools = {tool for _, tool, _, _ in INTENT_PATTERNS if tool}
+    router = IntentRouter(tools or {name: None for name in all_tools})
+    counts = {}
+    mistakes = []
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            example = json.loads(line)
+            expected = example['intent']
+            found = router.route(example['text'])
+            predicted = found.intent if found else None
+            for intent in {expected, predicted} - {None}:
+                counts.setdefault(intent, {'tp': 0, 'fp': 0, 'fn': 0})
+            # Right intent with wrong arguments counts as a miss too
+            if predicted == expected and (found is None or 'args' not in example or found.args == example['args']):
+                if expected is not None:
+                    counts[expected]['tp'] += 1
+                continue
+            if predicted is not None:
+                counts[predicted]['fp'] += 1
+            if expected is not None:
+                counts[expected]['fn'] += 1
+            mistakes.append((example['text'], expected, found))
+
+    report = {}
+    for intent, c in sorted(counts.items()):
+        precision = c['tp'] / (c['tp'] + c['fp']) if c['tp'] + c['fp'] else 1.0
+        recall = c['tp'] / (c['tp'] + c['fn']) if c['tp'] + c['fn'] else 1.0
+        report[intent] = (precision, recall, c['tp'] + c['fn'])
+    return report, mistakes
+
+
+if __name__ == "__main__":
+    report, mistakes = evaluate(sys.argv[1] if len(sys.argv) > 1 else INTENT_CORPUS_FILE)
+    print(f"{'intent':<20} {'precision':>9} {'recall':>7} {'support':>8}")
+    for intent, (precision, recall, support) in report.items():
+        print(f"{intent:<20} {precision:>9.2f} {recall:>7.2f} {support:>8}")
+    for text, expected, predicted in mistakes:
+        print(f"MISS: {text!r} expected={expected} got={predicted}")
+    sys.exit(1 if any(p < 1.0 for p, _, _ in report.values()) else 0)
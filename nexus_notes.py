@@ -0,0 +1,368 @@
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# --- Personal note retrieval shared by both Nexus front-ends ---
+
+# How many notes retrieve_personal_notes hands back, and the most characters it may return.
+RETRIEVAL_TOP_K = 5
+RETRIEVAL_MAX_CHARS = 4000
+
+# Number of journal entries after which the journal is folded into the snapshot file.
+COMPACT_EVERY = 200
+
+# Users whose notes (and index) the web app keeps in memory at once; the least recently used are dropped.
+USER_VIEW_CACHE_SIZE = 256
+
+# BM25 tuning constants (standard defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by did do for from have i in is it me my of on or our "
+    "so that the this to was we what when where which who with you your all any "
+    "about note notes saved stored remember".split()
+)
+
+
+def tokenize(text):
+    """Lowercases text and splits it into index terms, dropping common stopwords."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def format_note(note):
+    return f"Time: {note['time']}, Note: {note['note']}"
+
+
+class NoteIndex:
+    """In-memory BM25 inverted index over personal notes.
+
+    Notes are added incrementally (add() is O(terms in the note)) and a search only
+    scores notes that share at least one term with the query, so retrieval cost
+    depends on how common the query terms are rather than on the total number of notes.
+    """
+
+    def __init__(self, notes=()):
+        self.notes = []
+        self.postings = {}
+        self.doc_lengths = []
+        self.total_length = 0
+        for note in notes:
+            self.add(note)
+
+    def __len__(self):
+        return len(self.notes)
+
+    def add(self, note):
+        """Indexes a note dict ({'time': ..., 'note': ...}) and returns its position."""
+        doc_id = len(self.notes)
+        terms = Counter(tokenize(note.get('note', '')))
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        length = sum(terms.values())
+        self.notes.append(note)
+        self.doc_lengths.append(length)
+        self.total_length += length
+        return doc_id
+
+    def search(self, query, k=RETRIEVAL_TOP_K):
+        """Returns up to k (score, note) pairs, best match first."""
+        terms = set(tokenize(query))
+        if not terms or not self.notes:
+            return []
+
+        n = len(self.notes)
+        avg_length = self.total_length / n or 1.0
+        base = BM25_K1 * (1 - BM25_B)
+        per_length = BM25_K1 * BM25_B / avg_length
+        lengths = self.doc_lengths
+        scores = {}
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            weight = idf * (BM25_K1 + 1)
+            for doc_id, tf in postings.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + base + per_length * lengths[doc_id])
+
+        # Ties go to the newer note
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
+        return [(score, self.notes[doc_id]) for doc_id, score in best]
+
+    def recent(self, k=RETRIEVAL_TOP_K):
+        """Returns the k most recently added notes, newest first."""
+        return self.notes[-k:][::-1] if k > 0 else []
+
+    def retrieve(self, query, k=RETRIEVAL_TOP_K, max_chars=RETRIEVAL_MAX_CHARS):
+        """Builds the tool response: the top-k matching notes, trimmed to max_chars.
+
+        Falls back to the most recent notes when nothing matches (e.g. "what do you know about me").
+        """
+        matches = [note for _, note in self.search(query, k)]
+        if matches:
+            header = "The user's most relevant stored notes are:"
+        else:
+            matches = self.recent(k)
+            header = "No note matched the query directly. The user's most recent notes are:"
+
+        lines = []
+        remaining = max_chars - len(header)
+        for note in matches:
+            line = format_note(note)
+            if len(line) + 1 > remaining:
+                if not lines and remaining > 3:
+                    lines.append(line[:remaining - 4] + "...")
+                break
+            lines.append(line)
+            remaining -= len(line) + 1
+        return header + "\n" + "\n".join(lines)
+
+
+# --- Journaled Note Store ---
+
+def fsync_dir(path):
+    """Makes a rename inside `path` durable (a no-op where directories can't be opened, e.g. Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, text):
+    """Writes text to a temp file, fsyncs it and renames it over `path`."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(path.parent)
+
+
+class NoteStore:
+    """Crash-safe note storage: a JSON snapshot plus an append-only JSONL journal.
+
+    The snapshot keeps the original assistant_memory.json format (a JSON list of notes).
+    Every new note is appended to `<snapshot>.journal.jsonl` and fsynced, so a write costs
+    O(1) instead of re-serialising every note. Once the journal holds `compact_every`
+    entries it is folded into a new snapshot, which is written to a temp file and renamed
+    into place. The journal's first line records how many notes the snapshot held when the
+    journal was started, so a crash between the two steps of a compaction never replays a
+    note twice. A torn last line (crash mid-append) is ignored on recovery.
+    """
+
+    def __init__(self, snapshot_path, journal_path=None, compact_every=COMPACT_EVERY):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or snapshot_path.with_name(snapshot_path.stem + ".journal.jsonl")
+        self.compact_every = compact_every
+        self.notes = []
+        self.journal_entries = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Reads the snapshot, replays the journal on top of it and returns the notes list."""
+        with self.lock:
+            self.notes = self._read_snapshot()
+            base, entries, torn = self._read_journal()
+            # Entries the snapshot already contains (compaction crashed before resetting the journal)
+            skip = max(0, len(self.notes) - base)
+            self.notes.extend(entries[skip:])
+            self.journal_entries = len(entries) - min(skip, len(entries))
+            if not self.journal_path.exists():
+                self._reset_journal()
+            elif self.journal_entries >= self.compact_every or skip or torn:
+                # Also rewrite after a torn entry so later appends don't land behind it
+                self._compact()
+        return self.notes
+
+    def append(self, note):
+        """Durably appends one note (fsync before returning) and compacts when the journal is long."""
+        line = json.dumps(note, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.notes.append(note)
+            self.journal_entries += 1
+            if self.journal_entries >= self.compact_every:
+                self._compact()
+
+    def compact(self):
+        """Folds the journal into the snapshot file."""
+        with self.lock:
+            self._compact()
+
+    def _compact(self):
+        atomic_write(self.snapshot_path, json.dumps(self.notes, indent=4, ensure_ascii=False))
+        self._reset_journal()
+
+    def _reset_journal(self):
+        atomic_write(self.journal_path, json.dumps({'base': len(self.notes)}) + "\n")
+        self.journal_entries = 0
+
+    def _read_snapshot(self):
+        if not self.snapshot_path.exists():
+            return []
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            # Keep the damaged file around for manual recovery instead of overwriting it later
+            backup = self.snapshot_path.with_name(f"{self.snapshot_path.name}.corrupt-{int(time.time())}")
+            os.replace(self.snapshot_path, backup)
+            print(f"Warning: Memory file is corrupted, moved it to {backup.name} and recovering from the journal.")
+            return []
+
+    def _read_journal(self):
+        """Returns (snapshot length the journal starts from, journaled notes, whether a torn entry was found)."""
+        if not self.journal_path.exists():
+            return len(self.notes), [], False
+        base = 0
+        entries = []
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write from a crash: everything before it is intact
+                    print(f"Warning: Ignoring incomplete entry at line {line_number + 1} of {self.journal_path.name}.")
+                    return base, entries, True
+                if line_number == 0 and 'base' in record:
+                    base = record['base']
+                else:
+                    entries.append(record)
+        return base, entries, False
+
+
+# --- Per-user Note Store (web app) ---
+
+class UserNotes:
+    """One user's notes and their index, kept in memory and caught up with the database on every access.
+
+    Catching up is a single indexed query for rows newer than the last one seen, so notes
+    written by another session or server process show up without reloading the rest.
+    """
+
+    def __init__(self, store, user):
+        self.store = store
+        self.user = user
+        self.notes = []
+        self.index = NoteIndex()
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        self.refresh()
+        return len(self.notes)
+
+    def refresh(self):
+        with self.lock:
+            for row_id, note in self.store.rows_after(self.user, self.last_id):
+                self._add(row_id, note)
+
+    def add(self, note):
+        """Stores a note dict ({'time': ..., 'note': ...}) for this user."""
+        row_id = self.store.insert(self.user, note)
+        self.refresh()
+        return row_id
+
+    def retrieve(self, query, k=RETRIEVAL_TOP_K, max_chars=RETRIEVAL_MAX_CHARS):
+        self.refresh()
+        return self.index.retrieve(query, k, max_chars)
+
+    def _add(self, row_id, note):
+        if row_id > self.last_id:
+            self.notes.append(note)
+            self.index.add(note)
+            self.last_id = row_id
+
+
+class UserNoteStore:
+    """Personal notes of every web user in one SQLite database (WAL mode), namespaced by user id.
+
+    A new note is one INSERT of one row, so concurrent sessions (or several server
+    processes) never rewrite or overwrite each other's notes, and nothing but the new
+    row is written. view() hands out a UserNotes per user from a process-wide LRU cache,
+    so sessions of the same user share one index and each user only ever sees their own
+    notes.
+    """
+
+    def __init__(self, path, cache_size=USER_VIEW_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.views = OrderedDict()
+        # Other processes may hold the write lock briefly; wait for it rather than failing
+        self.conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS notes ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " user TEXT NOT NULL,"
+            " time TEXT NOT NULL,"
+            " note TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS notes_user ON notes (user, id)")
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def view(self, user):
+        """Returns the cached UserNotes of `user`, loading it on first use."""
+        if not user:
+            raise ValueError("A user id is required for personal notes.")
+        with self.lock:
+            view = self.views.get(user)
+            if view is None:
+                view = self.views[user] = UserNotes(self, user)
+                while len(self.views) > self.cache_size:
+                    self.views.popitem(last=False)
+            else:
+                self.views.move_to_end(user)
+        view.refresh()
+        return view
+
+    def insert(self, user, note):
+        with self.lock:
+            cursor = self.conn.execute("INSERT INTO notes (user, time, note) VALUES (?, ?, ?)",
+                                       (user, note['time'], note['note']))
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def rows_after(self, user, after_id):
+        """(id, note) pairs of `user` newer than after_id, oldest first."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, time, note FROM notes WHERE user = ? AND id > ? ORDER BY id", (user, after_id)
+            ).fetchall()
+        return [(row[0], {'time': row[1], 'note': row[2]}) for row in rows]
+
+    def import_notes(self, user, notes):
+        """One-time migration of a shared assistant_memory.json note list into `user`'s namespace."""
+        rows = [(user, note.get('time', ''), note['note']) for note in notes if note.get('note')]
+        with self.lock:
+            self.conn.executemany("INSERT INTO notes (user, time, note) VALUES (?, ?, ?)", rows)
+            self.conn.commit()
+        return len(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
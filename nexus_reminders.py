@@ -0,0 +1,157 @@
+import datetime
+import heapq
+import json
+import re
+import threading
+import time
+import uuid
+
+from nexus_notes import atomic_write
+
+# --- Persistent reminder scheduler shared by both Nexus front-ends ---
+
+# Longest delay set_reminder accepts (reminders survive restarts, so this can be generous).
+MAX_REMINDER_SECONDS = 7 * 24 * 3600
+
+_UNIT_SECONDS = (
+    (('second', 'sec'), 1),
+    (('minute', 'min'), 60),
+    (('hour', 'hr'), 3600),
+    (('day',), 86400),
+)
+
+
+def parse_time_to_seconds(time_string: str) -> int:
+    """Converts a time phrase (e.g., '5 minutes and 10 seconds', '2 hrs') into total seconds."""
+    time_string = time_string.lower()
+    total_seconds = 0
+    for value, unit in re.findall(r"(\d+)\s*([a-z]+)", time_string):
+        for prefixes, seconds in _UNIT_SECONDS:
+            if unit.startswith(prefixes):
+                total_seconds += int(value) * seconds
+                break
+    if total_seconds == 0 and time_string.strip().isdigit():
+        # A bare number means minutes
+        total_seconds = int(time_string.strip()) * 60
+    return max(0, min(total_seconds, MAX_REMINDER_SECONDS))
+
+
+def describe_delay(seconds):
+    """Formats a delay like the original set_reminder reply ('2 minutes and 5 seconds')."""
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    parts = []
+    if hours:
+        parts.append(f"{hours} hours")
+    if minutes:
+        parts.append(f"{minutes} minutes")
+    if seconds or not parts:
+        parts.append(f"{seconds} seconds")
+    return " and ".join(parts)
+
+
+class Reminder:
+    """A pending reminder. `owner` is the web user who set it (None for the single-user desktop app)."""
+
+    def __init__(self, reminder_id, due, text, created, owner=None):
+        self.id = reminder_id
+        self.due = due
+        self.text = text
+        self.created = created
+        self.owner = owner
+
+    def to_dict(self):
+        return {'id': self.id, 'due': self.due, 'text': self.text, 'created': self.created, 'owner': self.owner}
+
+    def due_display(self):
+        return datetime.datetime.fromtimestamp(self.due).strftime("%Y-%m-%d %I:%M %p")
+
+
+class ReminderScheduler:
+    """One thread and one heap of due times for every reminder, persisted to a JSON file.
+
+    `on_due(reminder, late_seconds)` is called on the scheduler thread when a reminder
+    fires. Reminders that came due while the app was not running fire right after start()
+    with their lateness, so the front-end can say they were missed. Cancelled reminders are
+    removed from the map and their heap entries skipped when they surface.
+    """
+
+    def __init__(self, path, on_due):
+        self.path = path
+        self.on_due = on_due
+        self.reminders = {}
+        self.heap = []
+        self.condition = threading.Condition()
+        self.thread = None
+        self._load()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="nexus-reminders", daemon=True)
+            self.thread.start()
+
+    def add(self, delay_seconds, text, owner=None):
+        with self.condition:
+            reminder = Reminder(uuid.uuid4().hex[:6], time.time() + delay_seconds, text, time.time(), owner)
+            self.reminders[reminder.id] = reminder
+            heapq.heappush(self.heap, (reminder.due, reminder.id))
+            self._save()
+            self.condition.notify()
+        return reminder
+
+    def cancel(self, reminder_id, owner=None):
+        """Returns the cancelled Reminder, or None if `owner` (when given) has no pending reminder with that id."""
+        with self.condition:
+            reminder = self.reminders.get(reminder_id.strip())
+            if reminder is None or (owner is not None and reminder.owner != owner):
+                return None
+            del self.reminders[reminder.id]
+            self._save()
+            self.condition.notify()
+            return reminder
+
+    def pending(self, owner=None):
+        """Pending reminders (only `owner`'s, when given), soonest first."""
+        with self.condition:
+            return sorted((r for r in self.reminders.values() if owner is None or r.owner == owner),
+                          key=lambda r: r.due)
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: Could not read {self.path.name}, starting without saved reminders: {e}")
+            return
+        for entry in entries:
+            reminder = Reminder(entry['id'], entry['due'], entry['text'], entry.get('created', entry['due']),
+                                entry.get('owner'))
+            self.reminders[reminder.id] = reminder
+            heapq.heappush(self.heap, (reminder.due, reminder.id))
+
+    def _save(self):
+        atomic_write(self.path, json.dumps([r.to_dict() for r in self.reminders.values()], indent=4))
+
+    def _run(self):
+        while True:
+            with self.condition:
+                # Drop heap entries of cancelled reminders
+                while self.heap and self.heap[0][1] not in self.reminders:
+                    heapq.heappop(self.heap)
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+                due, reminder_id = self.heap[0]
+                now = time.time()
+                if due > now:
+                    self.condition.wait(timeout=due - now)
+                    continue
+                heapq.heappop(self.heap)
+                reminder = self.reminders.pop(reminder_id)
+                self._save()
+            try:
+                self.on_due(reminder, max(0.0, now - reminder.due))
+            except Exception as e:
+                print(f"Warning: Reminder callback failed: {e}")
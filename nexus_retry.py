@@ -0,0 +1,424 @@
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+
+# --- Retry, rate limiting and circuit breaking for Gemini calls ---
+
+# Each retry is logged at INFO level; the counts are always in CallGuard.stats()
+log = logging.getLogger("nexus.retry")
+
+# Attempts per call (the first try included) and the backoff between them, in seconds
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 32.0
+RETRYABLE_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Client-side quota shared by every session in the process (gemini-2.5-flash free tier limits)
+REQUESTS_PER_MINUTE = 10
+TOKENS_PER_MINUTE = 250_000
+# A call that cannot get through the limiter within this many seconds fails instead of hanging the turn
+RATE_LIMIT_MAX_WAIT = 60.0
+# Requests count against the window a little longer than its period, since the server
+# timestamps them on arrival, slightly later and with some jitter
+RATE_WINDOW_MARGIN = 0.02
+
+# Consecutive failed calls that open the breaker, and how long it stays open before a trial call
+BREAKER_FAILURES = 5
+BREAKER_RESET_SECONDS = 30.0
+
+
+class RateLimitExceeded(Exception):
+    """The client-side limiter could not admit a call within its maximum wait."""
+
+
+class CircuitOpenError(Exception):
+    """Calls are failing fast because the service kept failing; `retry_in` is seconds until the next trial."""
+
+    def __init__(self, retry_in):
+        super().__init__(f"Gemini is temporarily unavailable; trying again in {retry_in:.0f}s.")
+        self.retry_in = retry_in
+
+
+def is_retryable(error):
+    """True for rate limiting, server errors and timeouts, which can succeed when tried again later."""
+    import httpx
+    from google.genai import errors
+
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_CODES
+    return isinstance(error, httpx.TimeoutException)
+
+
+def is_capacity_error(error):
+    """True if a call failed only because the service (or our own quota) is busy right now."""
+    return isinstance(error, (RateLimitExceeded, CircuitOpenError)) or is_retryable(error)
+
+
+def retry_after_seconds(error):
+    """The server's suggested wait: a Retry-After header or a RetryInfo detail. None if there is none."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('retry-after') if hasattr(headers, 'get') else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+    details = getattr(error, 'details', None)
+    if isinstance(details, dict):
+        details = details.get('error', details).get('details', [])
+    for detail in details if isinstance(details, list) else []:
+        if isinstance(detail, dict) and str(detail.get('@type', '')).endswith('RetryInfo'):
+            match = re.match(r"([\d.]+)s?$", str(detail.get('retryDelay', '')))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Refills at `capacity` per `period` seconds. Not locked itself: RateLimiter guards both of its buckets.
+
+    The level may go negative when debit() charges for more than was taken up front
+    (the real token count of a response is only known afterwards).
+    """
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken (0 if it can be taken now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def debit(self, amount):
+        self.level -= amount
+
+
+class RequestWindow:
+    """At most `capacity` requests in any `period` seconds, counted the way the server counts them.
+
+    A token bucket that starts full admits its whole capacity at once and keeps refilling,
+    so a sliding window on the server can see nearly twice the quota. Same interface as
+    TokenBucket; not locked itself.
+    """
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = capacity
+        self.period = period * (1 + RATE_WINDOW_MARGIN)
+        self.sent = deque()
+
+    def wait_time(self, amount, now):
+        """Seconds until one more request fits in the window (0 if it fits now)."""
+        while self.sent and now - self.sent[0] >= self.period:
+            self.sent.popleft()
+        return 0.0 if len(self.sent) < self.capacity else self.sent[0] + self.period - now
+
+    def debit(self, amount):
+        now = time.monotonic()
+        self.sent.extend([now] * amount)
+
+
+class RateLimiter:
+    """Requests-per-minute window and tokens-per-minute bucket shared by every caller in the process.
+
+    A 429 from the server pauses all callers for the suggested wait, so one session hitting
+    the quota doesn't make the others hit it too.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 period=60.0, max_wait=RATE_LIMIT_MAX_WAIT):
+        self.requests = RequestWindow(requests_per_minute, period)
+        self.tokens = TokenBucket(tokens_per_minute, period)
+        self.max_wait = max_wait
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+        self.waited = 0.0
+
+    def acquire(self, estimated_tokens):
+        """Blocks until a request of about `estimated_tokens` fits in both budgets."""
+        started = time.monotonic()
+        with self.condition:
+            while True:
+                wait = self._try_acquire(estimated_tokens, started)
+                if wait <= 0:
+                    return
+                self.condition.wait(timeout=wait)
+
+    async def acquire_async(self, estimated_tokens):
+        """acquire() for coroutines: waits with asyncio.sleep instead of blocking the event loop."""
+        started = time.monotonic()
+        while True:
+            with self.condition:
+                wait = self._try_acquire(estimated_tokens, started)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def _try_acquire(self, estimated_tokens, started):
+        """Takes the budget and returns 0, or returns the seconds to wait. Call with the condition held."""
+        now = time.monotonic()
+        wait = max(self.paused_until - now,
+                   self.requests.wait_time(1, now),
+                   self.tokens.wait_time(estimated_tokens, now))
+        if wait <= 0:
+            self.requests.debit(1)
+            self.tokens.debit(estimated_tokens)
+            self.waited += now - started
+            return 0.0
+        if now + wait - started > self.max_wait:
+            raise RateLimitExceeded(f"Request quota exhausted; no capacity within {self.max_wait:.0f}s.")
+        return wait
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Corrects the token budget once the real usage of a request is known."""
+        with self.condition:
+            self.tokens.debit(actual_tokens - estimated_tokens)
+            self.condition.notify_all()
+
+    def pause(self, seconds):
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """Fails calls fast after `failures` consecutive errors, then lets one trial call through per `reset_seconds`."""
+
+    def __init__(self, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        # Token of the call holding the half-open trial slot
+        self.trial_owner = None
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if self.trial_running else "open"
+
+    def before_call(self, claim=True):
+        """Raises CircuitOpenError while the breaker is open; otherwise lets the call through.
+
+        When the call is the half-open trial, returns a token for release_trial(). With
+        claim=False the state is only checked and no trial slot is taken.
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return None
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0 or self.trial_running:
+                raise CircuitOpenError(max(remaining, 0.0))
+            if not claim:
+                return None
+            self.trial_running = True
+            self.trial_owner = object()
+            return self.trial_owner
+
+    def release_trial(self, token):
+        """Frees the trial slot if the call holding `token` ended without a result (cancelled, timed out)."""
+        if token is None:
+            return
+        with self.lock:
+            if self.trial_owner is token:
+                self.trial_owner = None
+                self.trial_running = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+            self.trial_owner = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial_running:
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+                self.trial_running = False
+                self.trial_owner = None
+
+
+class CallGuard:
+    """Wraps Gemini calls with the limiter, retries (exponential backoff with full jitter) and the breaker.
+
+    One guard is shared by every session of a process. call() is for blocking requests;
+    stream() for streaming ones, which are only retried until their first chunk arrives,
+    since a chunk that was already shown to the user can't be taken back. acall() and
+    astream() are the same for the async client.
+    """
+
+    def __init__(self, limiter=None, breaker=None, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY,
+                 max_delay=RETRY_MAX_DELAY):
+        self.limiter = limiter or RateLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failed = 0
+
+    # Each attempt releases the breaker's trial slot on the way out (release_trial is a no-op
+    # once a success or failure was recorded), so a cancelled trial can't leave it half-open.
+
+    def call(self, fn, *args, estimated_tokens=1000, **kwargs):
+        """Returns fn(*args, **kwargs), retrying it on capacity errors."""
+        for attempt in range(self.attempts):
+            trial = self._admit(estimated_tokens)
+            try:
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as error:
+                    delay = self._retry_delay(error, attempt)
+                else:
+                    self.breaker.record_success()
+                    self._settle(estimated_tokens, result)
+                    return result
+            finally:
+                self.breaker.release_trial(trial)
+            time.sleep(delay)
+
+    def stream(self, fn, *args, estimated_tokens=1000, **kwargs):
+        """Yields the chunks of fn(*args, **kwargs), retrying the request if it fails before the first chunk."""
+        for attempt in range(self.attempts):
+            trial = self._admit(estimated_tokens)
+            try:
+                try:
+                    chunks = iter(fn(*args, **kwargs))
+                    first = next(chunks, None)
+                except Exception as error:
+                    delay = self._retry_delay(error, attempt)
+                else:
+                    self.breaker.record_success()
+                    last = first
+                    if first is not None:
+                        yield first
+                        for last in chunks:
+                            yield last
+                    self._settle(estimated_tokens, last)
+                    return
+            finally:
+                self.breaker.release_trial(trial)
+            time.sleep(delay)
+
+    async def acall(self, fn, *args, estimated_tokens=1000, **kwargs):
+        """Returns await fn(*args, **kwargs), retrying it on capacity errors."""
+        for attempt in range(self.attempts):
+            trial = await self._admit_async(estimated_tokens)
+            try:
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as error:
+                    delay = self._retry_delay(error, attempt)
+                else:
+                    self.breaker.record_success()
+                    self._settle(estimated_tokens, result)
+                    return result
+            finally:
+                self.breaker.release_trial(trial)
+            await asyncio.sleep(delay)
+
+    async def astream(self, fn, *args, estimated_tokens=1000, **kwargs):
+        """Yields the chunks of `await fn(*args, **kwargs)` (an async iterator), retried like stream()."""
+        for attempt in range(self.attempts):
+            trial = await self._admit_async(estimated_tokens)
+            try:
+                try:
+                    chunks = (await fn(*args, **kwargs)).__aiter__()
+                    first = await anext(chunks, None)
+                except Exception as error:
+                    delay = self._retry_delay(error, attempt)
+                else:
+                    self.breaker.record_success()
+                    last = first
+                    if first is not None:
+                        yield first
+                        async for last in chunks:
+                            yield last
+                    self._settle(estimated_tokens, last)
+                    return
+            finally:
+                self.breaker.release_trial(trial)
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'retries': self.retries,
+                'failed': self.failed,
+                'throttled_seconds': self.limiter.waited,
+                'breaker': self.breaker.state,
+            }
+
+    def _admit(self, estimated_tokens):
+        """Fails fast while the breaker is open, waits for the limiter, then takes the trial slot if there is one."""
+        self.breaker.before_call(claim=False)
+        self.limiter.acquire(estimated_tokens)
+        trial = self.breaker.before_call()
+        with self.lock:
+            self.calls += 1
+        return trial
+
+    async def _admit_async(self, estimated_tokens):
+        self.breaker.before_call(claim=False)
+        await self.limiter.acquire_async(estimated_tokens)
+        trial = self.breaker.before_call()
+        with self.lock:
+            self.calls += 1
+        return trial
+
+    def _settle(self, estimated_tokens, response):
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None and usage.total_token_count:
+            self.limiter.settle(estimated_tokens, usage.total_token_count)
+
+    def _retry_delay(self, error, attempt):
+        """Re-raises errors that must not be retried; otherwise returns the seconds to wait before the next attempt."""
+        if not is_retryable(error):
+            # The service answered (or was never reached), so this says nothing about its health
+            self.breaker.record_success()
+            raise error
+        if getattr(error, 'code', None) == 429:
+            # Throttling is the limiter's job; a service that answers with a quota error is up
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        if attempt == self.attempts - 1:
+            with self.lock:
+                self.failed += 1
+            raise error
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        hint = retry_after_seconds(error)
+        if hint is not None:
+            # The server knows when the quota frees up; every session waits for it, not just this one
+            delay = max(delay, hint)
+            self.limiter.pause(hint)
+        with self.lock:
+            self.retries += 1
+        log.info("%s (%s), attempt %d/%d, retrying in %.1fs", error.__class__.__name__, getattr(error, 'code', ''),
+                 attempt + 1, self.attempts, delay)
+        return delay
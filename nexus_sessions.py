@@ -0,0 +1,154 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from google.genai import types
+
+from nexus_history import coalesce_contents, content_to_parts, merge_text_parts
+
+# --- Durable chat sessions for the web app ---
+
+# Sessions kept in memory per process. The least recently used are dropped from memory;
+# every turn is already on disk, so they are simply loaded again when resumed.
+SESSION_CACHE_SIZE = 200
+
+
+class WebSession:
+    """One web conversation: the transcript shown on the page and the model context behind it.
+
+    `context` is the text of the chat history (compacted, so it stays bounded). The live
+    chat is only built from it when a turn needs the model (ensure_chat), so resuming a
+    session, or rendering it after it was evicted, creates no API objects.
+    """
+
+    def __init__(self, session_id, user, messages=None, context=None):
+        self.id = session_id
+        self.user = user
+        self.messages = messages or []
+        self.context = context or []
+        self.chat = None
+        # Content hashes of images already sent in the live chat
+        self.attached_images = set()
+        self.saved_messages = len(self.messages)
+        self.lock = threading.Lock()
+
+    def ensure_chat(self, factory):
+        """Returns the live chat, building it with factory(history) from the saved context on first use."""
+        if self.chat is None:
+            history = [types.Content(role=entry['role'], parts=[types.Part(text=p['text']) for p in entry['parts']])
+                       for entry in self.context]
+            self.chat = factory(history or None)
+            # Images are not part of the saved context; they are attached again when asked about
+            self.attached_images.clear()
+        return self.chat
+
+    def add_message(self, role, content):
+        self.messages.append({'role': role, 'content': content})
+
+
+class SessionStore:
+    """Web conversations in SQLite (WAL mode), keyed by the session id the page keeps in its URL.
+
+    save() after a turn inserts only the new transcript messages and rewrites the
+    session's compacted context, so a refresh or a server restart resumes the
+    conversation where it was. At most `cache_size` sessions are held in memory (LRU);
+    the rest cost nothing but their rows until they are opened again.
+    """
+
+    def __init__(self, path, cache_size=SESSION_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+        self.conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY,"
+            " user TEXT NOT NULL,"
+            " context TEXT NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " session TEXT NOT NULL,"
+            " role TEXT NOT NULL,"
+            " content TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages (session, id)")
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def create(self, user):
+        session = WebSession(uuid.uuid4().hex, user)
+        with self.lock:
+            self.conn.execute("INSERT INTO sessions (id, user, context, updated) VALUES (?, ?, ?, ?)",
+                              (session.id, user, "[]", time.time()))
+            self.conn.commit()
+            self._remember(session)
+        return session
+
+    def get(self, session_id, user):
+        """Returns the session from memory or disk, or None if it does not exist or belongs to another user."""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+            else:
+                session = self._load(session_id)
+                if session is None:
+                    return None
+                self._remember(session)
+        return session if session.user == user else None
+
+    def save(self, session):
+        """Writes the messages added since the last save and the current (compacted) chat context."""
+        with session.lock:
+            new_messages = session.messages[session.saved_messages:]
+            if session.chat is not None:
+                # One entry per turn, not one per streamed chunk
+                session.context = [{'role': content.role, 'parts': parts}
+                                   for content in coalesce_contents(session.chat.get_history(curated=True))
+                                   if (parts := merge_text_parts(content_to_parts(content)))]
+            with self.lock:
+                self.conn.executemany(
+                    "INSERT INTO messages (session, role, content) VALUES (?, ?, ?)",
+                    [(session.id, m['role'], m['content']) for m in new_messages],
+                )
+                self.conn.execute("UPDATE sessions SET context = ?, updated = ? WHERE id = ?",
+                                  (json.dumps(session.context, ensure_ascii=False), time.time(), session.id))
+                self.conn.commit()
+            session.saved_messages += len(new_messages)
+
+    def stats(self):
+        with self.lock:
+            return {'in_memory': len(self.sessions), 'loads': self.loads, 'evictions': self.evictions}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _load(self, session_id):
+        row = self.conn.execute("SELECT user, context FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        messages = [{'role': role, 'content': content} for role, content in self.conn.execute(
+            "SELECT role, content FROM messages WHERE session = ? ORDER BY id", (session_id,))]
+        self.loads += 1
+        return WebSession(session_id, row[0], messages, json.loads(row[1]))
+
+    def _remember(self, session):
+        self.sessions[session.id] = session
+        while len(self.sessions) > self.cache_size:
+            self.sessions.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,510 @@
+import array
+import math
+import queue
+import re
+import sys
+import threading
+import time
+import wave
+from collections import deque
+
+# --- Speech pipeline for the desktop assistant ---
+
+# Sentences a streamed reply may queue ahead of the voice before say_sentence() waits
+SPEECH_QUEUE_SIZE = 32
+
+# A sentence ends at ., ! or ? (optionally followed by quotes/brackets) and whitespace, or at a blank line.
+# A number of one or two digits followed by a period is a list item ("1. item"), not a sentence end.
+_SENTENCE_END = re.compile(r'(?<=[.!?])(?<!^\d\.)(?<!\s\d\.)(?<!^\d\d\.)(?<!\s\d\d\.)["\')\]]*\s+|\n\s*\n')
+
+
+def split_sentences(text):
+    """Splits text into sentences so each one can be spoken as soon as it is complete."""
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+class SentenceBuffer:
+    """Collects streamed text chunks and hands back whole sentences as soon as they are complete."""
+
+    def __init__(self):
+        self.pending = ""
+
+    def feed(self, chunk):
+        """Adds a chunk and returns the sentences it completed (possibly none)."""
+        self.pending += chunk
+        sentences = []
+        while True:
+            match = _SENTENCE_END.search(self.pending)
+            if not match:
+                break
+            sentence = self.pending[:match.start()].strip()
+            self.pending = self.pending[match.end():]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self):
+        """Returns whatever is left once the stream has ended."""
+        rest, self.pending = self.pending.strip(), ""
+        return [rest] if rest else []
+
+
+class SpeechWorker:
+    """A single background thread that owns the pyttsx3 engine and speaks queued sentences in order.
+
+    pyttsx3 engines are not thread-safe, so the engine is created and driven only on the
+    worker thread. `interrupt()` drops everything still queued and cuts off the sentence
+    currently being spoken, e.g. when the user issues a new command; nothing else is ever
+    dropped. `on_spoken(sentence, seconds)` is called on the worker thread after each
+    sentence has been spoken.
+    """
+
+    def __init__(self, voice_index=0, maxsize=SPEECH_QUEUE_SIZE, on_spoken=None):
+        self.voice_index = voice_index
+        self.on_spoken = on_spoken
+        # Unbounded, so say() never blocks; say_sentence() holds a streaming reply back at maxsize instead
+        self.queue = queue.Queue()
+        self.maxsize = maxsize
+        self.space = threading.Condition()
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.engine = None
+        self.ready = threading.Event()
+        # Set while a sentence is playing, so the microphone can ignore Nexus's own voice
+        self.speaking = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="nexus-speech", daemon=True)
+        self.thread.start()
+
+    def say(self, text):
+        """Queues text for speaking, one sentence at a time. Never blocks the caller."""
+        for sentence in split_sentences(text):
+            self.say_sentence(sentence, wait=False)
+
+    def say_sentence(self, sentence, wait=True):
+        """Queues an already split sentence.
+
+        While `maxsize` sentences are waiting, this blocks until the voice catches up, so a
+        long streamed reply is paced by the speech rather than cut short. Returns False if
+        interrupt() discarded the sentence while it waited.
+        """
+        generation = self.generation
+        with self.space:
+            while wait and self.queue.qsize() >= self.maxsize and generation == self.generation:
+                self.space.wait(timeout=0.5)
+            if generation != self.generation:
+                return False
+            self.queue.put((generation, sentence))
+        return True
+
+    def interrupt(self):
+        """Discards queued speech and stops the sentence that is currently playing."""
+        with self.lock:
+            self.generation += 1
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        with self.space:
+            self.space.notify_all()
+
+    def shutdown(self):
+        """Stops the worker thread after interrupting any pending speech."""
+        self.interrupt()
+        self.queue.put((None, None))
+
+    # --- Worker Thread ---
+
+    def _init_engine(self):
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        voices = engine.getProperty('voices')
+        if voices:
+            engine.setProperty('voice', voices[min(self.voice_index, len(voices) - 1)].id)
+        return engine
+
+    def _run(self):
+        try:
+            self.engine = self._init_engine()
+        except Exception as e:
+            print(f"Warning: Text-to-speech is unavailable: {e}")
+            self.engine = None
+        finally:
+            self.ready.set()
+
+        current = [0]
+
+        def on_word(name, location, length):
+            # Called by pyttsx3 from inside runAndWait, so stopping here is safe
+            if current[0] != self.generation:
+                self.engine.stop()
+
+        if self.engine is not None:
+            self.engine.connect('started-word', on_word)
+
+        while True:
+            generation, sentence = self.queue.get()
+            with self.space:
+                self.space.notify_all()
+            if sentence is None:
+                break
+            if generation != self.generation or self.engine is None:
+                continue
+            current[0] = generation
+            started = time.perf_counter()
+            self.speaking.set()
+            try:
+                self.engine.say(sentence)
+                self.engine.runAndWait()
+            except Exception as e:
+                print(f"Warning: Speech failed: {e}")
+                continue
+            finally:
+                self.speaking.clear()
+            if self.on_spoken is not None:
+                self.on_spoken(sentence, time.perf_counter() - started)
+
+
+# --- Continuous voice input for the desktop assistant ---
+
+# The first CALIBRATION_SECONDS of audio set the noise floor; after that it follows the
+# background noise between utterances (NOISE_ADAPT is the weight of each quiet frame).
+CALIBRATION_SECONDS = 0.5
+NOISE_ADAPT = 0.05
+# Speech has gaps between words; if even the quietest frame of this window is above the
+# threshold, it is louder background noise and becomes the new noise floor.
+NOISE_WINDOW_SECONDS = 2.0
+# A frame is speech when its RMS energy is ENERGY_RATIO times the noise floor (and at least MIN_ENERGY_THRESHOLD)
+ENERGY_RATIO = 2.5
+MIN_ENERGY_THRESHOLD = 300
+# Speech must last this long to start an utterance; this much silence ends it
+SPEECH_START_SECONDS = 0.1
+PAUSE_SECONDS = 0.8
+PHRASE_LIMIT_SECONDS = 15
+# Audio kept from just before the speech started, so the first syllable is not clipped
+PREROLL_SECONDS = 0.3
+# After the wake word alone, the next utterance within this many seconds counts as a command
+WAKE_WINDOW_SECONDS = 8
+# Utterances waiting for transcription; the oldest is dropped when full
+UTTERANCE_QUEUE_SIZE = 8
+
+
+def frame_energy(frame):
+    """RMS energy of a frame of 16-bit mono PCM."""
+    samples = array.array('h', frame[:len(frame) - len(frame) % 2])
+    if not samples:
+        return 0.0
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+class EnergySegmenter:
+    """Cuts a stream of audio frames into utterances using an adaptive energy threshold.
+
+    feed() returns the PCM bytes of an utterance once PAUSE_SECONDS of silence (or
+    PHRASE_LIMIT_SECONDS of speech) ends it, and None otherwise. The noise floor keeps
+    following the quiet frames, and jumps to the minimum of the last NOISE_WINDOW_SECONDS
+    when the noise gets louder than the threshold, so a fan switching on does not turn
+    into one endless utterance. `adapt=0` keeps the initial calibration.
+    """
+
+    def __init__(self, frame_seconds, pause_seconds=PAUSE_SECONDS, phrase_limit=PHRASE_LIMIT_SECONDS,
+                 adapt=NOISE_ADAPT, ratio=ENERGY_RATIO, min_threshold=MIN_ENERGY_THRESHOLD):
+        def frames(seconds):
+            return max(1, round(seconds / frame_seconds))
+
+        self.calibration_frames = frames(CALIBRATION_SECONDS)
+        self.start_frames = frames(SPEECH_START_SECONDS)
+        self.pause_frames = frames(pause_seconds)
+        self.limit_frames = frames(phrase_limit)
+        self.adapt = adapt
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.noise = None
+        self.calibrated = 0
+        self.preroll = deque(maxlen=frames(PREROLL_SECONDS) + self.start_frames)
+        self.recent = deque(maxlen=frames(NOISE_WINDOW_SECONDS))
+        self.reset()
+
+    @property
+    def threshold(self):
+        return max(self.min_threshold, (self.noise or 0.0) * self.ratio)
+
+    def reset(self):
+        """Drops any utterance in progress (the noise floor is kept)."""
+        self.frames = []
+        self.voiced_run = 0
+        self.silent_run = 0
+        self.preroll.clear()
+
+    def feed(self, frame):
+        energy = frame_energy(frame)
+        if self.calibrated < self.calibration_frames:
+            # Plain running mean over the calibration window
+            self.calibrated += 1
+            self.noise = energy if self.noise is None else self.noise + (energy - self.noise) / self.calibrated
+            return None
+        self.recent.append(energy)
+        voiced = energy > self.threshold
+        if self.adapt and voiced and len(self.recent) == self.recent.maxlen and min(self.recent) > self.threshold:
+            # No pause in the whole window: louder background noise, not speech
+            self.noise = min(self.recent)
+            self.reset()
+            return None
+        if not self.frames:
+            self.preroll.append(frame)
+            if not voiced:
+                self.voiced_run = 0
+                self.noise += self.adapt * (energy - self.noise)
+                return None
+            self.voiced_run += 1
+            if self.voiced_run >= self.start_frames:
+                self.frames = list(self.preroll)
+            return None
+
+        self.frames.append(frame)
+        self.silent_run = 0 if voiced else self.silent_run + 1
+        if self.silent_run < self.pause_frames and len(self.frames) < self.limit_frames:
+            return None
+        utterance = b"".join(self.frames)
+        self.reset()
+        return utterance
+
+
+class MicrophoneSource:
+    """The default microphone, opened once and read frame by frame (needs speech_recognition and PyAudio)."""
+
+    def __init__(self, device_index=None):
+        import speech_recognition as sr
+
+        self.microphone = sr.Microphone(device_index=device_index)
+        self.microphone.__enter__()
+        self.sample_rate = self.microphone.SAMPLE_RATE
+        self.sample_width = self.microphone.SAMPLE_WIDTH
+        self.frame_size = self.microphone.CHUNK
+
+    def read(self):
+        return self.microphone.stream.read(self.frame_size)
+
+    def close(self):
+        self.microphone.__exit__(None, None, None)
+
+
+class FileAudioSource:
+    """Plays 16-bit mono WAV files as if they were the microphone, for testing without audio hardware.
+
+    The files are read back to back with `gap_seconds` of silence after each, so every
+    utterance in them ends. With `realtime=True` read() paces itself like a live stream.
+    read() returns b"" once everything has been played.
+    """
+
+    def __init__(self, paths, frame_seconds=0.03, gap_seconds=1.0, realtime=False):
+        self.paths = [paths] if isinstance(paths, str) or not hasattr(paths, '__iter__') else list(paths)
+        self.realtime = realtime
+        self.chunks = deque()
+        self.sample_rate = None
+        for path in self.paths:
+            with wave.open(str(path), 'rb') as wav:
+                if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                    raise ValueError(f"{path}: only 16-bit mono WAV files are supported")
+                if self.sample_rate not in (None, wav.getframerate()):
+                    raise ValueError(f"{path}: all files must have the same sample rate")
+                self.sample_rate = wav.getframerate()
+                self.chunks.append(wav.readframes(wav.getnframes()))
+                self.chunks.append(bytes(2 * int(self.sample_rate * gap_seconds)))
+        self.sample_width = 2
+        self.frame_size = max(1, int(self.sample_rate * frame_seconds))
+        self.position = 0
+        self.next_frame_at = None
+
+    def read(self):
+        while self.chunks and self.position >= len(self.chunks[0]):
+            self.chunks.popleft()
+            self.position = 0
+        if not self.chunks:
+            return b""
+        frame = self.chunks[0][self.position:self.position + 2 * self.frame_size]
+        self.position += len(frame)
+        if self.realtime:
+            now = time.monotonic()
+            self.next_frame_at = (self.next_frame_at or now) + self.frame_size / self.sample_rate
+            if self.next_frame_at > now:
+                time.sleep(self.next_frame_at - now)
+        return frame
+
+    def close(self):
+        self.chunks.clear()
+
+
+class GoogleTranscriber:
+    """Transcribes PCM with speech_recognition's Google Web Speech API, reusing one Recognizer.
+
+    Returns None for audio that contained no recognisable speech; connection problems
+    raise speech_recognition.RequestError.
+    """
+
+    def __init__(self, language='en-in'):
+        import speech_recognition as sr
+
+        self.sr = sr
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def __call__(self, pcm, sample_rate, sample_width):
+        try:
+            return self.recognizer.recognize_google(self.sr.AudioData(pcm, sample_rate, sample_width), language=self.language)
+        except self.sr.UnknownValueError:
+            return None
+
+
+class ListeningService:
+    """Listens continuously and passes each spoken command to `on_utterance(text)`.
+
+    One capture thread keeps a single audio source open for the life of the service and
+    segments it with an EnergySegmenter, so a command costs no recognizer setup, device
+    open or calibration pause. A second thread transcribes the utterances, so a slow
+    recognition request never makes the capture fall behind.
+
+    With a `wake_word`, only utterances containing it are passed on (the text after it),
+    or the next utterance within WAKE_WINDOW_SECONDS if the wake word was said alone.
+    Audio is discarded while paused or while `suppress()` returns true, e.g. while Nexus
+    itself is speaking. `on_error(message)` reports a source or transcription failure.
+    """
+
+    def __init__(self, on_utterance, source_factory=MicrophoneSource, transcribe=None, wake_word=None,
+                 on_error=None, suppress=None, **segmenter_options):
+        self.on_utterance = on_utterance
+        self.source_factory = source_factory
+        self.transcribe = transcribe
+        self.wake_pattern = re.compile(rf"\b{re.escape(wake_word)}\b[\s,.!?]*", re.I) if wake_word else None
+        self.on_error = on_error
+        self.suppress = suppress
+        self.segmenter_options = segmenter_options
+        self.segmenter = None
+        self.awake_until = 0.0
+        self.active = threading.Event()
+        self.stopped = threading.Event()
+        self.utterances = queue.Queue(maxsize=UTTERANCE_QUEUE_SIZE)
+        self.stats = {'utterances': 0, 'commands': 0, 'ignored': 0, 'dropped': 0, 'failed': 0, 'transcribe_seconds': 0.0}
+        self.threads = []
+
+    @property
+    def listening(self):
+        return self.active.is_set() and not self.stopped.is_set()
+
+    def start(self):
+        """Starts (or resumes) listening; the source is opened on the first call only."""
+        self.active.set()
+        if not self.threads:
+            self.threads = [threading.Thread(target=self._capture, name="nexus-listen", daemon=True),
+                            threading.Thread(target=self._recognize, name="nexus-transcribe", daemon=True)]
+            for thread in self.threads:
+                thread.start()
+
+    def pause(self):
+        """Stops passing on speech; the source stays open, so resuming is instant."""
+        self.active.clear()
+
+    def stop(self):
+        self.stopped.set()
+        self.active.set()
+
+    def join(self, timeout=None):
+        """Waits until the source is exhausted (a FileAudioSource) and every utterance is handled."""
+        for thread in self.threads:
+            thread.join(timeout)
+
+    # --- Capture Thread ---
+
+    def _capture(self):
+        try:
+            source = self.source_factory()
+        except Exception as e:
+            self._report(f"Could not open the microphone: {e}")
+            self.utterances.put(None)
+            return
+        self.segmenter = EnergySegmenter(source.frame_size / source.sample_rate, **self.segmenter_options)
+        try:
+            while not self.stopped.is_set():
+                frame = source.read()
+                if not frame:
+                    break
+                # Frames are always read, so the device buffer never overflows while paused
+                if not self.active.is_set() or (self.suppress is not None and self.suppress()):
+                    self.segmenter.reset()
+                    continue
+                pcm = self.segmenter.feed(frame)
+                if pcm is not None:
+                    self._enqueue((pcm, source.sample_rate, source.sample_width))
+        except Exception as e:
+            self._report(f"Voice capture stopped: {e}")
+        finally:
+            source.close()
+            self.utterances.put(None)
+
+    def _enqueue(self, item):
+        self.stats['utterances'] += 1
+        while True:
+            try:
+                self.utterances.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.utterances.get_nowait()
+                    self.stats['dropped'] += 1
+                except queue.Empty:
+                    pass
+
+    # --- Transcription Thread ---
+
+    def _recognize(self):
+        if self.transcribe is None:
+            try:
+                self.transcribe = GoogleTranscriber()
+            except Exception as e:
+                self._report(f"Voice recognition is unavailable: {e}")
+                return
+        while True:
+            item = self.utterances.get()
+            if item is None:
+                return
+            started = time.perf_counter()
+            try:
+                text = self.transcribe(*item)
+            except Exception as e:
+                self.stats['failed'] += 1
+                self._report(f"Could not connect to the voice recognition service: {e}")
+                continue
+            finally:
+                self.stats['transcribe_seconds'] += time.perf_counter() - started
+            command = self._gate(text.strip()) if text else None
+            if not command:
+                self.stats['ignored'] += 1
+                continue
+            self.stats['commands'] += 1
+            try:
+                self.on_utterance(command)
+            except Exception as e:
+                print(f"Warning: Voice command handler failed: {e}")
+
+    def _gate(self, text):
+        """Applies the wake word; returns the command text or None."""
+        if self.wake_pattern is None:
+            return text
+        match = self.wake_pattern.search(text)
+        if match:
+            rest = text[match.end():].strip()
+            self.awake_until = 0.0 if rest else time.monotonic() + WAKE_WINDOW_SECONDS
+            return rest or None
+        if time.monotonic() < self.awake_until:
+            self.awake_until = 0.0
+            return text
+        return None
+
+    def _report(self, message):
+        if self.on_error is not None:
+            self.on_error(message)
+        else:
+            print(f"Warning: {message}")
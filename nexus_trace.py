@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from nexus_agent import LatencyStats
+
+# --- Per-turn tracing shared by both Nexus front-ends ---
+
+# Rolling window of samples per span name used for the percentiles in the stats panels
+TRACE_WINDOW = 500
+
+
+class Trace:
+    """The spans of one user turn. Spans may be added from any thread.
+
+    Span names are dotted: 'model.send_message', 'tool.<name>', 'speech.*', 'save.*'.
+    Token counts come from the responses' usage metadata via add_usage().
+    """
+
+    def __init__(self, tracer, frontend, attrs):
+        self.tracer = tracer
+        self.id = uuid.uuid4().hex[:12]
+        self.frontend = frontend
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self.tokens = {'prompt': 0, 'output': 0, 'total': 0}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, start=None, **attrs):
+        """Adds a span whose duration was measured elsewhere (`start` is a perf_counter value)."""
+        span = {
+            'name': name,
+            'start_ms': round(((start if start is not None else time.perf_counter() - seconds) - self.started) * 1000, 2),
+            'duration_ms': round(seconds * 1000, 2),
+        }
+        span.update(attrs)
+        with self.lock:
+            self.spans.append(span)
+        self.tracer.stats.record(name, seconds)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        started = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record(name, time.perf_counter() - started, start=started, **attrs)
+
+    def add_usage(self, usage):
+        """Adds a response's usage_metadata (None is ignored)."""
+        if usage is None:
+            return
+        with self.lock:
+            self.tokens['prompt'] += usage.prompt_token_count or 0
+            self.tokens['output'] += usage.candidates_token_count or 0
+            self.tokens['total'] += usage.total_token_count or 0
+
+    def has(self, name):
+        with self.lock:
+            return any(s['name'] == name for s in self.spans)
+
+    def total(self, prefix):
+        """Summed duration in seconds of the spans whose name starts with prefix."""
+        with self.lock:
+            return sum(s['duration_ms'] for s in self.spans if s['name'].startswith(prefix)) / 1000
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.started
+            self.tracer.finish(self)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'trace': self.id,
+                'frontend': self.frontend,
+                'time': self.started_at,
+                'duration_ms': round((self.duration or 0) * 1000, 2),
+                'tokens': dict(self.tokens),
+                'spans': list(self.spans),
+                **self.attrs,
+            }
+
+
+class Tracer:
+    """Creates turn traces, keeps rolling percentiles per span name and appends finished turns to a JSONL file."""
+
+    def __init__(self, path=None, window=TRACE_WINDOW):
+        self.path = path
+        self.stats = LatencyStats(window)
+        self.lock = threading.Lock()
+        self.turns = 0
+        self.tokens = {'prompt': 0, 'output': 0, 'total': 0}
+        self.last = None
+
+    def start_turn(self, frontend, **attrs):
+        return Trace(self, frontend, attrs)
+
+    @contextmanager
+    def turn(self, frontend, **attrs):
+        trace = self.start_turn(frontend, **attrs)
+        try:
+            yield trace
+        finally:
+            trace.finish()
+
+    def finish(self, trace):
+        self.stats.record('turn', trace.duration)
+        record = trace.to_dict()
+        with self.lock:
+            self.turns += 1
+            for key, value in trace.tokens.items():
+                self.tokens[key] += value
+            self.last = trace
+            if self.path is not None:
+                try:
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                except OSError as e:
+                    print(f"Warning: Could not write trace to {self.path}: {e}")
+
+    def rows(self):
+        """One row per span name for a stats table: count, p50/p95/p99 in ms."""
+        with self.stats.lock:
+            counts = {name: len(samples) for name, samples in self.stats.samples.items()}
+        rows = []
+        for name in sorted(counts, key=lambda n: (n != 'turn', n)):
+            pct = self.stats.percentiles(name, (50, 95, 99))
+            rows.append({'span': name, 'n': counts[name], 'p50 ms': round(pct[50], 1),
+                         'p95 ms': round(pct[95], 1), 'p99 ms': round(pct[99], 1)})
+        return rows
+
+    def status_line(self):
+        """Compact one-line readout: last turn broken down, rolling turn percentiles and token total."""
+        last = self.last
+        if last is None:
+            return "No turns traced yet"
+        pct = self.stats.percentiles('turn', (50, 95))
+        return (f"Last turn {last.duration:.1f}s (model {last.total('model.'):.1f}s, tools {last.total('tool.'):.1f}s, "
+                f"save {last.total('save.'):.2f}s) | p50 {pct[50] / 1000:.1f}s p95 {pct[95] / 1000:.1f}s | "
+                f"{self.tokens['total']} tokens")
@@ -1,27 +1,58 @@
-import speech_recognition as sr
-import pyttsx3
-import datetime
 import time
+
+# --- Startup profiling (python nexus_v2_0.py --profile-startup) ---
+STARTUP_TIMINGS = []
+_last_startup_mark = time.perf_counter()
+
+def startup_mark(label):
+    """Records how long the startup step that just finished took."""
+    global _last_startup_mark
+    now = time.perf_counter()
+    STARTUP_TIMINGS.append((label, now - _last_startup_mark))
+    _last_startup_mark = now
+
+import sys
+import datetime
 import os
 import webbrowser
-import pywhatkit
 import json
+import queue
 from pathlib import Path
 import threading
 import subprocess 
 import re 
+startup_mark("import stdlib")
+
 from tkinter import filedialog
-from PIL import Image
 from tkinter import scrolledtext
 import tkinter as tk
 from tkinter import messagebox
+import customtkinter as ctk
+startup_mark("import tkinter + customtkinter")
 
 from dotenv import load_dotenv
 
-import customtkinter as ctk
-
-from google import genai
-from google.genai import types
+# Heavy optional modules are imported where they are first used:
+#   google.genai       -> init_gemini (background thread)
+#   speech_recognition -> ListeningService threads (first Talk click)
+#   pywhatkit          -> web_search / play_on_youtube
+#   PIL                -> nexus_images (image prompts)
+DEFERRED_IMPORTS = ("google.genai", "speech_recognition", "pywhatkit", "PIL.Image")
+
+from nexus_agent import MODEL_NAME, SYSTEM_INSTRUCTION, read_only_tools, tool_options
+from nexus_cache import ResponseCache, context_fingerprint, record_cached_turn
+from nexus_client import build_tool_declarations
+from nexus_commands import CommandQueue
+from nexus_core import AgentCore
+from nexus_history import ChatHistoryStore, ContextCompactor
+from nexus_images import IMAGE_CACHE
+from nexus_intents import IntentRouter
+from nexus_notes import NoteIndex, NoteStore
+from nexus_reminders import ReminderScheduler, describe_delay, parse_time_to_seconds
+from nexus_retry import CallGuard, is_capacity_error
+from nexus_speech import FileAudioSource, ListeningService, MicrophoneSource, SentenceBuffer, SpeechWorker
+from nexus_trace import Tracer
+startup_mark("import nexus modules")
 
 # --- CRITICAL FIX 1: Load .env file at startup ---
 load_dotenv() 
@@ -31,22 +62,22 @@ load_dotenv()
 
 MEMORY_FILE = Path("assistant_memory.json")
 CHAT_HISTORY_FILE = Path("chat_history.json") 
+HISTORY_DB_FILE = Path("chat_history.db")
+REMINDERS_FILE = Path("reminders.json")
+RESPONSE_CACHE_FILE = Path("response_cache.json")
+TRACE_FILE = Path("nexus_traces.jsonl")
 
-def load_memory():
-    """Loads long-term memory notes from the JSON file."""
-    if MEMORY_FILE.exists():
-        try:
-            with open(MEMORY_FILE, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print("Warning: Memory file is corrupted, starting with an empty long-term memory.")
-            return []
-    return []
+# Cached answers are only reused while the model and the instruction they came from are unchanged
+RESPONSE_FINGERPRINT = context_fingerprint("desktop", MODEL_NAME, SYSTEM_INSTRUCTION)
 
-def save_memory(notes):
-    """Saves the current list of long-term notes to the JSON file."""
-    with open(MEMORY_FILE, 'w') as f:
-        json.dump(notes, f, indent=4)
+# The log area is refreshed at most once per frame and keeps only the newest lines
+LOG_FLUSH_MS = 16
+LOG_MAX_LINES = 2000
+
+# Voice commands must start with this word when set (None: every utterance is a command)
+WAKE_WORD = None
+# python nexus_v2_0.py --voice-file recording.wav feeds a recording through the voice pipeline instead of the microphone
+VOICE_FILE = sys.argv[sys.argv.index("--voice-file") + 1] if "--voice-file" in sys.argv[:-1] else None
 
 def load_chat_history():
     """Loads chat history from JSON file for persistence."""
@@ -55,27 +86,25 @@ def load_chat_history():
             return json.load(f)
     return []
 
-def save_chat_history(history):
-    """Saves the current chat history list to JSON file."""
-    serializable_history = []
-    
-    for content in history:
-        serializable_parts = [
-            {'text': part.text} 
-            for part in content.parts if part.text
-        ]
-        if serializable_parts:
-            serializable_history.append({
-                'role': content.role,
-                'parts': serializable_parts
-            })
-        
-    with open(CHAT_HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(serializable_history, f, indent=4)
+def migrate_chat_history(store):
+    """Imports the legacy chat_history.json into the SQLite store the first time it runs."""
+    if len(store) == 0 and CHAT_HISTORY_FILE.exists():
+        imported = store.import_json(load_chat_history())
+        print(f"Imported {imported} chat turns from {CHAT_HISTORY_FILE} into {HISTORY_DB_FILE}.")
 
 
-PERSONAL_NOTES = load_memory()
+NOTE_STORE = NoteStore(MEMORY_FILE)
+PERSONAL_NOTES = NOTE_STORE.load()
+NOTE_INDEX = NoteIndex(PERSONAL_NOTES)
 print(f"Loaded {len(PERSONAL_NOTES)} personal notes from memory.")
+startup_mark("load + index personal notes")
+
+HISTORY_STORE = ChatHistoryStore(HISTORY_DB_FILE)
+migrate_chat_history(HISTORY_STORE)
+startup_mark("open chat history")
+
+# Answers to repeated, context-free questions are served without a model round trip
+RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_FILE)
 
 # --- 1. Global Tool Setup ---
 
@@ -89,74 +118,53 @@ global_app_speak = lambda text: print(f"Assistant: {text}")
 
 # --- 2. Tool Definitions ---
 
-@add_tool
-def web_search(query: str):
-    """Searches the web using Google and opens the default browser to the search results."""
-    global_app_speak(f"Searching the web for: {query}")
-    try:
-        pywhatkit.search(query)
-        return f"I have opened your default browser to the search results for '{query}'."
-    except Exception as e:
-        return f"Error opening the web browser: {e}"
-
-@add_tool
-def play_on_youtube(topic: str):
-    """Opens YouTube and plays a video related to the given topic."""
-    global_app_speak(f"Attempting to play '{topic}' on YouTube.")
-    try:
-        pywhatkit.playonyt(topic)
-        return f"Video for '{topic}' is now playing on YouTube."
-    except Exception as e:
-        return f"I was unable to play the video on YouTube: {e}"
-
-@add_tool
-def check_current_time():
-    """Returns the current local time."""
-    now = datetime.datetime.now().strftime("%I:%M %p")
-    return f"The current time is {now}"
+# web_search, play_on_youtube, check_current_time and retrieve_personal_notes live in nexus_agent,
+# so batch mode replays prompts against the same tools. global_app_speak is looked up per call.
+AVAILABLE_TOOLS.update(read_only_tools(NOTE_INDEX, announce=lambda text: global_app_speak(text)))
 
 @add_tool
+@tool_options(thread_safe=False)
 def add_personal_note(note_text: str):
     """Saves a piece of personal information or a key preference for later retrieval."""
     global_app_speak("Acknowledged. Saving a personal note.")
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    PERSONAL_NOTES.append({'time': timestamp, 'note': note_text})
-    save_memory(PERSONAL_NOTES)
+    note = {'time': timestamp, 'note': note_text}
+    NOTE_STORE.append(note)
+    NOTE_INDEX.add(note)
     return f"I have successfully remembered the note: '{note_text}'"
 
 @add_tool
-def retrieve_personal_notes(query: str):
-    """Returns all stored personal notes for the AI to process."""
-    if not PERSONAL_NOTES:
-        return "I have no personal notes saved yet."
-    note_strings = [f"Time: {n['time']}, Note: {n['note']}" for n in PERSONAL_NOTES]
-    return "The user's stored notes are:\n" + "\n".join(note_strings)
-
-def reminder_worker(delay_seconds, reminder_text):
-    """The function run by the background thread to wait and speak the reminder."""
-    print(f"\nScheduler: Timer started for {delay_seconds} seconds.")
-    time.sleep(delay_seconds)
-    global_app_speak(f"REMINDER! {reminder_text}")
-    print("\nListening...")
-
-def parse_time_to_seconds(time_string: str) -> int:
-    """Converts a time phrase (e.g., '5 minutes and 10 seconds') into total seconds."""
-    time_string = time_string.lower()
-    parts = time_string.split()
-    total_seconds = 0
-    try:
-        for i, part in enumerate(parts):
-            if part.isdigit():
-                value = int(part)
-                if i + 1 < len(parts):
-                    unit = parts[i+1]
-                    if 'second' in unit: total_seconds += value
-                    elif 'minute' in unit: total_seconds += value * 60
-                    elif 'hour' in unit: total_seconds += value * 3600
-        if total_seconds == 0 and parts and parts[0].isdigit():
-             total_seconds = int(parts[0]) * 60
-    except Exception: return 0 
-    return max(0, min(total_seconds, 3600))
+def recall_earlier_conversation(query: str):
+    """Searches older conversation turns that are no longer in the active chat context."""
+    terms = [t for t in query.lower().split() if len(t) > 2]
+    matches = []
+    before_id = None
+    # Page backwards through history only as far as needed
+    for _ in range(10):
+        page = HISTORY_STORE.page(before_id)
+        if not page:
+            break
+        for entry in reversed(page):
+            text = " ".join(p['text'] for p in entry['parts'])
+            if not terms or any(t in text.lower() for t in terms):
+                matches.append(f"{entry['role']}: {text[:500]}")
+                if len(matches) >= 5:
+                    break
+        if len(matches) >= 5:
+            break
+        before_id = page[0]['id']
+    if not matches:
+        return "I could not find anything about that in our earlier conversations."
+    return "Earlier conversation turns (newest first):\n" + "\n".join(matches)
+
+def on_reminder_due(reminder, late_seconds):
+    """Called on the scheduler thread when a reminder fires."""
+    if late_seconds > 60:
+        global_app_speak(f"REMINDER (missed while Nexus was closed, due {reminder.due_display()})! {reminder.text}")
+    else:
+        global_app_speak(f"REMINDER! {reminder.text}")
+
+REMINDER_SCHEDULER = ReminderScheduler(REMINDERS_FILE, on_reminder_due)
 
 @add_tool
 def set_reminder(time_string: str, reminder_text: str):
@@ -164,13 +172,24 @@ def set_reminder(time_string: str, reminder_text: str):
     delay = parse_time_to_seconds(time_string)
     if delay <= 0: return "I could not understand the duration for the reminder. Please be specific."
     
-    timer_thread = threading.Thread(target=reminder_worker, args=(delay, reminder_text))
-    timer_thread.daemon = True
-    timer_thread.start()
-    
-    minutes, seconds = divmod(delay, 60)
-    time_display = f"{minutes} minutes and {seconds} seconds" if minutes > 0 else f"{seconds} seconds"
-    return f"Reminder set successfully! I will remind you to '{reminder_text}' in {time_display}."
+    reminder = REMINDER_SCHEDULER.add(delay, reminder_text)
+    return f"Reminder set successfully! I will remind you to '{reminder_text}' in {describe_delay(delay)} (reminder id {reminder.id})."
+
+@add_tool
+def list_reminders():
+    """Lists all pending reminders with their ids and due times."""
+    pending = REMINDER_SCHEDULER.pending()
+    if not pending:
+        return "There are no pending reminders."
+    return "Pending reminders:\n" + "\n".join(f"[{r.id}] {r.due_display()}: {r.text}" for r in pending)
+
+@add_tool
+def cancel_reminder(reminder_id: str):
+    """Cancels a pending reminder by its id (use list_reminders to find the id)."""
+    reminder = REMINDER_SCHEDULER.cancel(reminder_id)
+    if reminder is None:
+        return f"There is no pending reminder with id '{reminder_id}'."
+    return f"Cancelled the reminder to '{reminder.text}'."
 
 @add_tool
 def open_application(app_name: str):
@@ -200,6 +219,7 @@ def open_application(app_name: str):
         return f"An unknown error occurred while trying to launch {app_name}: {e}"
 
 @add_tool
+@tool_options(thread_safe=False)
 def take_quick_note(note_text: str):
     """Saves a text note instantly to a temporary local file named 'quick_note.txt'."""
     global_app_speak(f"Using take_quick_note tool to save a transient note.")
@@ -212,6 +232,15 @@ def take_quick_note(note_text: str):
         return f"Could not save the quick note due to an error: {e}"
 
 
+INTENT_ROUTER = IntentRouter(AVAILABLE_TOOLS)
+# Every model request goes through one rate limiter, retry policy and circuit breaker
+CALL_GUARD = CallGuard()
+# The tool loop runs on the agent core's event loop; handle_command only consumes its events
+AGENT = AgentCore(AVAILABLE_TOOLS, guard=CALL_GUARD)
+# Per-turn spans (model, tools, speech, saves), appended to TRACE_FILE and summarised in the status bar
+TRACER = Tracer(TRACE_FILE)
+
+
 # --- 3. GUI Application Class (V2.0) ---
 
 class AssistantApp:
@@ -226,16 +255,34 @@ class AssistantApp:
         master.grid_columnconfigure(0, weight=1)
         master.grid_rowconfigure(0, weight=1)
 
-        # 1. Initialize TTS and set global speak reference
+        # 1. Initialize TTS (engine is created on the speech thread) and set global speak reference
         self.init_tts()
         global global_app_speak
         global_app_speak = self.speak
+        startup_mark("start TTS worker")
         
         # 2. Set up GUI components (CRITICAL: Creates self.log_area)
         self.setup_ui() 
+        startup_mark("build UI")
         
-        # 3. Initialize Gemini (CRITICAL: NOW self.log_area exists)
-        self.init_gemini()
+        # 3. Initialize Gemini off the UI thread (CRITICAL: NOW self.log_area exists)
+        self.chat_ready = False
+        self.chat = None
+        self.gemini_ready = threading.Event()
+        self.gemini_init_seconds = None
+        threading.Thread(target=self.init_gemini, name="nexus-gemini-init", daemon=True).start()
+
+        # 4. Reminders fire (and missed ones are announced) once the app can speak
+        REMINDER_SCHEDULER.start()
+
+        # 5. Continuous voice input, created on the first Talk click
+        self.listener = None
+
+        # 6. Single consumer for typed and voice commands (one chat turn at a time)
+        self.commands = CommandQueue(
+            self.run_queued_command,
+            on_depth=lambda depth: self.master.after(0, self.update_queue_depth, depth),
+        )
         
         self.speak("Nexus is starting up. Click the microphone to talk or type your command below.")
         
@@ -243,31 +290,36 @@ class AssistantApp:
 
     # --- Initialization Methods ---
     def init_tts(self):
-        self.engine = pyttsx3.init()
-        voices = self.engine.getProperty('voices')
-        self.engine.setProperty('voice', voices[0].id) 
+        # One worker thread owns the pyttsx3 engine; everything else just queues sentences
+        self.speech = SpeechWorker(voice_index=0, on_spoken=lambda sentence, seconds: TRACER.stats.record('speech.sentence', seconds))
 
-    def speak(self, text):
-        """FIXED: Converts text to speech on a separate thread to prevent blocking the GUI and other methods."""
-        self.log_message(f"{text}", tag="assistant_speech")
-        
-        def run_speech():
-            self.engine.say(text)
-            self.engine.runAndWait()
-
-        threading.Thread(target=run_speech).start()
+    def speak(self, text, log=True):
+        """Logs the text and queues it for the speech worker, so the GUI and other methods never block."""
+        if log:
+            self.log_message(f"{text}", tag="assistant_speech")
+        self.speech.say(text)
 
     def init_gemini(self):
-        self.chat_ready = False
-        self.chat = None
+        """Runs on a background thread; commands wait on self.gemini_ready before using the chat."""
+        started = time.perf_counter()
+        try:
+            self._init_gemini()
+        finally:
+            self.gemini_init_seconds = time.perf_counter() - started
+            self.gemini_ready.set()
 
+    def _init_gemini(self):
         if "GEMINI_API_KEY" not in os.environ:
             self.log_message("SYSTEM ERROR: GEMINI_API_KEY environment variable not set. Core AI is disabled.", "system")
-            self.status_label.configure(text="Status: API KEY MISSING (AI Disabled)", text_color="red")
+            self.master.after(0, lambda: self.status_label.configure(text="Status: API KEY MISSING (AI Disabled)", text_color="red"))
             return
 
+        from google import genai
+        from google.genai import types
+
         # --- HISTORY LOADING (Fixes 4 & 5) ---
-        raw_history = load_chat_history()
+        # Only the newest window of turns goes into the session; older ones stay in SQLite
+        raw_history = HISTORY_STORE.recent()
         history_for_chat = []
         for entry in raw_history:
             # FIX APPLIED HERE: Use the explicit Part constructor to avoid TypeError
@@ -275,41 +327,73 @@ class AssistantApp:
             if parts:
                 history_for_chat.append(types.Content(role=entry['role'], parts=parts))
 
-        tool_list = list(AVAILABLE_TOOLS.values())
-
-        tool_config = types.GenerateContentConfig(
-            tools=tool_list,
-            system_instruction="You are a dedicated, efficient, and slightly witty personal AI assistant named 'Nexus'. You use clear, concise language and always mention which tool you are using before providing the final answer, especially when performing a task for the user.",
+        # Declarations rather than callables: the agent core executes the calls, not the SDK
+        self.tool_config = types.GenerateContentConfig(
+            tools=[build_tool_declarations(AVAILABLE_TOOLS)],
+            system_instruction=SYSTEM_INSTRUCTION,
         )
         try:
             self.client = genai.Client()
-            self.chat = self.client.chats.create(
-                model='gemini-2.5-flash', 
-                config=tool_config,
-                history=history_for_chat
-            )
+            self.chat = self.create_chat(history_for_chat)
+            self.compactor = ContextCompactor(self.client, guard=CALL_GUARD)
             self.chat_ready = True
+            # Everything up to here is already stored; only turns after this index are new
+            self.persisted_turns = len(self.chat.get_history())
             self.log_message("System: Gemini AI Client Initialized successfully.", "system")
-            self.status_label.configure(text="Status: Ready (AI Active)", text_color="green")
+            self.master.after(0, lambda: self.status_label.configure(text="Status: Ready (AI Active)", text_color="green"))
         except Exception as e:
             self.log_message(f"CRITICAL ERROR: Could not initialize Gemini Client. Details: {e}", "system")
-            self.status_label.configure(text="Status: AI Initialization Failed!", text_color="red")
-            messagebox.showerror("Gemini Error", f"Could not initialize Gemini Client. Details: {e}")
-            self.master.quit()
+            self.master.after(0, self.show_gemini_error, e)
+
+    def show_gemini_error(self, error):
+        self.status_label.configure(text="Status: AI Initialization Failed!", text_color="red")
+        messagebox.showerror("Gemini Error", f"Could not initialize Gemini Client. Details: {error}")
+        self.master.quit()
 
     # --- New Closing Protocol ---
     def on_closing(self):
-        """Saves chat history before closing the application."""
+        """Flushes any unsaved chat turns before closing the application."""
         if self.chat_ready:
             try:
-                history = self.chat.get_history()
-                save_chat_history(history)
+                self.persist_new_turns()
                 self.log_message("System: Chat history saved successfully.", "system")
             except Exception as e:
                 self.log_message(f"Warning: Failed to save chat history: {e}", "system")
         
+        print(INTENT_ROUTER.latency_report())
+        print(TRACER.stats.report())
+        if self.listener is not None:
+            self.listener.stop()
+        self.commands.close()
+        self.speech.shutdown()
         self.master.destroy()
 
+    def create_chat(self, history):
+        return self.client.aio.chats.create(
+            model=MODEL_NAME, 
+            config=self.tool_config,
+            history=history
+        )
+
+    def compact_context(self):
+        """Summarises older turns once the live context grows past the compaction threshold.
+
+        Must run after persist_new_turns(): the full turns are already in the history database.
+        """
+        new_chat = self.compactor.maybe_compact(self.chat, self.create_chat)
+        if new_chat is not None:
+            self.chat = new_chat
+            self.persisted_turns = len(new_chat.get_history())
+            self.log_message(f"System: Compacted older conversation context ({self.compactor.tokens_saved} tokens saved so far).", "system")
+
+    def persist_new_turns(self):
+        """Appends the turns added to the chat since the last call to the history database."""
+        history = self.chat.get_history()
+        new_turns = history[self.persisted_turns:]
+        if new_turns:
+            HISTORY_STORE.append_contents(new_turns)
+            self.persisted_turns = len(history)
+
     # --- UI Setup ---
     def setup_ui(self):
         """Creates the modern UI widgets with improved scaling and branding."""
@@ -338,6 +422,13 @@ class AssistantApp:
         self.log_area = scrolledtext.ScrolledText(self.conv_container, wrap=tk.WORD, bg="#1E1E1E", fg="white", bd=0, relief=tk.FLAT, font=('Arial', 12)) 
         self.log_area.grid(row=0, column=0, sticky="nsew")
         self.log_area.config(state=tk.DISABLED)
+        self.log_area.tag_config('system', foreground='#FFD700', justify=tk.LEFT)
+        self.log_area.tag_config('user', foreground='white', justify=tk.LEFT)
+        self.log_area.tag_config('assistant_speech', foreground='#ADD8E6', justify=tk.LEFT)
+
+        # Worker threads only queue log text; the Tk thread writes it in batches
+        self.log_queue = queue.SimpleQueue()
+        self.master.after(LOG_FLUSH_MS, self.flush_log)
 
 
         # --- C. Input and Status Areas ---
@@ -358,7 +449,7 @@ class AssistantApp:
         ctk.CTkButton(input_frame, text="🖼️ Image", command=self.open_image_dialog, width=80).grid(row=0, column=1, padx=5, pady=10)
         ctk.CTkButton(input_frame, text="Send", command=self.process_text_command, width=80).grid(row=0, column=2, padx=5, pady=10)
         
-        self.talk_button = ctk.CTkButton(input_frame, text="🎤 Talk", command=self.start_voice_thread, fg_color="green", hover_color="#004d00", width=80)
+        self.talk_button = ctk.CTkButton(input_frame, text="🎤 Talk", command=self.toggle_listening, fg_color="green", hover_color="#004d00", width=80)
         self.talk_button.grid(row=0, column=3, padx=(5, 10), pady=10)
         
         # Status Area
@@ -369,14 +460,19 @@ class AssistantApp:
         self.status_label = ctk.CTkLabel(status_area, text="Status: Starting...", anchor="w", font=('Arial', 10))
         self.status_label.grid(row=0, column=0, sticky='w', padx=5)
 
+        self.queue_label = ctk.CTkLabel(status_area, text="", anchor="e", font=('Arial', 10))
+        self.queue_label.grid(row=0, column=1, sticky='e', padx=5)
+
         self.progress_bar = ctk.CTkProgressBar(status_area, width=100)
         self.progress_bar.set(0)
-        self.progress_bar.grid(row=0, column=1, sticky='e', padx=5)
+        self.progress_bar.grid(row=0, column=2, sticky='e', padx=5)
+
+        # Where the time of the last turn went, plus rolling percentiles (see nexus_traces.jsonl for details)
+        self.trace_label = ctk.CTkLabel(status_area, text="", anchor="w", font=('Arial', 9), text_color="gray")
+        self.trace_label.grid(row=1, column=0, columnspan=3, sticky='w', padx=5)
 
     def log_message(self, message, tag=None):
-        """Inserts formatted text into the log area, handling labels (Fix 2)."""
-        self.log_area.configure(state="normal") 
-        
+        """Queues a labelled log line; safe to call from any thread (Fix 2)."""
         if tag == "system":
             label = "[SYSTEM] "
         elif tag == "user":
@@ -386,14 +482,80 @@ class AssistantApp:
         else:
             label = ""
         
-        self.log_area.insert(tk.END, f"\n{label}{message}", tag)
-        
-        self.log_area.tag_config('system', foreground='#FFD700', justify=tk.LEFT)
-        self.log_area.tag_config('user', foreground='white', justify=tk.LEFT)
-        self.log_area.tag_config('assistant_speech', foreground='#ADD8E6', justify=tk.LEFT)
-        
-        self.log_area.see(tk.END) 
-        self.log_area.configure(state="disabled")
+        self.log_queue.put((f"\n{label}{message}", tag))
+
+    def append_to_log(self, text, tag=None):
+        """Queues text for the current log line without a label (used for streamed replies)."""
+        self.log_queue.put((text, tag))
+
+    def flush_log(self):
+        """Runs on the Tk thread every LOG_FLUSH_MS: writes everything queued with one insert and one scroll."""
+        pending = []
+        try:
+            while True:
+                text, tag = self.log_queue.get_nowait()
+                pending.append(text)
+                pending.append(tag or ())
+        except queue.Empty:
+            pass
+
+        if pending:
+            started = time.perf_counter()
+            self.log_area.configure(state="normal")
+            self.log_area.insert(tk.END, *pending)
+            # Keep the widget small so inserts stay fast in long sessions
+            line_count = int(self.log_area.index("end-1c").split(".")[0])
+            if line_count > LOG_MAX_LINES:
+                self.log_area.delete("1.0", f"{line_count - LOG_MAX_LINES + 1}.0")
+            self.log_area.see(tk.END)
+            self.log_area.configure(state="disabled")
+            TRACER.stats.record('ui.log_flush', time.perf_counter() - started)
+
+        self.master.after(LOG_FLUSH_MS, self.flush_log)
+
+    def stream_reply(self, contents, trace=None, tools_used=None):
+        """Runs one turn (including its tool calls) on the agent core and renders it as it streams in.
+
+        Each sentence is handed to the speech worker as soon as it is complete, so Nexus starts
+        talking while the rest of the answer is still being generated. Returns the final
+        answer text; the names of the tools called are added to `tools_used`.
+        """
+        sentences = SentenceBuffer()
+        started_line = False
+        final_text = ""
+        for event in AGENT.stream(self.chat, contents, trace=trace):
+            if event.kind == 'text':
+                if not started_line:
+                    self.log_message("", tag="assistant_speech")
+                    started_line = True
+                self.append_to_log(event.text, "assistant_speech")
+                for sentence in sentences.feed(event.text):
+                    if trace is not None and not trace.has('speech.first_sentence'):
+                        # Time from the start of the turn until Nexus can start talking
+                        trace.record('speech.first_sentence', time.perf_counter() - trace.started, start=trace.started)
+                    self.speech.say_sentence(sentence)
+
+            elif event.kind == 'tool_call':
+                # Instant spoken feedback; whatever the model said before the call is spoken first
+                for sentence in sentences.flush():
+                    self.speech.say_sentence(sentence)
+                if tools_used is not None:
+                    tools_used.add(event.name)
+                friendly_name = event.name.replace("_", " ")
+                self.speak(f"Processing command using the '{friendly_name}' tool.")
+                started_line = False
+
+            elif event.kind == 'tool_result':
+                if event.result.error:
+                    self.speak(event.result.error)
+                else:
+                    self.log_message(f"Tool executed. Result: {event.result.result}", "system")
+
+            elif event.kind == 'done':
+                final_text = event.text
+        for sentence in sentences.flush():
+            self.speech.say_sentence(sentence)
+        return final_text
     
     # --- Visual Feedback / Animation Methods ---
 
@@ -405,8 +567,8 @@ class AssistantApp:
     def stop_loading_animation(self):
         self.progress_bar.stop()
         self.progress_bar.set(0) 
-        self.status_label.configure(text="Status: Ready")
-        self.talk_button.configure(state="normal", fg_color="green")
+        self.status_label.configure(text="Status: Listening..." if self.is_listening() else "Status: Ready")
+        self.talk_button.configure(state="normal", fg_color="#8B0000" if self.is_listening() else "green")
 
     # --- New Multimodality Handler ---
     def open_image_dialog(self):
@@ -436,43 +598,105 @@ class AssistantApp:
         if not command: return
         self.input_entry.delete(0, ctk.END)
         self.log_message(f"{command}", "user")
-        self.start_command_thread(command)
+        self.submit_command(command)
 
-    def start_voice_thread(self):
-        if self.talk_button.cget("state") == "disabled":
-            self.speak("I'm already busy!")
+    def is_listening(self):
+        return self.listener is not None and self.listener.listening
+
+    def toggle_listening(self):
+        """Talk button: starts continuous listening, or pauses it (the microphone stays open for a quick resume)."""
+        if self.is_listening():
+            self.listener.pause()
+            self.talk_button.configure(text="🎤 Talk", fg_color="green")
+            self.status_label.configure(text="Status: Ready")
             return
-        
-        self.start_loading_animation("Listening...") 
-        threading.Thread(target=self.listen_and_process).start()
 
-    def listen_and_process(self):
-        r = sr.Recognizer()
-        with sr.Microphone() as source:
-            r.adjust_for_ambient_noise(source, duration=0.5)
-            try:
-                audio = r.listen(source, timeout=5, phrase_time_limit=5)
-            except sr.WaitTimeoutError:
-                self.stop_loading_animation()
-                return
+        if self.listener is None:
+            source = (lambda: FileAudioSource(VOICE_FILE, realtime=True)) if VOICE_FILE else MicrophoneSource
+            self.listener = ListeningService(
+                self.on_voice_command,
+                source_factory=source,
+                wake_word=WAKE_WORD,
+                on_error=lambda message: self.speak(message),
+                # Nexus would otherwise hear (and answer) its own voice
+                suppress=self.speech.speaking.is_set,
+            )
+        self.listener.start()
+        self.talk_button.configure(text="🎤 Stop", fg_color="#8B0000")
+        hint = f" Say '{WAKE_WORD}' before a command." if WAKE_WORD else ""
+        self.status_label.configure(text=f"Status: Listening...{hint}")
+
+    def on_voice_command(self, command):
+        """Runs on the transcription thread for every recognised utterance."""
+        command = command.lower()
+        self.log_message(f"{command}", "user")
+        self.submit_command(command, source="voice")
 
-        try:
-            command = r.recognize_google(audio, language='en-in').lower()
-            self.log_message(f"{command}", "user")
-            self.start_command_thread(command)
-        except sr.UnknownValueError:
-            self.speak("Sorry, I did not understand that.")
-        except sr.RequestError:
-            self.speak("Could not connect to the voice recognition service.")
-        finally:
-            pass 
+    def submit_command(self, command, source="text"):
+        """Queues a command for the single command worker; new voice input replaces pending voice input."""
+        # A new command supersedes whatever Nexus is still saying
+        self.speech.interrupt()
+        if self.commands.submit(command, source, supersede=(source == "voice")) is None:
+            self.log_message("System: Duplicate command ignored.", "system")
+
+    def run_queued_command(self, command):
+        """Runs on the command worker thread, so only one command talks to the chat at a time."""
+        self.master.after(0, self.start_loading_animation, "Thinking...")
+        self.handle_command(command)
+
+    def update_trace_readout(self):
+        self.trace_label.configure(text=TRACER.status_line())
 
-    def start_command_thread(self, command):
-        self.start_loading_animation("Thinking...")
-        threading.Thread(target=self.handle_command, args=(command,)).start()
+    def update_queue_depth(self, depth):
+        self.queue_label.configure(text=f"Queued: {depth}" if depth else "")
+
+    def try_fast_path(self, command):
+        """Answers high-confidence local intents without the model. Returns True if the command was handled."""
+        found = INTENT_ROUTER.route(command)
+        if found is None:
+            return False
+
+        if found.intent == 'greeting':
+            self.speak("Hello! I am Nexus. How may I be of assistance?")
+        elif found.intent == 'exit':
+            self.speak("Goodbye! Shutting down Nexus now.")
+            self.master.quit()
+            return True
+        else:
+            self.log_message(f"System: Handled locally as '{found.intent}' (confidence {found.confidence:.2f}).", "system")
+            try:
+                self.speak(INTENT_ROUTER.dispatch(found))
+            except Exception as e:
+                self.speak(f"An error occurred while running the tool {found.tool}: {e}")
+
+        self.master.after(0, self.stop_loading_animation)
+        return True
+
+    def answer_from_cache(self, command):
+        """Replies from the response cache. Returns True if the command was answered."""
+        cached_reply = RESPONSE_CACHE.get(command, RESPONSE_FINGERPRINT)
+        if cached_reply is None:
+            return False
+        self.speak(cached_reply)
+        stats = RESPONSE_CACHE.stats()
+        self.log_message(f"System: Answered from the response cache ({stats['hits']} hits, {stats['hit_rate']:.0%} hit rate).", "system")
+        try:
+            # Keep the exchange in the conversation so follow-up questions still have it as context
+            record_cached_turn(self.chat, command, cached_reply)
+            self.persist_new_turns()
+        except Exception as e:
+            print(f"Warning: Failed to record cached reply in chat history: {e}")
+        self.master.after(0, self.stop_loading_animation)
+        return True
 
     def handle_command(self, command):
         
+        # --- LOCAL FAST PATH: trivial commands never reach the model ---
+        if "[IMAGE_PATH:" not in command and self.try_fast_path(command):
+            return
+
+        # Commands typed while Gemini is still starting up wait for it instead of failing
+        self.gemini_ready.wait(timeout=30)
         if not self.chat_ready:
             self.speak("I am sorry, my core AI brain is not active. Please check the API key.")
             self.master.after(0, self.stop_loading_animation)
@@ -490,11 +714,12 @@ class AssistantApp:
                 text_prompt = "What do you see in this image?"
             
             try:
-                # Load image object and append it to contents
-                img = Image.open(image_path)
-                contents_to_send.append(img)
+                # Downsized, metadata-free copy; asking again about the same file reuses the cached bytes
+                image, cached = IMAGE_CACHE.load_path(image_path)
+                contents_to_send.append(image.to_part())
                 contents_to_send.append(text_prompt)
-                self.log_message(f"System: Sending image for analysis: {image_path}", "system")
+                source = "cached" if cached else "processed"
+                self.log_message(f"System: Sending image for analysis: {image_path} ({source}, {image.summary()})", "system")
 
             except FileNotFoundError:
                 self.speak(f"Error: The image file was not found at {image_path}. Please verify the path.")
@@ -509,75 +734,88 @@ class AssistantApp:
             contents_to_send.append(command)
         # --- END PREPARE CONTENTS ---
 
-        if "hello" in command.lower() or "hi" in command.lower():
-            self.speak("Hello! I am Nexus. How may I be of assistance?")
-            self.master.after(0, self.stop_loading_animation)
-            return
-        elif "stop" in command.lower() or "exit" in command.lower() or "goodbye" in command.lower():
-            self.speak("Goodbye! Shutting down Nexus now.")
-            self.master.quit()
+        # --- RESPONSE CACHE: a repeated, context-free question is answered from the last reply ---
+        if not image_tag_match and self.answer_from_cache(command):
             return
-        
+
         self.speak("Thinking...")
+        started = time.perf_counter()
+        tools_used = set()
+        trace = TRACER.start_turn("desktop", chars=len(command), image=bool(image_tag_match))
         try:
-            # FIX APPLIED HERE: Sending contents_to_send as a positional argument
-            response = self.chat.send_message(contents_to_send)
-            
-            while response.function_calls:
-                
-                tool_responses = []
-                
-                # 1. Provide Instant Spoken Feedback
-                for function_call in response.function_calls:
-                    tool_name = function_call.name
-                    friendly_name = tool_name.replace("_", " ") 
-                    self.speak(f"Processing command using the '{friendly_name}' tool.")
-                    
-                # 2. Execute all tool calls
-                for function_call in response.function_calls:
-                    tool_name = function_call.name
-                    tool_args = dict(function_call.args)
-                    
-                    if tool_name in AVAILABLE_TOOLS:
-                        function_to_call = AVAILABLE_TOOLS[tool_name]
-                        
-                        try:
-                            tool_result = function_to_call(**tool_args)
-                            self.log_message(f"Tool executed. Result: {tool_result}", "system")
-                            
-                            tool_responses.append(
-                                types.Part.from_function_response(
-                                    name=tool_name,
-                                    response={'result': tool_result}
-                                )
-                            )
-                        except Exception as e:
-                            error_message = f"An error occurred while running the tool {tool_name}: {e}"
-                            self.speak(error_message)
-                            tool_responses.append(
-                                types.Part.from_function_response(
-                                    name=tool_name,
-                                    response={'result': error_message}
-                                )
-                            )
-                    else:
-                        self.speak(f"The model suggested calling an unknown tool: {tool_name}")
-
-                # FIX APPLIED HERE: Sending tool_responses as a positional argument
-                response = self.chat.send_message(tool_responses)
-            
-            self.speak(response.text)
+            # Stream the reply so the first tokens show up while the rest is still generating;
+            # tool calls are executed concurrently by the agent core between model requests
+            reply_text = self.stream_reply(contents_to_send, trace, tools_used)
 
+            if not image_tag_match:
+                RESPONSE_CACHE.put(command, RESPONSE_FINGERPRINT, reply_text, tools_used)
+            
         except Exception as e:
-            self.speak(f"An unexpected error occurred: {e}")
+            if is_capacity_error(e):
+                # Only reached once the retries are used up or the circuit breaker is open
+                self.speak("The AI service is busy right now. Please try that again in a moment.")
+            else:
+                self.speak(f"An unexpected error occurred: {e}")
         finally:
+            # Model round trips are tracked next to the local intents for comparison
+            INTENT_ROUTER.record('model', time.perf_counter() - started)
+            # Save the turn right away so a crash doesn't lose the session
+            try:
+                with trace.span('save.history'):
+                    self.persist_new_turns()
+                with trace.span('save.compact'):
+                    self.compact_context()
+            except Exception as e:
+                print(f"Warning: Failed to save or compact chat history: {e}")
+            trace.finish()
+            self.master.after(0, self.update_trace_readout)
             self.master.after(0, self.stop_loading_animation)
 
 
 # --- 4. Main Program Execution ---
 
+def fresh_import_seconds(name):
+    """Seconds `import name` takes in a new interpreter, where nothing it needs is loaded yet."""
+    code = f"import time; started = time.perf_counter(); import {name}; print(time.perf_counter() - started)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise ImportError(lines[-1] if lines else name)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def report_startup(app):
+    """--profile-startup: prints where startup time went, then closes the app."""
+    startup_mark("first idle (window usable)")
+
+    def finish():
+        app.gemini_ready.wait(timeout=60)
+        rows = list(STARTUP_TIMINGS)
+        if app.gemini_init_seconds is not None:
+            rows.append(("gemini init (background thread)", app.gemini_init_seconds))
+        # What the deferred imports would have cost at startup. Timed in a fresh interpreter:
+        # by now init_gemini and the tools may already have imported them in this one.
+        for name in DEFERRED_IMPORTS:
+            started = time.perf_counter()
+            try:
+                rows.append((f"deferred import {name}", fresh_import_seconds(name)))
+            except Exception as e:
+                rows.append((f"deferred import {name} (failed: {e.__class__.__name__})", time.perf_counter() - started))
+
+        window_ready = sum(seconds for _, seconds in STARTUP_TIMINGS)
+        print("\n--- Nexus startup profile ---")
+        for label, seconds in rows:
+            print(f"{seconds * 1000:9.1f} ms  {label}")
+        print(f"{window_ready * 1000:9.1f} ms  TOTAL until the window is usable")
+        app.master.after(0, app.on_closing)
+
+    threading.Thread(target=finish, daemon=True).start()
+
+
 if __name__ == "__main__":
     
     root = ctk.CTk()
+    startup_mark("create main window")
     app = AssistantApp(root)
+    if "--profile-startup" in sys.argv:
+        root.after_idle(report_startup, app)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""Response cache: per-context keys, TTL expiry, LRU eviction, bypassed prompts and persistence."""
+import json
+
+from nexus_cache import ResponseCache, context_fingerprint, is_cacheable_prompt
+
+FP = context_fingerprint("model", "instruction")
+
+
+def test_trivial_variations_share_an_entry(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.json")
+    assert cache.put("What is the capital of France?", FP, "Paris")
+    assert cache.get("what is the capital of   france", FP) == "Paris"
+    assert cache.stats()['hits'] == 1
+
+
+def test_fingerprints_do_not_share_entries(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.json")
+    alice, bob = context_fingerprint(FP, "alice"), context_fingerprint(FP, "bob")
+    cache.put("Explain photosynthesis", alice, "for alice")
+    assert cache.get("Explain photosynthesis", bob) is None
+    assert cache.get("Explain photosynthesis", alice) == "for alice"
+
+
+def test_expired_entry_is_a_miss(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.json", ttl=60)
+    cache.put("Define entropy", FP, "disorder")
+    next(iter(cache.entries.values()))['stored'] -= 61
+    assert cache.get("Define entropy", FP) is None
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.json", max_entries=2)
+    cache.put("Define alpha", FP, "a")
+    cache.put("Define beta", FP, "b")
+    assert cache.get("Define alpha", FP) == "a"
+    cache.put("Define gamma", FP, "c")
+
+    assert cache.get("Define beta", FP) is None
+    assert cache.get("Define alpha", FP) == "a"
+    assert cache.get("Define gamma", FP) == "c"
+
+
+def test_stateful_prompts_bypass_the_cache(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.json")
+    for prompt in ("What time is it?", "Summarise my notes", "Tell me more", "   "):
+        assert not is_cacheable_prompt(prompt)
+        assert not cache.put(prompt, FP, "answer")
+        assert cache.get(prompt, FP) is None
+    assert cache.stats()['bypassed'] == 4
+    assert cache.stats()['misses'] == 0
+
+
+def test_turns_that_used_stateful_tools_are_not_stored(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.json")
+    assert not cache.put("Play lofi beats", FP, "Playing", tools_used=['play_on_youtube'])
+    assert cache.put("Define a monad", FP, "a monoid...", tools_used=[])
+    assert cache.stats()['entries'] == 1
+
+
+def test_reload_keeps_fresh_entries_and_drops_expired_ones(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = ResponseCache(path, ttl=60)
+    cache.put("Define fresh", FP, "new")
+    cache.put("Define stale", FP, "old")
+    stored = json.loads(path.read_text(encoding='utf-8'))
+    for key, entry in stored:
+        if key.endswith("stale"):
+            entry['stored'] -= 61
+    path.write_text(json.dumps(stored), encoding='utf-8')
+
+    reloaded = ResponseCache(path, ttl=60)
+    assert reloaded.stats()['entries'] == 1
+    assert reloaded.get("Define fresh", FP) == "new"
+
+
+def test_unreadable_cache_file_starts_empty(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("{not json", encoding='utf-8')
+    assert ResponseCache(path).stats()['entries'] == 0
@@ -0,0 +1,120 @@
+"""Command queue: one command at a time, coalesced duplicates, supersession and voice-first ordering."""
+import threading
+import time
+
+import nexus_commands
+from nexus_commands import CommandQueue
+
+
+class GatedHandler:
+    """Records each command and holds the worker on the first one until `release()`."""
+
+    def __init__(self):
+        self.seen = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self, text):
+        self.seen.append(text)
+        self.started.set()
+        self.gate.wait(5)
+
+    def release(self):
+        self.gate.set()
+
+
+def busy_queue():
+    """A queue whose worker is stuck on a first command, so everything submitted next stays pending."""
+    handler = GatedHandler()
+    commands = CommandQueue(handler)
+    commands.submit("first")
+    assert handler.started.wait(5)
+    return commands, handler
+
+
+def drain(commands, count):
+    deadline = time.monotonic() + 5
+    while commands.processed < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+    commands.close()
+
+
+def test_identical_submissions_are_coalesced():
+    commands, handler = busy_queue()
+    assert commands.submit("Open Notepad") is not None
+    assert commands.submit("  open   notepad ") is None
+    # The command already running counts as well
+    assert commands.submit("First") is None
+    assert commands.coalesced == 2
+    assert commands.depth() == 1
+
+    handler.release()
+    drain(commands, 2)
+    assert handler.seen == ["first", "Open Notepad"]
+
+
+def test_repeat_after_the_coalesce_window_runs_again(monkeypatch):
+    monkeypatch.setattr(nexus_commands, "COALESCE_SECONDS", 0.0)
+    commands, handler = busy_queue()
+    commands.submit("tell a joke")
+    assert commands.submit("tell a joke") is not None
+    assert commands.depth() == 2
+    handler.release()
+    drain(commands, 3)
+    assert handler.seen == ["first", "tell a joke", "tell a joke"]
+
+
+def test_supersede_cancels_pending_commands_of_the_same_source():
+    commands, handler = busy_queue()
+    commands.submit("search for cats", source="text")
+    commands.submit("what is the weather", source="voice")
+    commands.submit("search for dogs", source="text", supersede=True)
+    assert commands.depth() == 2
+
+    handler.release()
+    drain(commands, 3)
+    assert handler.seen == ["first", "what is the weather", "search for dogs"]
+
+
+def test_voice_runs_before_typed_ahead_text():
+    commands, handler = busy_queue()
+    commands.submit("typed one")
+    commands.submit("typed two")
+    commands.submit("spoken", source="voice")
+
+    handler.release()
+    drain(commands, 4)
+    assert handler.seen == ["first", "spoken", "typed one", "typed two"]
+
+
+def test_cancel_pending_leaves_the_running_command_alone():
+    depths = []
+    handler = GatedHandler()
+    commands = CommandQueue(handler, on_depth=depths.append)
+    commands.submit("first")
+    assert handler.started.wait(5)
+    commands.submit("second")
+    commands.submit("third")
+    commands.cancel_pending()
+    assert commands.depth() == 0
+    assert depths[-1] == 0
+
+    handler.release()
+    commands.submit("fourth")
+    drain(commands, 2)
+    assert handler.seen == ["first", "fourth"]
+
+
+def test_failing_command_does_not_stop_the_worker():
+    seen = []
+
+    def handler(text):
+        seen.append(text)
+        if text == "boom":
+            raise RuntimeError("handler failed")
+
+    commands = CommandQueue(handler)
+    commands.submit("boom")
+    commands.submit("after")
+    drain(commands, 2)
+    assert seen == ["boom", "after"]
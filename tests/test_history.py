@@ -0,0 +1,91 @@
+"""Chat history handling with the per-chunk history google-genai records for streamed replies."""
+from google.genai import types
+
+from nexus_history import SUMMARY_PREFIX, ChatHistoryStore, ContextCompactor, coalesce_contents
+
+EXCHANGES = 6
+CHUNKS = 15
+
+
+def chunked_history(exchanges=EXCHANGES, chunks=CHUNKS):
+    """What chat.get_history() returns after streamed turns: one model Content per chunk."""
+    history = []
+    for turn in range(exchanges):
+        history.append(types.Content(role='user', parts=[types.Part(text=f"Question {turn}")]))
+        for chunk in range(chunks):
+            history.append(types.Content(role='model', parts=[types.Part(text=f"answer {turn} part {chunk} " * 20)]))
+    return history
+
+
+class HistoryChat:
+    def __init__(self, history):
+        self.history = history
+
+    def get_history(self):
+        return self.history
+
+
+def whole_answer(turn):
+    return "".join(f"answer {turn} part {chunk} " * 20 for chunk in range(CHUNKS))
+
+
+def test_coalesce_contents_merges_streamed_chunks():
+    merged = coalesce_contents(chunked_history())
+    assert [c.role for c in merged] == ['user', 'model'] * EXCHANGES
+    assert len(merged[1].parts) == 1
+    assert merged[1].parts[0].text == whole_answer(0)
+
+
+def test_coalesce_contents_keeps_tool_calls():
+    call = types.Part(function_call=types.FunctionCall(name='check_current_time', args={}))
+    history = [
+        types.Content(role='user', parts=[types.Part(text="What time is it?")]),
+        types.Content(role='model', parts=[types.Part(text="Let me ")]),
+        types.Content(role='model', parts=[types.Part(text="check."), call]),
+    ]
+    merged = coalesce_contents(history)
+    assert len(merged) == 2
+    assert merged[1].parts[0].text == "Let me check."
+    assert merged[1].parts[1].function_call.name == 'check_current_time'
+
+
+def test_compaction_keeps_newest_exchanges_of_chunked_history():
+    history = chunked_history()
+    compactor = ContextCompactor(trigger_tokens=100, keep_turns=4, use_model=False)
+    rebuilt = compactor.maybe_compact(HistoryChat(history), rebuild=lambda new_history: new_history)
+
+    assert rebuilt is not None
+    assert rebuilt[0].parts[0].text.startswith(SUMMARY_PREFIX)
+    kept = rebuilt[2:]
+    # The two newest exchanges survive verbatim, each reply as one whole turn
+    assert [c.role for c in kept] == ['user', 'model', 'user', 'model']
+    assert kept[0].parts[0].text == f"Question {EXCHANGES - 2}"
+    assert kept[-1].parts[0].text == whole_answer(EXCHANGES - 1)
+
+
+def test_history_store_writes_one_row_per_turn(tmp_path):
+    store = ChatHistoryStore(tmp_path / "chat_history.db")
+    store.append_contents(chunked_history())
+    assert len(store) == 2 * EXCHANGES
+
+    recent = store.recent(max_turns=4, max_tokens=10**6)
+    assert [entry['text'] for e in recent for entry in e['parts']] == [
+        "Question 4", whole_answer(4), "Question 5", whole_answer(5)]
+    store.close()
+
+
+def test_history_store_restores_whole_turns_from_chunked_rows(tmp_path):
+    # Databases written before turns were coalesced hold one row per streamed chunk
+    store = ChatHistoryStore(tmp_path / "chat_history.db")
+    for content in chunked_history():
+        store.append(content.role, [{'text': content.parts[0].text}])
+    assert len(store) == EXCHANGES * (1 + CHUNKS)
+
+    recent = store.recent(max_turns=4, max_tokens=10**6)
+    assert [e['role'] for e in recent] == ['user', 'model', 'user', 'model']
+    assert recent[-1]['parts'] == [{'text': whole_answer(EXCHANGES - 1)}]
+
+    older = store.page()
+    assert [e['role'] for e in older] == ['user', 'model'] * (EXCHANGES - 2)
+    assert older[-1]['parts'] == [{'text': whole_answer(EXCHANGES - 3)}]
+    store.close()
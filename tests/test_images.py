@@ -0,0 +1,65 @@
+"""Image preprocessing: nothing but pixels reaches the model."""
+import io
+
+from PIL import Image, PngImagePlugin
+
+from nexus_images import IMAGE_MAX_SIDE, preprocess_image
+
+GPS_IFD = 0x8825
+MAKE = 0x010F
+
+
+def tagged_jpeg(size=(320, 240), quality=40):
+    exif = Image.Exif()
+    exif[MAKE] = "TestCam"
+    exif[GPS_IFD] = {1: "N", 2: (52.0, 31.0, 12.0)}
+    out = io.BytesIO()
+    Image.effect_noise(size, 40).convert("RGB").save(out, format="JPEG", quality=quality, exif=exif,
+                                                      comment=b"taken at home")
+    return out.getvalue()
+
+
+def test_small_jpeg_loses_exif_and_gps():
+    raw = tagged_jpeg()
+    data, mime_type, size = preprocess_image(raw)
+
+    assert mime_type == "image/jpeg"
+    assert size == (320, 240)
+    assert len(data) <= len(raw)
+    assert b"TestCam" not in data and b"taken at home" not in data
+    with Image.open(io.BytesIO(data)) as img:
+        assert not img.getexif()
+        assert not img.getexif().get_ifd(GPS_IFD)
+        assert "exif" not in img.info
+
+
+def test_passed_through_jpeg_keeps_its_pixels():
+    raw = tagged_jpeg()
+    data, _, _ = preprocess_image(raw)
+    with Image.open(io.BytesIO(raw)) as original, Image.open(io.BytesIO(data)) as sent:
+        assert original.tobytes() == sent.tobytes()
+
+
+def test_small_png_loses_text_and_exif_chunks():
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Author", "someone private")
+    info.add_itxt("XML:com.adobe.xmp", "<x:xmpmeta>secret</x:xmpmeta>")
+    exif = Image.Exif()
+    exif[MAKE] = "TestCam"
+    out = io.BytesIO()
+    Image.new("RGBA", (64, 64), (10, 20, 30, 128)).save(out, format="PNG", pnginfo=info, exif=exif)
+
+    data, mime_type, _ = preprocess_image(out.getvalue())
+
+    assert mime_type == "image/png"
+    for secret in (b"someone private", b"secret", b"TestCam"):
+        assert secret not in data
+
+
+def test_large_image_is_downsized():
+    raw = tagged_jpeg(size=(IMAGE_MAX_SIDE * 2, IMAGE_MAX_SIDE), quality=90)
+    data, mime_type, size = preprocess_image(raw)
+
+    assert max(size) == IMAGE_MAX_SIDE
+    assert mime_type == "image/jpeg"
+    assert b"TestCam" not in data
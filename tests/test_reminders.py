@@ -0,0 +1,79 @@
+"""Reminder scheduler: owner scoping, persistence across restarts and firing on time."""
+import json
+import queue
+
+from nexus_reminders import ReminderScheduler, describe_delay, parse_time_to_seconds
+
+
+def ignore(reminder, late_seconds):
+    pass
+
+
+def test_time_phrases_are_parsed():
+    assert parse_time_to_seconds("5 minutes and 10 seconds") == 310
+    assert parse_time_to_seconds("2 hrs") == 7200
+    assert parse_time_to_seconds("15") == 900
+    assert parse_time_to_seconds("sometime") == 0
+    assert describe_delay(3725) == "1 hours and 2 minutes and 5 seconds"
+
+
+def test_users_only_see_and_cancel_their_own_reminders(tmp_path):
+    scheduler = ReminderScheduler(tmp_path / "reminders.json", ignore)
+    alice = scheduler.add(60, "call mum", owner="alice")
+    bob = scheduler.add(30, "water plants", owner="bob")
+
+    assert [r.id for r in scheduler.pending(owner="alice")] == [alice.id]
+    assert scheduler.cancel(alice.id, owner="bob") is None
+    assert [r.id for r in scheduler.pending()] == [bob.id, alice.id]
+
+    assert scheduler.cancel(f" {alice.id} ", owner="alice") is alice
+    assert scheduler.pending(owner="alice") == []
+    assert scheduler.cancel(alice.id, owner="alice") is None
+
+
+def test_reminders_and_owners_survive_a_restart(tmp_path):
+    path = tmp_path / "reminders.json"
+    first = ReminderScheduler(path, ignore)
+    kept = first.add(3600, "stand up", owner="alice")
+    dropped = first.add(3600, "sit down", owner="bob")
+    first.cancel(dropped.id)
+
+    restored = ReminderScheduler(path, ignore).pending()
+    assert [(r.id, r.text, r.owner) for r in restored] == [(kept.id, "stand up", "alice")]
+    assert restored[0].due == kept.due
+
+
+def test_files_written_before_owners_load_as_unowned(tmp_path):
+    path = tmp_path / "reminders.json"
+    path.write_text(json.dumps([{'id': 'abc123', 'due': 1e12, 'text': "old"}]), encoding='utf-8')
+    scheduler = ReminderScheduler(path, ignore)
+    assert [r.owner for r in scheduler.pending()] == [None]
+    assert scheduler.pending(owner="alice") == []
+
+
+def test_reminder_fires_when_due(tmp_path):
+    fired = queue.Queue()
+    scheduler = ReminderScheduler(tmp_path / "reminders.json", lambda r, late: fired.put((r, late)))
+    scheduler.start()
+    cancelled = scheduler.add(0.05, "never")
+    scheduler.add(0.1, "stretch", owner="alice")
+    scheduler.cancel(cancelled.id)
+
+    reminder, late = fired.get(timeout=5)
+    assert (reminder.text, reminder.owner) == ("stretch", "alice")
+    assert late < 1.0
+    assert fired.empty()
+    assert scheduler.pending() == []
+
+
+def test_missed_reminder_fires_after_restart_with_its_lateness(tmp_path):
+    path = tmp_path / "reminders.json"
+    ReminderScheduler(path, ignore).add(-120, "missed it", owner="alice")
+
+    fired = queue.Queue()
+    scheduler = ReminderScheduler(path, lambda r, late: fired.put((r, late)))
+    scheduler.start()
+    reminder, late = fired.get(timeout=5)
+    assert reminder.text == "missed it"
+    assert late >= 120
+    assert json.loads(path.read_text(encoding='utf-8')) == []
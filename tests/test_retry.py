@@ -0,0 +1,171 @@
+"""CallGuard retries, backoff and retry hints, the circuit breaker's trial slot and the request window."""
+import asyncio
+import time
+
+import pytest
+from fake_genai import quota_error, server_error
+
+import nexus_retry
+from nexus_retry import (CallGuard, CircuitBreaker, CircuitOpenError, RateLimiter, RateLimitExceeded,
+                         retry_after_seconds)
+
+
+def open_limiter():
+    return RateLimiter(10**6, 10**12)
+
+
+class Failing:
+    """Raises the given errors on the first calls, then returns "ok"."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    # Full jitter draws from [0, cap]; take the top of the range
+    monkeypatch.setattr(nexus_retry.random, "uniform", lambda low, high: high)
+    guard = CallGuard(open_limiter(), CircuitBreaker(failures=100), attempts=6, base_delay=1.0, max_delay=4.0)
+    assert [guard._retry_delay(server_error(), attempt) for attempt in range(4)] == [1.0, 2.0, 4.0, 4.0]
+
+
+def test_retry_hint_sets_the_delay_and_pauses_every_caller(monkeypatch):
+    monkeypatch.setattr(nexus_retry.random, "uniform", lambda low, high: low)
+    guard = CallGuard(open_limiter(), base_delay=0.01)
+    delay = guard._retry_delay(quota_error(retry_delay=3.0), 0)
+
+    assert delay == 3.0
+    assert guard.limiter.paused_until - time.monotonic() == pytest.approx(3.0, abs=0.2)
+    # A quota error means the service is up: it does not count towards opening the breaker
+    assert guard.breaker.failures == 0
+
+
+def test_retry_after_header_is_read():
+    class Response:
+        headers = {'retry-after': '7'}
+
+    class HeaderError(Exception):
+        response = Response()
+
+    assert retry_after_seconds(HeaderError()) == 7.0
+    assert retry_after_seconds(quota_error(retry_delay=2.5)) == 2.5
+    assert retry_after_seconds(server_error()) is None
+
+
+def test_call_retries_retryable_errors_until_it_succeeds():
+    guard = CallGuard(open_limiter(), base_delay=0.001)
+    fn = Failing(server_error(), server_error(503))
+    assert guard.call(fn) == "ok"
+    assert fn.calls == 3
+    assert guard.stats()['retries'] == 2
+    assert guard.breaker.state == "closed"
+
+
+def test_non_retryable_error_is_raised_at_once():
+    guard = CallGuard(open_limiter(), base_delay=0.001)
+    fn = Failing(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        guard.call(fn)
+    assert fn.calls == 1
+
+
+def test_last_attempt_raises_and_counts_as_failed():
+    guard = CallGuard(open_limiter(), CircuitBreaker(failures=100), attempts=2, base_delay=0.001)
+    with pytest.raises(Exception):
+        guard.call(Failing(server_error(), server_error(), server_error()))
+    assert guard.stats()['failed'] == 1
+
+
+def test_open_breaker_fails_fast_without_calling():
+    guard = CallGuard(open_limiter(), CircuitBreaker(failures=2, reset_seconds=60), attempts=1)
+    for _ in range(2):
+        with pytest.raises(Exception):
+            guard.call(Failing(server_error()))
+    fn = Failing()
+    with pytest.raises(CircuitOpenError):
+        guard.call(fn)
+    assert fn.calls == 0
+    assert guard.breaker.state == "open"
+
+
+def opened_breaker(reset_seconds=0.05):
+    breaker = CircuitBreaker(failures=1, reset_seconds=reset_seconds)
+    breaker.record_failure()
+    time.sleep(reset_seconds * 1.5)
+    return breaker
+
+
+def test_cancelled_trial_call_releases_the_trial_slot():
+    breaker = opened_breaker()
+    guard = CallGuard(open_limiter(), breaker, attempts=1)
+
+    async def slow():
+        await asyncio.sleep(5)
+
+    async def cancel_trial():
+        task = asyncio.create_task(guard.acall(slow))
+        await asyncio.sleep(0.01)
+        assert breaker.state == "half-open"
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(cancel_trial())
+
+    assert breaker.state == "open"
+    assert guard.call(Failing()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_abandoned_trial_streams_leave_the_breaker_consistent():
+    breaker = opened_breaker()
+    guard = CallGuard(open_limiter(), breaker, attempts=1)
+
+    def chunks():
+        yield "first"
+        yield "second"
+
+    stream = guard.stream(chunks)
+    assert next(stream) == "first"
+    stream.close()
+    # The first chunk arrived, so the trial counted as a success
+    assert breaker.state == "closed"
+
+    breaker = opened_breaker()
+    guard = CallGuard(open_limiter(), breaker, attempts=1)
+
+    async def never_answers():
+        await asyncio.sleep(5)
+
+    async def time_out():
+        with pytest.raises(TimeoutError):
+            async with asyncio.timeout(0.02):
+                async for _ in guard.astream(never_answers):
+                    pass
+    asyncio.run(time_out())
+    assert breaker.state == "open"
+
+
+def test_limiter_timeout_does_not_take_the_trial_slot():
+    breaker = opened_breaker()
+    limiter = RateLimiter(1, 10**12, max_wait=0.01)
+    limiter.acquire(1)
+    with pytest.raises(RateLimitExceeded):
+        CallGuard(limiter, breaker, attempts=1).call(Failing())
+    assert breaker.state == "open"
+    assert CallGuard(open_limiter(), breaker, attempts=1).call(Failing()) == "ok"
+
+
+def test_request_window_admits_at_most_the_quota_per_period():
+    limiter = RateLimiter(5, 10**12, period=0.2)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire(1)
+    assert time.monotonic() - started < 0.05
+    limiter.acquire(1)
+    assert time.monotonic() - started >= 0.2
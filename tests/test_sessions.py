@@ -0,0 +1,40 @@
+"""Durable web sessions saved after streamed turns."""
+from fake_genai import FakeClient, ScriptedResponder
+
+from nexus_sessions import SessionStore
+
+TURNS = 2
+
+
+def stream_turn(chat, prompt):
+    return "".join(part.text for chunk in chat.send_message_stream(prompt)
+                   for part in (chunk.candidates[0].content.parts or []) if part.text)
+
+
+def test_streamed_session_saves_one_context_entry_per_turn(tmp_path):
+    client = FakeClient(ScriptedResponder(words=60), latency=0, chunk_delay=0)
+    store = SessionStore(tmp_path / "web_sessions.db")
+    session = store.create("alice")
+    chat = session.ensure_chat(lambda history: client.chats.create(history=history))
+    replies = []
+    for turn in range(TURNS):
+        session.add_message("user", f"question {turn}")
+        replies.append(stream_turn(chat, f"question {turn}"))
+        session.add_message("assistant", replies[-1])
+        store.save(session)
+
+    # The SDK-like history holds one model entry per chunk; the saved context one per turn
+    assert len(chat.get_history()) > 2 * TURNS
+    assert [entry['role'] for entry in session.context] == ['user', 'model'] * TURNS
+    store.close()
+
+    reopened = SessionStore(tmp_path / "web_sessions.db")
+    resumed = reopened.get(session.id, "alice")
+    assert [m['content'] for m in resumed.messages] == [
+        text for turn in range(TURNS) for text in (f"question {turn}", replies[turn])]
+    assert [entry['parts'] for entry in resumed.context[1::2]] == [[{'text': reply}] for reply in replies]
+
+    rebuilt = resumed.ensure_chat(lambda history: client.chats.create(history=history))
+    assert len(rebuilt.get_history()) == 2 * TURNS
+    assert reopened.get(session.id, "mallory") is None
+    reopened.close()
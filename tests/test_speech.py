@@ -0,0 +1,88 @@
+"""Sentence splitting and the speech worker's queue, with a stand-in for the pyttsx3 engine."""
+import threading
+import time
+
+from nexus_speech import SentenceBuffer, SpeechWorker, split_sentences
+
+
+class FakeEngine:
+    def __init__(self, seconds=0.002):
+        self.seconds = seconds
+        self.spoken = []
+        self.pending = None
+
+    def connect(self, name, callback):
+        pass
+
+    def say(self, sentence):
+        self.pending = sentence
+
+    def runAndWait(self):
+        time.sleep(self.seconds)
+        self.spoken.append(self.pending)
+
+    def stop(self):
+        pass
+
+
+class FakeSpeechWorker(SpeechWorker):
+    def __init__(self, engine, **kwargs):
+        self.fake_engine = engine
+        super().__init__(**kwargs)
+
+    def _init_engine(self):
+        return self.fake_engine
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_numbered_list_items_stay_whole():
+    text = "Here is the plan:\n1. Buy eggs.\n2. Call mom!\n10. Rest. It costs 2.5. Done?"
+    assert split_sentences(text) == [
+        "Here is the plan:\n1. Buy eggs.", "2. Call mom!", "10. Rest.", "It costs 2.5.", "Done?"]
+
+
+def test_sentence_buffer_does_not_split_a_list_number_across_chunks():
+    buffer = SentenceBuffer()
+    sentences = []
+    for chunk in ("Steps:\n1", ". Open it. ", "2. Close it", ". End."):
+        sentences += buffer.feed(chunk)
+    assert sentences + buffer.flush() == ["Steps:\n1. Open it.", "2. Close it.", "End."]
+
+
+def test_long_streamed_reply_is_spoken_completely_and_in_order():
+    engine = FakeEngine()
+    worker = FakeSpeechWorker(engine, maxsize=4)
+    sentences = [f"Sentence {i}." for i in range(60)]
+    for sentence in sentences:
+        assert worker.say_sentence(sentence)
+        assert worker.queue.qsize() <= 4
+    assert wait_until(lambda: len(engine.spoken) == len(sentences))
+    assert engine.spoken == sentences
+    worker.shutdown()
+
+
+def test_interrupt_discards_queued_and_waiting_sentences():
+    engine = FakeEngine(seconds=0.2)
+    worker = FakeSpeechWorker(engine, maxsize=2)
+    worker.ready.wait()
+    results = []
+
+    def stream():
+        for i in range(10):
+            results.append(worker.say_sentence(f"Sentence {i}."))
+    producer = threading.Thread(target=stream)
+    producer.start()
+    assert wait_until(lambda: worker.queue.qsize() == 2)
+    worker.interrupt()
+    producer.join(timeout=5)
+
+    assert not producer.is_alive()
+    assert False in results
+    assert worker.queue.qsize() <= 2
+    worker.shutdown()
@@ -1,43 +1,59 @@
 import streamlit as st
 import os
-import json
 import re
+import uuid
 import webbrowser
 import datetime
+import threading
+import time
+from collections import deque
 from pathlib import Path
-from PIL import Image
 from io import BytesIO
 
 # --- API & LIBRARY IMPORTS ---
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
 
+from nexus_agent import LatencyStats
+from nexus_cache import ResponseCache, context_fingerprint, record_cached_turn
+from nexus_client import ClientProvider, build_tool_declarations, is_connection_error
+from nexus_core import AgentCore
+from nexus_history import ContextCompactor, archive_turns
+from nexus_images import IMAGE_CACHE
+from nexus_intents import IntentRouter
+from nexus_notes import NoteStore, UserNoteStore
+from nexus_reminders import ReminderScheduler, describe_delay, parse_time_to_seconds
+from nexus_retry import CallGuard, is_capacity_error
+from nexus_sessions import SessionStore
+from nexus_trace import Tracer
+
+# Start of this rerun, used for the per-rerun overhead shown in the sidebar
+RERUN_STARTED = time.perf_counter()
+
 # --- CRITICAL FIX: Load .env file at startup ---
 load_dotenv() 
 
 # --- 0. Configuration and Memory Setup ---
 
 MEMORY_FILE = Path("assistant_memory.json")
-
-def load_memory():
-    """Loads long-term memory notes from the JSON file."""
-    if MEMORY_FILE.exists():
-        try:
-            with open(MEMORY_FILE, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print("Warning: Memory file is corrupted, starting with empty long-term memory.")
-            return []
-    return []
-
-def save_memory(notes):
-    """Saves the current list of long-term notes to the JSON file."""
-    with open(MEMORY_FILE, 'w') as f:
-        json.dump(notes, f, indent=4)
-
-# Global memory storage
-PERSONAL_NOTES = load_memory()
+NOTES_DB_FILE = Path("web_notes.db")
+# Notes from the old shared assistant_memory.json are moved into this user's namespace (?user=default)
+LEGACY_NOTES_USER = "default"
+CHAT_ARCHIVE_FILE = Path("web_chat_archive.jsonl")
+REMINDERS_FILE = Path("web_reminders.json")
+RESPONSE_CACHE_FILE = Path("web_response_cache.json")
+SESSIONS_DB_FILE = Path("web_sessions.db")
+TRACE_FILE = Path("web_traces.jsonl")
+
+@st.cache_resource
+def note_memory():
+    """Process-wide per-user note store; each user's notes are loaded and indexed on first use."""
+    store = UserNoteStore(NOTES_DB_FILE)
+    if not len(store) and MEMORY_FILE.exists():
+        store.import_notes(LEGACY_NOTES_USER, NoteStore(MEMORY_FILE).load())
+    return store
+
+NOTE_STORE = note_memory()
 
 
 # --- 1. Global Tool Setup and Definitions ---
@@ -81,21 +97,20 @@ def check_current_time():
     return f"The current time is {now}"
 
 # Memory Tools
+# USER_NOTES and USER_ID (this session's user, see section 2) are looked up when a tool runs
 @add_tool
 def add_personal_note(note_text: str):
     """Saves a piece of personal information or a key preference for later retrieval."""
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    PERSONAL_NOTES.append({'time': timestamp, 'note': note_text})
-    save_memory(PERSONAL_NOTES)
+    USER_NOTES.add({'time': timestamp, 'note': note_text})
     return f"Note successfully saved: '{note_text}'."
 
 @add_tool
 def retrieve_personal_notes(query: str):
-    """Returns all stored personal notes for the AI to process."""
-    if not PERSONAL_NOTES:
+    """Searches the stored personal notes and returns only the ones most relevant to the query."""
+    if not len(USER_NOTES):
         return "I have no personal notes saved yet."
-    note_strings = [f"Time: {n['time']}, Note: {n['note']}" for n in PERSONAL_NOTES]
-    return "The user's stored notes are:\n" + "\n".join(note_strings)
+    return USER_NOTES.retrieve(query)
 
 # Utility Tools
 @add_tool
@@ -104,11 +119,76 @@ def open_application(app_name: str):
     tool_output(f"Simulating launch of application: {app_name}")
     return f"I have sent the command to launch the application '{app_name}'. (Note: This is simulated in the web environment.)"
 
+@st.cache_resource
+def reminder_engine():
+    """Process-wide reminder scheduler (one thread for all sessions) and the (fired_at, reminder) pairs it has fired."""
+    fired = deque(maxlen=200)
+    scheduler = ReminderScheduler(REMINDERS_FILE, lambda reminder, late_seconds: fired.append((time.time(), reminder)))
+    scheduler.start()
+    return scheduler, fired
+
+REMINDER_SCHEDULER, FIRED_REMINDERS = reminder_engine()
+
 @add_tool
 def set_reminder(time_string: str, reminder_text: str):
-    """Simulates setting a reminder."""
-    tool_output(f"Simulating reminder set for {time_string}.")
-    return f"I have set a reminder for '{reminder_text}' in {time_string}. I will notify you then. (Note: Notification is simulated.)"
+    """Sets a reminder that shows a notification in the app after the specified time has passed."""
+    delay = parse_time_to_seconds(time_string)
+    if delay <= 0:
+        return "I could not understand the duration for the reminder. Please be specific."
+    reminder = REMINDER_SCHEDULER.add(delay, reminder_text, owner=USER_ID)
+    tool_output(f"Reminder {reminder.id} set for {time_string}.")
+    return f"I have set a reminder for '{reminder_text}' in {describe_delay(delay)} (reminder id {reminder.id}). I will notify you here when it is due."
+
+@add_tool
+def list_reminders():
+    """Lists all pending reminders with their ids and due times."""
+    pending = REMINDER_SCHEDULER.pending(owner=USER_ID)
+    if not pending:
+        return "There are no pending reminders."
+    return "Pending reminders:\n" + "\n".join(f"[{r.id}] {r.due_display()}: {r.text}" for r in pending)
+
+@add_tool
+def cancel_reminder(reminder_id: str):
+    """Cancels a pending reminder by its id (use list_reminders to find the id)."""
+    reminder = REMINDER_SCHEDULER.cancel(reminder_id, owner=USER_ID)
+    if reminder is None:
+        return f"There is no pending reminder with id '{reminder_id}'."
+    return f"Cancelled the reminder to '{reminder.text}'."
+
+
+@st.cache_resource
+def intent_latency_stats():
+    """Process-wide fast-path latency numbers (the script, and with it the router, is re-run on every interaction)."""
+    return LatencyStats()
+
+# Web has no exit command, so only greetings are answered without a tool
+INTENT_ROUTER = IntentRouter(AVAILABLE_TOOLS, local_intents=('greeting',), stats=intent_latency_stats())
+
+
+SYSTEM_INSTRUCTION = "You are a dedicated, witty, and highly capable personal AI assistant named 'Nexus'. Your name is NEXUS.AI and the user's name is VIVEK. **Only use the web_search tool for requests requiring current, real-time data (like news or stock prices), or for opening a specific website/video. For general knowledge and definitions (like 'what is RAM'), answer using your internal knowledge base directly.** You process image requests if a file is uploaded, and use tools to perform actions. Keep responses concise and professional."
+
+MODEL_NAME = 'gemini-2.5-flash'
+# Cached answers are only reused while the model and the instruction they came from are unchanged
+RESPONSE_FINGERPRINT = context_fingerprint("web", MODEL_NAME, SYSTEM_INSTRUCTION)
+
+@st.cache_resource
+def response_cache():
+    """Process-wide cache of answers to repeated, context-free prompts; entries are keyed per user."""
+    return ResponseCache(RESPONSE_CACHE_FILE)
+
+RESPONSE_CACHE = response_cache()
+
+@st.cache_resource
+def turn_tracer():
+    """Process-wide turn traces: rolling percentiles for the sidebar, every turn appended to TRACE_FILE."""
+    return Tracer(TRACE_FILE)
+
+TRACER = turn_tracer()
+
+@st.cache_resource
+def rerun_overhead_stats():
+    """Process-wide samples of how long a rerun takes before it reaches the user's prompt."""
+    return LatencyStats()
 
 
 # --- 2. STREAMLIT STATE AND CLIENT INITIALIZATION ---
@@ -116,130 +196,347 @@ def set_reminder(time_string: str, reminder_text: str):
 st.set_page_config(page_title="Nexus AI Web Assistant", layout="centered")
 st.title("🧠 Nexus AI Web Assistant")
 
+# --- USER NAMESPACE ---
+# Notes belong to the user in ?user=...; a new visitor gets an anonymous id, kept in the URL
+# so a reload or bookmark opens the same notes.
+if "user_id" not in st.session_state:
+    st.session_state.user_id = st.query_params.get("user") or uuid.uuid4().hex[:12]
+    st.query_params["user"] = st.session_state.user_id
+    # Reminders that fired before this session started are not shown again
+    st.session_state.reminders_since = time.time()
+USER_ID = st.session_state.user_id
+USER_NOTES = NOTE_STORE.view(USER_ID)
+# A cached answer is only ever served back to the user it was given to
+USER_RESPONSE_FINGERPRINT = context_fingerprint(RESPONSE_FINGERPRINT, USER_ID)
+
 # --- API KEY & CLIENT INITIALIZATION ---
 if "GEMINI_API_KEY" not in os.environ:
      st.error("FATAL ERROR: GEMINI_API_KEY environment variable not set. Please set your key.")
      st.stop()
 
+@st.cache_resource
+def gemini_clients():
+    """One client (and HTTP connection pool) per process, shared by every session and rerun."""
+    return ClientProvider()
+
+@st.cache_resource
+def chat_config():
+    """Tool declarations and config are built once; sessions only reference them."""
+    return types.GenerateContentConfig(
+        tools=[build_tool_declarations(AVAILABLE_TOOLS)],
+        # *** System Instruction refined to prioritize internal knowledge ***
+        system_instruction=SYSTEM_INSTRUCTION,
+    )
+
+@st.cache_resource
+def call_guard():
+    """Rate limiter, retries and circuit breaker shared by every session, so the process stays under quota."""
+    return CallGuard()
+
+GEMINI_CLIENTS = gemini_clients()
+CALL_GUARD = call_guard()
+
+@st.cache_resource
+def agent_core():
+    """One event loop runs the tool loop of every session; a session's script thread only waits for its events."""
+    return AgentCore(guard=call_guard())
+
+AGENT = agent_core()
+
 try:
-    client = genai.Client()
+    client = GEMINI_CLIENTS.get()
 except Exception as e:
     st.error(f"Failed to initialize Gemini Client: {e}")
     st.stop()
 
 
-if "chat_session" not in st.session_state:
-    
-    tool_list = list(AVAILABLE_TOOLS.values())
-    
-    tool_config = types.GenerateContentConfig(
-        tools=tool_list,
-        # *** System Instruction refined to prioritize internal knowledge ***
-        system_instruction="You are a dedicated, witty, and highly capable personal AI assistant named 'Nexus'. Your name is NEXUS.AI and the user's name is VIVEK. **Only use the web_search tool for requests requiring current, real-time data (like news or stock prices), or for opening a specific website/video. For general knowledge and definitions (like 'what is RAM'), answer using your internal knowledge base directly.** You process image requests if a file is uploaded, and use tools to perform actions. Keep responses concise and professional."
+def create_chat_session(history=None):
+    """Creates a chat session with the Nexus tools, optionally seeded with earlier history."""
+    return client.aio.chats.create(
+        model=MODEL_NAME, 
+        config=chat_config(),
+        history=history
     )
 
-    st.session_state.chat_session = client.chats.create(
-        model='gemini-2.5-flash', 
-        config=tool_config
+
+def recover_connection(error):
+    """After an auth/transport failure: replace the shared client and move this session onto it.
+
+    Runs inside the turn's error handler, so its own failures are reported, not raised.
+    Returns True if the session is on a new client.
+    """
+    global client
+    GEMINI_CLIENTS.reset(client)
+    try:
+        client = GEMINI_CLIENTS.get()
+        history = chat_session().get_history(curated=True)
+        SESSION.chat = create_chat_session(history)
+        st.session_state.compactor.client = client
+    except Exception as e:
+        tool_output(f"Could not recreate the Gemini client after a connection error ({error}): {e}")
+        return False
+    tool_output(f"Recreated the Gemini client after a connection error: {error}")
+    return True
+
+
+@st.cache_resource
+def session_store():
+    """Process-wide store of conversations; idle ones are dropped from memory and reloaded from disk on resume."""
+    return SessionStore(SESSIONS_DB_FILE)
+
+SESSIONS = session_store()
+
+# --- DURABLE SESSION ---
+# The conversation is found through ?session= in the URL, so a refresh or a server restart resumes it
+SESSION = None
+if "session" in st.query_params:
+    SESSION = SESSIONS.get(st.query_params["session"], st.session_state.user_id)
+if SESSION is None:
+    SESSION = SESSIONS.create(st.session_state.user_id)
+    st.query_params["session"] = SESSION.id
+
+if "compactor" not in st.session_state:
+    st.session_state.compactor = ContextCompactor(client, guard=CALL_GUARD)
+
+def chat_session():
+    """The session's live chat, rebuilt from its saved context the first time a turn needs the model."""
+    return SESSION.ensure_chat(create_chat_session)
+
+# Sessions created before a client re-creation keep summarising with the current client
+st.session_state.compactor.client = client
+
+
+def compact_chat_session():
+    """Summarises older turns once the session context is too large; the originals go to the archive file."""
+    new_chat = st.session_state.compactor.maybe_compact(
+        chat_session(),
+        create_chat_session,
+        archive=lambda turns: archive_turns(CHAT_ARCHIVE_FILE, turns, SESSION.id),
     )
-    st.session_state.messages = []
+    if new_chat is not None:
+        SESSION.chat = new_chat
+        # Images may have been summarised away, so attach them again if they are asked about
+        SESSION.attached_images.clear()
 
 
-def handle_multimodal_request(image_data, prompt):
-    """Handles multimodal requests directly by sending image and prompt."""
-    
-    contents = [image_data, prompt]
-    
-    response = client.models.generate_content(
-        model='gemini-2.5-flash', 
-        contents=contents
-    )
-    
-    return response.text
+@st.cache_resource
+def uploaded_image_files():
+    """Files API references for processed images by content hash, shared by all sessions."""
+    return {}, threading.Lock()
 
+# Files uploaded through the Files API are kept for 48 hours
+IMAGE_FILE_TTL_SECONDS = 47 * 3600
 
-def handle_full_request(prompt):
-    """Handles standard text and tool-use requests via the chat session."""
-    
-    tool_responses = []
-    
-    # 1. Send the initial prompt
-    response = st.session_state.chat_session.send_message(prompt)
-    
-    # 2. Check for and execute tool calls
-    while response.function_calls:
-        st.markdown(f"**🤖 Nexus executing tool...**") 
-        tool_responses = []
-        
-        for function_call in response.function_calls:
-            tool_name = function_call.name
-            tool_args = dict(function_call.args)
-            
-            if tool_name in AVAILABLE_TOOLS:
-                function_to_call = AVAILABLE_TOOLS[tool_name]
-                tool_result = function_to_call(**tool_args)
-                
-                tool_responses.append(
-                    types.Part.from_function_response(
-                        name=tool_name,
-                        response={'result': tool_result}
-                    )
-                )
-        # 3. Send tool results back to the model (FIXED: Positional Argument)
-        response = st.session_state.chat_session.send_message(tool_responses) 
+
+def image_part_for(image):
+    """Returns a by-reference Part for a processed image, uploading it once through the Files API.
+
+    Falls back to sending the bytes inline if the upload fails.
+    """
+    uploads, lock = uploaded_image_files()
+    with lock:
+        entry = uploads.get(image.digest)
+        if entry is not None and time.time() - entry[1] < IMAGE_FILE_TTL_SECONDS:
+            return entry[0]
+        try:
+            uploaded = client.files.upload(
+                file=BytesIO(image.data),
+                config=types.UploadFileConfig(mime_type=image.mime_type),
+            )
+        except Exception as e:
+            tool_output(f"Image upload failed, sending it inline instead: {e}")
+            return image.to_part()
+        part = types.Part.from_uri(file_uri=uploaded.uri, mime_type=image.mime_type)
+        uploads[image.digest] = (part, time.time())
+        return part
+
+
+def prepare_image_turn(prompt, image_bytes):
+    """Builds the chat contents for a prompt while an image is uploaded in the sidebar.
+
+    The image is attached to the chat only the first time this session sends it; after
+    that it is part of the conversation history and follow-ups are sent as plain text.
+    Returns (contents, processed image or None if it was already attached).
+    """
+    image, _ = IMAGE_CACHE.get(image_bytes)
+    if image.digest in SESSION.attached_images:
+        return prompt, None
+    return [image_part_for(image), prompt], image
+
+
+def handle_full_request(contents, tool_status=None, tools_used=None, trace=None):
+    """Handles text, image and tool-use requests via the chat session.
+
+    Generator: yields the reply text as it streams in so it can be passed straight to
+    st.write_stream. The agent core executes tool calls between model requests; their names
+    are added to `tools_used` if a set is passed. Model calls and tools become spans of `trace`.
+    """
+    # The tools of this rerun are passed along, so the cached core never holds stale functions
+    for event in AGENT.stream(chat_session(), contents, tools=AVAILABLE_TOOLS, trace=trace):
+        if event.kind == 'text':
+            yield event.text
+        elif event.kind == 'tool_call':
+            if tool_status is not None:
+                tool_status.markdown(f"**🤖 Nexus executing tool...**")
+            if tools_used is not None:
+                tools_used.add(event.name)
     
-    # 4. Return the final text response from the model
-    return response.text
+    if tool_status is not None:
+        tool_status.empty()
 
 
 # --- 3. FRONTEND LAYOUT AND LOGIC ---
 
-# Display all messages from the session history
-for message in st.session_state.messages:
-    # Set custom avatar icon for user (🧑‍💻) and assistant (🤖)
-    avatar = "🧑‍💻" if message["role"] == "user" else "🤖"
-    with st.chat_message(message["role"], avatar=avatar):
-        st.markdown(message["content"]) 
+# Messages rendered on a rerun; older ones stay behind the "Load earlier messages" button
+TRANSCRIPT_PAGE_SIZE = 40
+
+def show_earlier_messages():
+    st.session_state.transcript_visible += TRANSCRIPT_PAGE_SIZE
+
+@st.fragment
+def show_transcript():
+    """Renders the newest messages of the conversation, so a rerun costs the same however long it gets.
+
+    Loading earlier messages only reruns this fragment, not the whole script.
+    """
+    render_started = time.perf_counter()
+    messages = SESSION.messages
+    visible = st.session_state.setdefault("transcript_visible", TRANSCRIPT_PAGE_SIZE)
+    hidden = max(0, len(messages) - visible)
+    if hidden:
+        st.button(f"Load earlier messages ({hidden} more)", on_click=show_earlier_messages)
+    for message in messages[hidden:]:
+        # Set custom avatar icon for user (🧑‍💻) and assistant (🤖)
+        avatar = "🧑‍💻" if message["role"] == "user" else "🤖"
+        with st.chat_message(message["role"], avatar=avatar):
+            st.markdown(message["content"]) 
+    TRACER.stats.record('ui.render_history', time.perf_counter() - render_started)
+
+show_transcript()
 
 # --- Multimodal File Uploader in the sidebar ---
 uploaded_file = st.sidebar.file_uploader("Upload Image for Analysis", type=["jpg", "jpeg", "png"])
 st.sidebar.markdown("---")
-st.sidebar.markdown("**Note:** Uploaded images will be sent along with your next text prompt.")
+st.sidebar.markdown("**Note:** An uploaded image is attached to the conversation with your next prompt; follow-up questions about it don't re-send it.")
+
+# The conversation survives refreshes; this is the way to start over
+if st.sidebar.button("New conversation"):
+    del st.query_params["session"]
+    st.rerun()
+
+
+@st.fragment(run_every="10s")
+def show_due_reminders():
+    """Polls for this user's reminders that fired since the session started and shows each one once."""
+    shown = st.session_state.setdefault("shown_reminders", set())
+    for fired_at, reminder in list(FIRED_REMINDERS):
+        if reminder.owner == USER_ID and fired_at >= st.session_state.reminders_since and reminder.id not in shown:
+            shown.add(reminder.id)
+            st.toast(f"⏰ REMINDER: {reminder.text}")
+
+show_due_reminders()
+
+
+RERUN_OVERHEAD = rerun_overhead_stats()
+RERUN_OVERHEAD.record('rerun', time.perf_counter() - RERUN_STARTED)
+with st.sidebar.expander("Performance"):
+    overhead = RERUN_OVERHEAD.percentiles('rerun', (50, 95))
+    st.caption(f"Rerun overhead: p50 {overhead[50]:.1f} ms, p95 {overhead[95]:.1f} ms "
+               f"(clients created: {GEMINI_CLIENTS.created})")
+    st.caption(f"Image cache: {IMAGE_CACHE.hits} hits, {IMAGE_CACHE.misses} misses, "
+               f"{IMAGE_CACHE.bytes_saved / 1024:.0f} KB upload saved")
+    guard_stats = CALL_GUARD.stats()
+    st.caption(f"Gemini calls: {guard_stats['calls']} sent, {guard_stats['retries']} retried, "
+               f"{guard_stats['failed']} failed, {guard_stats['throttled_seconds']:.1f}s throttled "
+               f"(breaker {guard_stats['breaker']})")
+    cache_stats = RESPONSE_CACHE.stats()
+    st.caption(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+               f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} entries")
+    session_stats = SESSIONS.stats()
+    st.caption(f"Sessions: {session_stats['in_memory']} in memory, {session_stats['loads']} resumed from disk, "
+               f"{session_stats['evictions']} evicted")
+
+with st.sidebar.expander("Turn stats"):
+    st.caption(TRACER.status_line())
+    if TRACER.turns:
+        st.table(TRACER.rows())
 
 
 # Process user input
 if prompt := st.chat_input("Ask Nexus a question or command a task..."):
     
     # 1. Add user message to history and display it
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    SESSION.add_message("user", prompt)
     with st.chat_message("user", avatar="🧑‍💻"):
         st.markdown(prompt)
 
     # 2. Get and display Nexus's response
     with st.chat_message("assistant", avatar="🤖"):
-        with st.spinner("Nexus is thinking..."):
+        response_text = ""
+        trace = None
+        
+        try:
+            # --- An uploaded image is attached to the chat session once, then referenced by history ---
+            contents, new_image = prompt, None
+            if uploaded_file is not None:
+                contents, new_image = prepare_image_turn(prompt, uploaded_file.getvalue())
             
-            response_text = ""
+            # --- Trivial commands are answered locally without a model round trip ---
+            fast_path = INTENT_ROUTER.route(prompt) if new_image is None else None
+            # Prompts about an uploaded image never come from the cache, even when it is already attached
+            cached_reply = RESPONSE_CACHE.get(prompt, USER_RESPONSE_FINGERPRINT) if fast_path is None and uploaded_file is None else None
             
-            try:
-                # --- Determine if this is a MULTIMODAL request ---
-                if uploaded_file is not None:
-                    # Multimodal handler (image is already loaded via Streamlit's file_uploader)
-                    image_data = Image.open(uploaded_file)
-                    response_text = handle_multimodal_request(image_data, prompt)
-                
+            if fast_path is not None:
+                if fast_path.intent == 'greeting':
+                    response_text = "Hello VIVEK! I am Nexus. How may I be of assistance?"
                 else:
-                    # --- Standard TEXT/TOOL request ---
-                    response_text = handle_full_request(prompt)
-        
-            except Exception as e:
-                # *** FINAL SERVER/API ERROR HANDLING FIX ***
-                error_message = str(e)
-                if "ServerError" in error_message or "unavailable" in error_message.lower() or "429" in error_message:
-                    response_text = "I apologize, VIVEK. I'm experiencing a temporary server capacity issue right now. Please wait a moment and try that command again."
+                    response_text = INTENT_ROUTER.dispatch(fast_path)
+                st.markdown(response_text)
+            
+            elif cached_reply is not None:
+                # --- Repeated question: reuse the earlier answer and keep it in the chat context ---
+                response_text = cached_reply
+                st.markdown(response_text)
+                st.caption("(cached)")
+                record_cached_turn(chat_session(), prompt, response_text)
+            
+            else:
+                # --- TEXT/IMAGE/TOOL request through the chat session, rendered token by token ---
+                if new_image is not None:
+                    st.caption(f"Image attached to the conversation: {new_image.summary()}")
+                tool_status = st.empty()
+                tools_used = set()
+                trace = TRACER.start_turn("web", session=SESSION.id, chars=len(prompt),
+                                          image=new_image is not None)
+                started = time.perf_counter()
+                with trace.span('ui.write_stream'):
+                    response_text = st.write_stream(handle_full_request(contents, tool_status, tools_used, trace))
+                INTENT_ROUTER.record('model', time.perf_counter() - started)
+                if uploaded_file is None:
+                    with trace.span('save.response_cache'):
+                        RESPONSE_CACHE.put(prompt, USER_RESPONSE_FINGERPRINT, response_text, tools_used)
+                if new_image is not None:
+                    SESSION.attached_images.add(new_image.digest)
+                with trace.span('save.compact'):
+                    compact_chat_session()
+    
+        except Exception as e:
+            # *** FINAL SERVER/API ERROR HANDLING FIX ***
+            if is_connection_error(e):
+                if recover_connection(e):
+                    response_text = "I apologize, VIVEK. I lost my connection to the AI service and have reconnected. Please try that command again."
                 else:
-                    response_text = f"An unexpected internal error occurred: {e}"
-            # *** END ERROR HANDLING ***
-        
-        st.markdown(response_text)
-        st.session_state.messages.append({"role": "assistant", "content": response_text})
+                    response_text = "I apologize, VIVEK. I lost my connection to the AI service and could not reconnect yet. Please check your network and try again in a moment."
+            elif is_capacity_error(e):
+                # Only reached once the retries are used up or the circuit breaker is open
+                response_text = "I apologize, VIVEK. I'm experiencing a temporary server capacity issue right now. Please wait a moment and try that command again."
+            else:
+                response_text = f"An unexpected internal error occurred: {e}"
+            st.markdown(response_text)
+        # *** END ERROR HANDLING ***
+        SESSION.add_message("assistant", response_text)
+        save_started = time.perf_counter()
+        SESSIONS.save(SESSION)
+        if trace is not None:
+            trace.record('save.session', time.perf_counter() - save_started, start=save_started)
+            trace.finish()